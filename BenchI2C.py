@@ -0,0 +1,239 @@
+module_name = 'BenchI2C.py'
+module_description = 'Host benchmarks for the PCA9685 writes in PicoRobotics. Created 18/Oct/2026'
+
+#  Run on a Linux host:   python3 BenchI2C.py
+#  HostPico.I2C counts transactions, bytes and bus time, and keeps the chip's registers so the
+#  old and new write paths can be checked against each other.
+
+import HostPico
+HostPico.install()
+
+import random
+import time
+import PicoRobotics
+
+def make_board(coalesced, shadow):
+    board = PicoRobotics.KitronikPicoRobotics()
+    if not coalesced:
+        board.autoIncrement = False   #  the original one register per transaction path
+    board.useShadow = shadow
+    board.i2c.clear_counts()
+    return board
+
+def make_commands(no_ticks, change=1.0, seed=1):
+    #  one tick drives all four motors, as Side.drive does, and sets two of the eight servos;
+    #  each value changes with probability change, otherwise the last one is sent again
+    rng = random.Random(seed)
+    motors = [[motor, 'f', 0] for motor in range(1, 5)]
+    servos = [[1, 90], [2, 90]]
+    ticks = []
+    for n in range(no_ticks):
+        for motor in motors:
+            if rng.random() < change:
+                motor[1] = rng.choice('fr')
+                motor[2] = rng.randint(0, 100)
+        for servo in servos:
+            if rng.random() < change:
+                servo[0] = rng.randint(1, 8)
+                servo[1] = rng.randint(0, 180)
+        ticks.append([[list(motor) for motor in motors], [list(servo) for servo in servos]])
+    return ticks
+
+def run(board, ticks):
+    for motors, servos in ticks:
+        for motor, direction, speed in motors:
+            board.motorOn(motor, direction, speed)
+        for servo, degrees in servos:
+            board.servoWrite(servo, degrees)
+
+def same_registers(old_board, new_board):
+    #  everything but MODE1, which differs only by the auto-increment bit
+    old = old_board.i2c.registers(old_board.CHIP_ADDRESS)
+    new = new_board.i2c.registers(new_board.CHIP_ADDRESS)
+    return old[1:] == new[1:] and (old[0] | PicoRobotics.KitronikPicoRobotics.MODE1_AI) == new[0]
+
+def bench(ticks):
+    #  per tick figures; the first board is the reference for the register check
+    print ('{:22}{:>14}{:>8}{:>13}{:>13}{:>9}{:>9}'.format(
+        'PATH', 'TRANSACTIONS', 'BYTES', 'BUS US/TICK', 'CPU US/TICK', 'HITS', 'MISSES'))
+    boards = []
+    for name, coalesced, shadow in (('per register', False, False), ('coalesced', True, False),
+                                    ('coalesced + shadow', True, True)):
+        board = make_board(coalesced, shadow)
+        start = time.perf_counter()
+        run(board, ticks)
+        seconds = time.perf_counter() - start
+        i2c = board.i2c
+        print ('{:22}{:>14.1f}{:>8.1f}{:>13.0f}{:>13.1f}{:>9}{:>9}'.format(
+            name, i2c.transactions / len(ticks), i2c.bytes / len(ticks), i2c.bus_us / len(ticks),
+            seconds * 1000000.0 / len(ticks), board.cacheHits, board.cacheMisses))
+        boards.append(board)
+    print ('registers agree:', same_registers(boards[0], boards[1]) and same_registers(boards[0], boards[2]))
+
+def bench_frames(ticks):
+    #  latency is bus time per tick; skew is from the first to the last STOP that changed a motor,
+    #  the PCA9685 updating its outputs at the STOP
+    motor_low = PicoRobotics.KitronikPicoRobotics.MOT_REG_BASE
+    motor_high = motor_low + (8 * PicoRobotics.KitronikPicoRobotics.REG_OFFSET) - 1
+    print ('{:22}{:>14}{:>8}{:>16}{:>16}'.format('PATH', 'TRANSACTIONS', 'BYTES', 'LATENCY US', 'SKEW US'))
+    boards = []
+    for name, framed, gap in (('one call at a time', False, None), ('begin_frame/commit', True, None),
+                              ('commit, one run', True, 255)):
+        board = make_board(True, True)
+        if gap is not None:
+            board.FRAME_GAP = gap
+        i2c = board.i2c
+        stops = []
+        writeto_mem = i2c.writeto_mem
+        def timed_writeto_mem(address, register, data):
+            writeto_mem(address, register, data)
+            if register <= motor_high and register + len(data) > motor_low:
+                stops.append(i2c.bus_us)
+        i2c.writeto_mem = timed_writeto_mem
+        skew = 0.0
+        for tick in ticks:
+            del stops[:]
+            if framed:
+                board.beginFrame()
+            run(board, [tick])
+            if framed:
+                board.commitFrame()
+            if len(stops) > 1:
+                skew += stops[-1] - stops[0]
+        print ('{:22}{:>14.1f}{:>8.1f}{:>16.0f}{:>16.0f}'.format(
+            name, i2c.transactions / len(ticks), i2c.bytes / len(ticks), i2c.bus_us / len(ticks), skew / len(ticks)))
+        boards.append(board)
+    print ('registers agree:', same_registers(boards[0], boards[1]) and same_registers(boards[0], boards[2]))
+
+def control_loop(board, ticks, period_us):
+    #  returns mean and worst us spent in the motor and servo calls per tick
+    total = 0.0
+    worst = 0.0
+    for tick in ticks:
+        start = time.perf_counter()
+        run(board, [tick])
+        us = (time.perf_counter() - start) * 1000000.0
+        total += us
+        worst = max(worst, us)
+        if us < period_us:
+            time.sleep((period_us - us) / 1000000.0)
+    return total / len(ticks), worst
+
+def bench_queue(ticks, period_us=7000):
+    #  the fake bus takes real time here, so a synchronous write blocks the control loop
+    print ('{:10}{:>8}{:>12}{:>12}{:>10}{:>10}{:>12}{:>12}'.format(
+        'FREQ', 'WRITER', 'LOOP US', 'WORST US', 'DEPTH', 'STALLS', 'LAT P50 US', 'LAT P99 US'))
+    for freq in (100000, 400000, 1000000):
+        for queued in (False, True):
+            board = PicoRobotics.KitronikPicoRobotics(freq=freq)
+            board.i2c.realtime = True
+            if queued:
+                board.startQueue()
+            mean, worst = control_loop(board, ticks, period_us)
+            if queued:
+                rep = board.queueReport()
+                board.stopQueue()
+                print ('{:<10}{:>8}{:>12.0f}{:>12.0f}{:>10}{:>10}{:>12}{:>12}'.format(
+                    freq, 'queued', mean, worst, rep['Max Depth Seen'], rep['Stalls'],
+                    rep['Latency P50 us'], rep['Latency P99 us']))
+            else:
+                print ('{:<10}{:>8}{:>12.0f}{:>12.0f}'.format(freq, 'sync', mean, worst))
+
+def probe_frame_past_depth():
+    #  a frame bigger than maxDepth has to go out whole at commitFrame rather than wait for a drain
+    board = PicoRobotics.KitronikPicoRobotics()
+    board.startQueue(maxDepth=8, drainer='CALLER')
+    board.beginFrame()
+    for motor in range(1, 5):
+        board.motorOn(motor, 'f', 50)
+    board.servoWrite(1, 45)
+    board.servoWrite(2, 135)
+    depth = board.queueDepth
+    board.commitFrame()
+    runs = board.drainQueue()
+    board.motorOn(1, 'r', 20)   #  back under maxDepth, so no stall
+    print ('four motors and two servos in one frame with maxDepth 8: depth {} sent in {} run(s), {} stall(s)'.format(
+        depth, runs, board.queueReport()['Stalls']))
+    board.stopQueue()
+
+def probe_failed_write():
+    #  a write the bus loses must not be taken into the shadow, or the same command is never sent again
+    results = []
+    for framed, queued in ((True, False), (False, False), (True, True)):
+        board = PicoRobotics.KitronikPicoRobotics()
+        if queued:
+            board.startQueue(drainer='CALLER')
+        board.motorOn(1, 'f', 0)
+        if queued:
+            board.drainQueue()
+        real_writeto_mem = board.i2c.writeto_mem
+        def failing_writeto_mem(address, register, data):
+            raise OSError(5)   #  EIO
+        board.i2c.writeto_mem = failing_writeto_mem
+        try:
+            board.beginFrame()
+            board.motorOn(1, 'f', 50)
+            board.commitFrame()
+            if queued:
+                board.drainQueue()
+        except OSError:
+            pass
+        board.i2c.writeto_mem = real_writeto_mem
+        board.i2c.clear_counts()
+        if framed:
+            board.beginFrame()
+        board.motorOn(1, 'f', 50)
+        if framed:
+            board.commitFrame()
+        if queued:
+            board.drainQueue()
+            board.stopQueue()
+        results.append(board.i2c.transactions > 0)
+    print ('the same motorOn after a lost frame goes out: framed', results[0], ' direct', results[1], ' queued', results[2])
+
+def probe_nested_frame():
+    #  a pose or a stepper stop brackets its own frame; inside the caller's it must not send early
+    board = PicoRobotics.KitronikPicoRobotics()
+    board.i2c.clear_counts()
+    board.beginFrame()
+    board.motorOn(1, 'f', 50)
+    board.beginFrame()
+    board.servoWrite(1, 90)
+    inner = board.commitFrame()
+    board.motorOn(2, 'f', 50)
+    sent_inside = board.i2c.transactions
+    outer = board.commitFrame()
+    print ('a frame inside a frame: sent {} run(s) at the inner commit, {} at the outer, nothing sent before the outer commit: {}'.format(
+        inner + sent_inside, outer, inner == 0 and sent_inside == 0))
+
+def probe_stepper_in_frame():
+    #  a stepper serviced on the drainer's core while the caller's frame is open must not let a drain
+    #  take half the frame; the coils join it and go out at commitFrame
+    board = PicoRobotics.KitronikPicoRobotics()
+    board.startQueue(drainer='CALLER')
+    board.beginFrame()
+    board.motorOn(1, 'f', 50)
+    board.stepper(2).writeCoils(1)   #  what serviceSteppers does on the second core
+    early = board.drainQueue()
+    board.motorOn(2, 'f', 50)
+    board.commitFrame()
+    runs = board.drainQueue()
+    board.stopQueue()
+    print ('stepper coils inside an open queued frame: {} run(s) drained early, {} at commitFrame'.format(early, runs))
+
+if __name__ == "__main__":
+    print (module_name)
+    print ('four motorOn and two servoWrite calls per tick at 100000 Hz, every value changing:')
+    bench(make_commands(2000))
+    print ('the same with one value in ten changing per tick:')
+    bench(make_commands(2000, 0.1))
+    print ('a whole tick in one frame, every value changing:')
+    bench_frames(make_commands(2000))
+    print ('the same with one value in ten changing per tick:')
+    bench_frames(make_commands(2000, 0.1))
+    print ('control loop at 7ms ticks, every value changing, synchronous writes against the queue:')
+    bench_queue(make_commands(150))
+    probe_frame_past_depth()
+    probe_failed_write()
+    probe_nested_frame()
+    probe_stepper_in_frame()
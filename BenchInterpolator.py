@@ -0,0 +1,180 @@
+module_name = 'BenchInterpolator.py'
+module_description = 'Host benchmarks for ColObjects.Interpolator. Created 18/Oct/2026'
+
+#  Run on a Linux host:   python3 BenchInterpolator.py
+#  The curves are read from the Interpolator(...) and ChannelMap(...) calls in the listed modules, so the
+#  benchmark always uses what is actually deployed.
+
+import HostPico
+HostPico.install()
+
+import array
+import ast
+import random
+import time
+import ColObjects_V16 as ColObjects
+
+CURVE_MODULES = ['SBUSReceiver_V06.py', 'ThisPico_F_v21.py']
+
+def find_curves(file_name):
+    with open(file_name) as f:
+        tree = ast.parse(f.read())
+    curves = []
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                and node.func.attr in ('Interpolator', 'LUTInterpolator') and len(node.args) == 3):
+            try:
+                name, keys, values = [ast.literal_eval(arg) for arg in node.args]
+            except ValueError:
+                continue
+            curves.append([file_name + ': ' + name, keys, values])
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                and node.func.attr == 'ChannelMap' and len(node.args) >= 2):
+            for entry in node.args[1].elts:   #  [name, channel index, keys, values]
+                name, keys, values = [ast.literal_eval(entry.elts[i]) for i in (0, 2, 3)]
+                curves.append([file_name + ': ' + name, keys, values])
+    return curves
+
+class LegacyInterpolator():
+    #  The original linear scan, kept here as the reference
+    def __init__(self, keys, values):
+        self.keys = keys
+        self.values = values
+    def interpolate(self, in_key):
+        if in_key is None:
+            return None
+        below_ok = False
+        above_ok = False
+        for i in range(len(self.keys)):
+            if in_key == self.keys[i]:
+                return self.values[i]
+            if in_key > self.keys[i]:
+                below_key = self.keys[i]
+                below_value = self.values[i]
+                below_ok = True
+            if in_key < self.keys[i]:
+                above_key = self.keys[i]
+                above_value = self.values[i]
+                above_ok = True
+                break
+        if above_ok and below_ok:
+            out_value = below_value + (((in_key - below_key) / (above_key - below_key)) * (above_value - below_value))
+            return out_value
+        else:
+            return None
+
+def sweep(keys):
+    span = keys[-1] - keys[0]
+    return list(range(keys[0] - 10 - span // 10, keys[-1] + 10 + span // 10)) + [None]
+
+def check(curve, interpolator):
+    #  returns the largest difference from the legacy result, or None if a None does not match
+    name, keys, values = curve
+    legacy = LegacyInterpolator(keys, values)
+    worst = 0.0
+    for in_key in sweep(keys):
+        old = legacy.interpolate(in_key)
+        new = interpolator.interpolate(in_key)
+        if (old is None) != (new is None):
+            return None
+        if old is not None:
+            worst = max(worst, abs(old - new))
+    return worst
+
+def time_calls(interpolate, inputs, repeats):
+    start = time.perf_counter()
+    for r in range(repeats):
+        for in_key in inputs:
+            interpolate(in_key)
+    return (time.perf_counter() - start) * 1000000000.0 / (repeats * len(inputs))
+
+def bench_curve(curve, interpolator, repeats=200):
+    #  in range inputs only, as seen by the control loop; best of five runs each
+    name, keys, values = curve
+    inputs = list(range(keys[0], keys[-1] + 1))
+    legacy = LegacyInterpolator(keys, values)
+    old_ns = min([time_calls(legacy.interpolate, inputs, repeats) for i in range(5)])
+    new_ns = min([time_calls(interpolator.interpolate, inputs, repeats) for i in range(5)])
+    return old_ns, new_ns
+
+def check_lut(curve, lut):
+    #  largest quantisation error against the exact curve
+    name, keys, values = curve
+    legacy = LegacyInterpolator(keys, values)
+    return max([abs(legacy.interpolate(k) - lut.interpolate(k)) for k in range(lut.low, lut.high + 1)])
+
+def bench_lut(curve, lut, repeats=200):
+    name, keys, values = curve
+    inputs = list(range(keys[0], keys[-1] + 1))
+    lut_ns = min([time_calls(lut.interpolate, inputs, repeats) for i in range(5)])
+    table = lut.table
+    low = lut.low
+    index_ns = min([time_calls(lambda k: table[k - low], inputs, repeats) for i in range(5)])
+    return lut_ns, index_ns
+
+def synthetic_curve(no_keys):
+    #  a finely calibrated curve, to show how lookup cost grows with the number of keys
+    keys = [100 + (i * 1900) // (no_keys - 1) for i in range(no_keys)]
+    values = [((i * 200.0) / (no_keys - 1)) - 100.0 for i in range(no_keys)]
+    return ['synthetic ' + str(no_keys) + ' keys', keys, values]
+
+def bench_channel_map(curves, frames=5000):
+    #  six separate Interpolator calls per frame against one ChannelMap.convert into a reused array
+    rng = random.Random(1)
+    raws = [array.array('H', [rng.randint(100, 2000) for i in range(18)]) for n in range(frames)]
+    interpolators = [ColObjects.Interpolator('bench six ' + str(i), curve[1], curve[2]) for i, curve in enumerate(curves)]
+    channel_map = ColObjects.ChannelMap('bench map', [[curve[0], i, curve[1], curve[2]] for i, curve in enumerate(curves)])
+    outputs = channel_map.new_output()
+    def six_calls():
+        for raw in raws:
+            values = tuple([interpolators[i].interpolate(raw[i]) for i in range(6)])
+    def one_pass():
+        for raw in raws:
+            channel_map.convert(raw, outputs)
+    for name, run in (('six interpolate() calls', six_calls), ('ChannelMap.convert()', one_pass)):
+        best = None
+        for i in range(5):
+            start = time.perf_counter()
+            run()
+            seconds = time.perf_counter() - start
+            if best is None or seconds < best:
+                best = seconds
+        print ('{:30}{:>10.2f} us per frame'.format(name, best * 1000000.0 / frames))
+    for interpolator in interpolators:
+        interpolator.close()
+    channel_map.close()
+
+if __name__ == "__main__":
+    print (module_name)
+    curves = []
+    for file_name in CURVE_MODULES:
+        curves += find_curves(file_name)
+    curves += [synthetic_curve(16), synthetic_curve(64)]
+    print ('Interpolator, scan or bisection of precomputed segments against the legacy linear scan:')
+    print ('{:52}{:>10}{:>10}{:>10}{:>12}'.format('CURVE', 'OLD NS', 'NEW NS', 'SPEED UP', 'MAX DIFF'))
+    for n, curve in enumerate(curves):
+        interpolator = ColObjects.Interpolator('bench ' + str(n), curve[1], curve[2])
+        worst = check(curve, interpolator)
+        old_ns, new_ns = bench_curve(curve, interpolator)
+        print ('{:52}{:>10.0f}{:>10.0f}{:>9.1f}x{:>12}'.format(
+            curve[0][:51], old_ns, new_ns, old_ns / new_ns,
+            'NONE MISMATCH' if worst is None else '{:.1e}'.format(worst)))
+        interpolator.close()
+    print ('LUTInterpolator, step 1:')
+    print ('{:52}{:>8}{:>10}{:>10}{:>10}'.format('CURVE', 'BYTES', 'LUT NS', 'INDEX NS', 'MAX ERR'))
+    for n, curve in enumerate(curves):
+        lut = ColObjects.LUTInterpolator('bench lut ' + str(n), curve[1], curve[2])
+        lut_ns, index_ns = bench_lut(curve, lut)
+        print ('{:52}{:>8}{:>10.0f}{:>10.0f}{:>10.2f}'.format(
+            curve[0][:51], len(lut.table) * lut.table.itemsize, lut_ns, index_ns, check_lut(curve, lut)))
+        lut.close()
+    print ('SBUSReceiver_V06 channels, step 0.1 (SBUSReceiverMC6C step=0.1):')
+    print ('{:52}{:>8}{:>10}{:>10}{:>10}'.format('CURVE', 'BYTES', 'LUT NS', 'INDEX NS', 'MAX ERR'))
+    for n, curve in enumerate(find_curves('SBUSReceiver_V06.py')[:6]):
+        lut = ColObjects.LUTInterpolator('bench tenth ' + str(n), curve[1], curve[2], step=0.1)
+        lut_ns, index_ns = bench_lut(curve, lut)
+        print ('{:52}{:>8}{:>10.0f}{:>10.0f}{:>10.2f}'.format(
+            curve[0][:51], len(lut.table) * lut.table.itemsize, lut_ns, index_ns, check_lut(curve, lut)))
+        lut.close()
+    print ('All six SBUSReceiver_V06 channels per frame:')
+    bench_channel_map(find_curves('SBUSReceiver_V06.py')[:6])
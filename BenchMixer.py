@@ -0,0 +1,231 @@
+module_name = 'BenchMixer.py'
+module_description = 'Host benchmarks for ColObjects.MecanumMixer. Created 18/Oct/2026'
+
+#  Run on a Linux host:   python3 BenchMixer.py
+#  Also runs on the Pico (no HostPico there), where allocations are counted with gc.mem_alloc().
+
+import HostPico
+HostPico.install()
+
+import array
+import gc
+import random
+import time
+import ColObjects_V16 as ColObjects
+
+try:
+    import tracemalloc
+except ImportError:   #  MicroPython
+    tracemalloc = None
+
+def legacy_array_abs(input_array):
+    output_array = []
+    for element in input_array:
+        if element is None:
+            output_array.append(0)
+        else:
+            output_array.append(abs(element))
+    return output_array
+
+def legacy_mix(spin, fore_and_aft, crab=0):
+    #  The original Motor_V07.Mixer.mix, kept here as the reference
+    inputs_abs = legacy_array_abs([spin, fore_and_aft, crab])
+    biggest_in = max(inputs_abs)
+    total_in = sum(inputs_abs)
+    if total_in == 0:
+        return 0,0,0,0
+    fwd_levels = [fore_and_aft, fore_and_aft, fore_and_aft, fore_and_aft]
+    spin_levels = [spin, -spin, spin, -spin]
+    fwd_abs = legacy_array_abs(fwd_levels)
+    spin_abs = legacy_array_abs(spin_levels)
+    total_out = sum(fwd_abs) + sum(spin_abs)
+    crab_levels = [0,0,0,0]
+    if crab != 0:
+        crab_levels = [crab, crab, -crab, -crab]
+        crab_abs = legacy_array_abs(crab_levels)
+        total_out = total_out + sum(crab_abs)
+    lf_level = (fwd_levels[0] + spin_levels[0] + crab_levels[0])
+    rf_level = (fwd_levels[1] + spin_levels[1] - crab_levels[1])
+    lb_level = (fwd_levels[2] + spin_levels[2] + crab_levels[2])
+    rb_level = (fwd_levels[3] + spin_levels[3] - crab_levels[3])
+    output_abs = legacy_array_abs([lf_level, rf_level, lb_level, rb_level])
+    biggest_out = max(output_abs)
+    ratio_b = biggest_in / biggest_out
+    return lf_level * ratio_b, rf_level * ratio_b, lb_level * ratio_b, rb_level * ratio_b
+
+def plain_constrain(n, lowest, highest):
+    if n > highest:
+        return highest
+    if n < lowest:
+        return lowest
+    return n
+
+def plain_mix(throttle, steering):
+    #  DriveCalc.get_drive_parms('MIX', ...)
+    left = plain_constrain(throttle + steering, -100, 100)
+    right = plain_constrain(throttle - steering, -100, 100)
+    return int(left), int(right)
+
+class PlainRemoteControl():
+    #  RemoteControl.calculate_speeds_tank and calculate_speeds_car before they used CompiledMix
+    def __init__(self):
+        self.min_throttle = -100
+        self.max_throttle = 100
+        self.min_steering = -100
+        self.max_steering = 100
+        self.reversing_mode = 0
+    def constrain(self, n, lowest, highest):
+        if n > highest:
+            a = highest
+        elif n < lowest:
+            a = lowest
+        else:
+            a = n
+        return a
+    def calculate_speeds_tank(self, left_value, right_value):
+        left = self.constrain (left_value, self.min_throttle, self.max_throttle)
+        right = self.constrain (right_value, self.min_steering, self.max_steering)
+        return int(left), int(right)
+    def calculate_speeds_car(self, throttle, steering):
+        if ((throttle < 0) and (self.reversing_mode == 0)):
+                left = self.constrain (throttle + steering, self.min_throttle, self.max_throttle)
+                right = self.constrain (throttle - steering, self.min_throttle, self.max_throttle)
+        else:
+            right = self.constrain (throttle + steering, self.min_throttle, self.max_throttle)
+            left = self.constrain (throttle - steering, self.min_throttle, self.max_throttle)
+        return int(left), int(right)
+
+def make_sticks(no_inputs, seed=2):
+    #  [throttle, steering] as whole numbers, as the receivers deliver them
+    rng = random.Random(seed)
+    return [[rng.randint(-100, 100), rng.randint(-100, 100)] for n in range(no_inputs)]
+
+def bench_drives(sticks, repeats=50):
+    #  the plain constrain code against the CompiledMix the drive classes now call
+    plain = PlainRemoteControl()
+    tank_mix = ColObjects.CompiledMix('TANK')
+    car_mix = ColObjects.CompiledMix('DIFFERENTIAL')
+    reversing_mode = 0
+    def car(throttle, steering):
+        #  RemoteControl.calculate_speeds_car
+        if ((throttle < 0) and (reversing_mode == 0)):
+            left, right = car_mix.mix(throttle, steering)
+        else:
+            right, left = car_mix.mix(throttle, steering)
+        return left, right
+    rows = [['TANK', plain.calculate_speeds_tank, tank_mix.mix],
+            ['DIFFERENTIAL', plain_mix, car_mix.mix],
+            ['CAR', plain.calculate_speeds_car, car]]
+    print ('{:20}{:>10}{:>10}{:>10}{:>10}'.format('GEOMETRY', 'PLAIN NS', 'MIX NS', 'SPEED UP', 'MAX DIFF'))
+    for name, old, new in rows:
+        worst = 0
+        for t, s in sticks:
+            a = old(t, s)
+            b = new(t, s)
+            worst = max(worst, abs(a[0] - b[0]), abs(a[1] - b[1]))
+        times = []
+        for run in (old, new):
+            best = None
+            for r in range(repeats):
+                start = time.perf_counter()
+                for t, s in sticks:
+                    run(t, s)
+                seconds = time.perf_counter() - start
+                if best is None or seconds < best:
+                    best = seconds
+            times.append(best * 1000000000.0 / len(sticks))
+        print ('{:20}{:>10.0f}{:>10.0f}{:>9.1f}x{:>10}'.format(name, times[0], times[1], times[0] / times[1], worst))
+
+def make_inputs(no_inputs, seed=1):
+    #  [fore_and_aft, spin, crab] in the range -100 to +100, with some stick centred
+    rng = random.Random(seed)
+    inputs = []
+    for n in range(no_inputs):
+        inputs.append([rng.choice([0.0, rng.uniform(-100.0, 100.0)]) for i in range(3)])
+    return inputs
+
+def check(inputs):
+    #  largest difference between legacy mix and RATIO mode
+    mixer = ColObjects.MecanumMixer('bench check')
+    worst = 0.0
+    for fwd, spin, crab in inputs:
+        old = legacy_mix(spin, fwd, crab)
+        new = mixer.mix_into(fwd, spin, crab)
+        for i in range(4):
+            worst = max(worst, abs(old[i] - new[i]))
+    mixer.close()
+    return worst
+
+def measure(run):
+    #  returns bytes allocated by run(); peak over the call on the host, as nothing is kept
+    gc.collect()
+    if tracemalloc is not None:
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak - before
+    gc.disable()
+    before = gc.mem_alloc()
+    run()
+    allocated = gc.mem_alloc() - before
+    gc.enable()
+    return allocated
+
+def bench(inputs, repeats=20):
+    #  bytes are the peak over one call and over the whole input run; on the host these are the
+    #  boxed float temporaries plus, for the legacy mixer, its lists and result tuple
+    print ('{:24}{:>12}{:>14}{:>12}'.format('MIXER', 'NS/CALL', 'BYTES/CALL', 'BYTES/RUN'))
+    single = inputs[1]
+    def legacy_one():
+        legacy_mix(single[1], single[0], single[2])
+    def legacy_all():
+        for fwd, spin, crab in inputs:
+            legacy_mix(spin, fwd, crab)
+    rows = [['legacy mix()', legacy_one, legacy_all]]
+    mixers = []
+    for mode in ColObjects.MecanumMixer.valid_modes:
+        mixer = ColObjects.MecanumMixer('bench ' + mode, mode)
+        mixers.append(mixer)
+        outputs = array.array('f', [0.0] * 4)
+        def new_one(mixer=mixer, outputs=outputs):
+            mixer.mix_into(single[0], single[1], single[2], outputs)
+        def new_all(mixer=mixer, outputs=outputs):
+            mix_into = mixer.mix_into
+            for fwd, spin, crab in inputs:
+                mix_into(fwd, spin, crab, outputs)
+        rows.append([mode + ' mix_into()', new_one, new_all])
+    for name, one, run in rows:
+        best = None
+        for r in range(repeats):
+            start = time.perf_counter()
+            run()
+            seconds = time.perf_counter() - start
+            if best is None or seconds < best:
+                best = seconds
+        one()   #  warm up before counting
+        print ('{:24}{:>12.0f}{:>14}{:>12}'.format(
+            name, best * 1000000000.0 / len(inputs), measure(one), measure(run)))
+    for mixer in mixers:
+        mixer.close()
+
+def show_modes():
+    #  full stick on all three axes shows the difference between the modes
+    for mode in ColObjects.MecanumMixer.valid_modes:
+        mixer = ColObjects.MecanumMixer('show ' + mode, mode)
+        for fwd, spin, crab in ([100.0, 50.0, 0.0], [100.0, 100.0, 100.0], [30.0, 90.0, 60.0]):
+            out = mixer.mix_into(fwd, spin, crab)
+            print ('{:10}fwd {:>6.0f} spin {:>6.0f} crab {:>6.0f}  ->  lf {:>7.1f} rf {:>7.1f} lb {:>7.1f} rb {:>7.1f}'.format(
+                mode, fwd, spin, crab, out[0], out[1], out[2], out[3]))
+        mixer.close()
+
+if __name__ == "__main__":
+    print (module_name)
+    inputs = make_inputs(5000)
+    print ('RATIO mode against legacy mix(), max diff: {:.1e}'.format(check(inputs)))
+    bench(inputs)
+    show_modes()
+    print ('CompiledMix against the plain code in the drive classes:')
+    bench_drives(make_sticks(2000))
@@ -0,0 +1,150 @@
+module_name = 'BenchMotor.py'
+module_description = 'Host benchmarks for the motor duty tables. Created 18/Oct/2026'
+
+#  Run on a Linux host:   python3 BenchMotor.py
+#  Each motor type is timed with its old float conversion against the 201 entry duty table.
+#  Kitronik_v14 is not imported; its motor is the same table driving PicoRobotics.coilWrite.
+
+import HostPico
+HostPico.install()
+
+import random
+import time
+import ColObjects_V16 as ColObjects
+import Motor_V07 as Motor
+import PicoRobotics
+
+def legacy_fit0441_set_speed(motor, speed):
+    #  FIT0441Motor.set_speed before the duty table, the same in all three FIT0441 classes
+    motor.duty = (motor.min_speed_duty
+                 - int(float(motor.min_speed_duty - motor.max_speed_duty)
+                    * (float(speed) / 100.0)))
+    motor.speed_pin.duty_u16(motor.duty)
+
+def legacy_l298n_duty(motor, speed):
+    #  L298NMotor.convert_speed_to_duty before the duty table
+    return int((motor.max_speed_duty - motor.min_speed_duty) / 100 * speed)
+
+def make_motors():
+    return [Motor.FIT0441BasicMotor('bench basic', 2, 3),
+            Motor.FIT0441Motor('bench fit0441', 4, 5),
+            Motor.FIT0441MotorWithPulses('bench pulses', 6, 7, 10),
+            Motor.L298NMotor('bench l298n', 11, 12)]
+
+class KitronikTable(ColObjects.Motor):
+    #  KitronikMotor.calibrate, clk and anti, with clockwise 'f'
+    def __init__(self, name, board, motor_no, calibration=None, deadband=0):
+        super().__init__(name)
+        self.board = board
+        self.motor_no = motor_no
+        self.duty_table = self.make_duty_table(0, 4095, calibration, deadband, signed=True)
+    def clk(self, speed):
+        self.board.coilWrite(self.motor_no, self.duty_table[self.duty_index(speed, 0)])
+    def anti(self, speed):
+        self.board.coilWrite(self.motor_no, self.duty_table[200 - self.duty_index(speed, 0)])
+
+def commands(motor):
+    #  [old, new] callables taking a speed from 0 to 100
+    if isinstance(motor, Motor.L298NMotor):
+        def old(speed):
+            motor.clk_PWM.duty_u16(legacy_l298n_duty(motor, speed))
+        return [old, lambda speed: motor.clk_PWM.duty_u16(motor.convert_speed_to_duty(speed))]
+    return [lambda speed: legacy_fit0441_set_speed(motor, speed), motor.set_speed]
+
+def max_diff(motor):
+    #  largest duty difference over the whole speeds
+    worst = 0
+    for speed in range(101):
+        if isinstance(motor, Motor.L298NMotor):
+            old = legacy_l298n_duty(motor, speed)
+        else:
+            legacy_fit0441_set_speed(motor, speed)
+            old = motor.duty
+        worst = max(worst, abs(old - motor.duty_table[speed + 100]))
+    return worst
+
+def time_calls(run, speeds, repeats=20):
+    best = None
+    for r in range(repeats):
+        start = time.perf_counter()
+        for speed in speeds:
+            run(speed)
+        seconds = time.perf_counter() - start
+        if best is None or seconds < best:
+            best = seconds
+    return best * 1000000000.0 / len(speeds)
+
+def bench(speeds):
+    #  speeds are floats, as the mixers hand them on
+    print ('{:28}{:>10}{:>10}{:>10}{:>10}{:>12}'.format('MOTOR', 'OLD NS', 'NEW NS', 'SPEED UP', 'MAX DIFF', 'TABLE BYTES'))
+    motors = make_motors()
+    for motor in motors:
+        old, new = commands(motor)
+        old_ns = time_calls(old, speeds)
+        new_ns = time_calls(new, speeds)
+        print ('{:28}{:>10.0f}{:>10.0f}{:>9.1f}x{:>10}{:>12}'.format(
+            type(motor).__name__, old_ns, new_ns, old_ns / new_ns, max_diff(motor),
+            len(motor.duty_table) * motor.duty_table.itemsize))
+    board = PicoRobotics.KitronikPicoRobotics()
+    kitronik = KitronikTable('bench kitronik', board, 1)
+    old_ns = time_calls(lambda speed: board.motorOn(1, 'f', speed), speeds)
+    new_ns = time_calls(kitronik.clk, speeds)
+    worst = max([abs(int(speed * 40.95) - kitronik.duty_table[speed + 100]) for speed in range(101)])
+    print ('{:28}{:>10.0f}{:>10.0f}{:>9.1f}x{:>10}{:>12}'.format(
+        'KitronikMotor', old_ns, new_ns, old_ns / new_ns, worst,
+        len(kitronik.duty_table) * kitronik.duty_table.itemsize))
+    for motor in motors + [kitronik]:
+        motor.close()
+
+def show_calibration():
+    #  a motor that does not turn below 25%, with 70% of full duty at half speed before the deadband
+    calibration = [[0, 50, 100], [0, 70, 100]]
+    motor = Motor.L298NMotor('show l298n', 11, 12, calibration=calibration, deadband=25)
+    print ('{:>8}{:>10}{:>12}'.format('SPEED', 'PLAIN', 'CALIBRATED'))
+    plain = Motor.L298NMotor('show plain', 13, 14)
+    for speed in (0, 1, 10, 25, 50, 75, 100):
+        print ('{:>8}{:>10}{:>12}'.format(speed, plain.convert_speed_to_duty(speed), motor.convert_speed_to_duty(speed)))
+    motor.close()
+    plain.close()
+
+def motor_level(board, motor_no):
+    #  signed count the chip holds for one motor, + for 'f'
+    registers = board.i2c.registers(board.CHIP_ADDRESS)
+    reg = board.MOT_REG_BASE + (2 * (motor_no - 1) * board.REG_OFFSET)
+    return (registers[reg] | (registers[reg + 1] << 8)) - (registers[reg + 4] | (registers[reg + 5] << 8))
+
+def check_range():
+    #  speeds outside 0 to 100 are capped as motorOn capped them, not read off the end of the table
+    board = PicoRobotics.KitronikPicoRobotics()
+    old_board = PicoRobotics.KitronikPicoRobotics()
+    kitronik = KitronikTable('range kitronik', board, 1)
+    agree = True
+    for speed in (-50, 0, 50, 100, 150):
+        kitronik.clk(speed)
+        old_board.motorOn(1, 'f', speed)
+        agree = agree and motor_level(board, 1) == motor_level(old_board, 1)
+        kitronik.anti(speed)
+        old_board.motorOn(1, 'r', speed)
+        agree = agree and motor_level(board, 1) == motor_level(old_board, 1)
+    motors = make_motors()
+    for motor in motors:
+        for speed, entry in ((150, 200), (-50, 100)):
+            if isinstance(motor, Motor.L298NMotor):
+                duty = motor.convert_speed_to_duty(speed)
+            else:
+                motor.set_speed(speed)
+                duty = motor.duty
+            agree = agree and duty == motor.duty_table[entry]
+    print ('clk and anti at -50, 150: capped to 0..100 as before:', agree)
+    for motor in motors + [kitronik]:
+        motor.close()
+
+if __name__ == "__main__":
+    print (module_name)
+    rng = random.Random(1)
+    speeds = [rng.uniform(0.0, 100.0) for n in range(5000)]
+    print ('one speed command, old conversion against the duty table:')
+    bench(speeds)
+    check_range()
+    print ('L298N duties with calibration [[0, 50, 100], [0, 70, 100]] and deadband 25:')
+    show_calibration()
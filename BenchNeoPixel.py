@@ -0,0 +1,342 @@
+module_name = 'BenchNeoPixel.py'
+module_description = 'Host benchmarks for neopixel.Neopixel. Created 18/Oct/2026'
+
+#  Run on a Linux host:   python3 BenchNeoPixel.py
+#  HostPico.StateMachine keeps every word put in sm.tx, so the old and new show() can be checked
+#  word for word.  Frames per second here are the Python side only: on the strip each LED also
+#  takes 30us (24 bits at 800kHz) or 40us (RGBW), which caps 1000 LEDs at 33 frames a second.
+#  bench_drive_loop sets the host StateMachine.word_us to that, so a blocking put() takes as long as
+#  the strip does, and the host rp2.DMA stays active for as long.
+
+import HostPico
+HostPico.install()
+
+import array
+import time
+import neopixel
+import NeoPixel_V16
+from neopixel import slice_maker
+
+try:
+    import tracemalloc
+except ImportError:   #  MicroPython
+    tracemalloc = None
+
+def legacy_show(strip, unshifted):
+    #  The original per-pixel loop, kept here as the reference; unshifted holds the values as they
+    #  were packed before the RGB shift moved into set_pixel
+    cut = 8
+    if strip.W_in_mode:
+        cut = 0
+    sm_put = strip.sm.put
+    for pixval in unshifted:
+        sm_put(pixval, cut)
+
+def legacy_set_pixel(strip, pixel_num, rgb_w, how_bright=None):
+    #  set_pixel before the brightness table: the float scaling on every write
+    if how_bright is None:
+        how_bright = strip.brightness()
+    sh_R, sh_G, sh_B, sh_W = strip.shift
+    bratio = how_bright / 255.0
+    red = round(rgb_w[0] * bratio)
+    green = round(rgb_w[1] * bratio)
+    blue = round(rgb_w[2] * bratio)
+    white = 0
+    if len(rgb_w) == 4 and strip.W_in_mode:
+        white = round(rgb_w[3] * bratio)
+    pix_value = white << sh_W | blue << sh_B | red << sh_R | green << sh_G
+    if type(pixel_num) is slice:
+        for i in range(*pixel_num.indices(strip.num_leds)):
+            strip.pixels[i] = pix_value
+    else:
+        strip.pixels[pixel_num] = pix_value
+
+def legacy_gradient(strip, pixel1, pixel2, left_rgb_w, right_rgb_w):
+    #  set_pixel_line_gradient before the brightness table, RGB only
+    r_diff = right_rgb_w[0] - left_rgb_w[0]
+    g_diff = right_rgb_w[1] - left_rgb_w[1]
+    b_diff = right_rgb_w[2] - left_rgb_w[2]
+    for i in range(pixel2 - pixel1 + 1):
+        fraction = i / (pixel2 - pixel1)
+        legacy_set_pixel(strip, pixel1 + i, (round(r_diff * fraction + left_rgb_w[0]),
+                                             round(g_diff * fraction + left_rgb_w[1]),
+                                             round(b_diff * fraction + left_rgb_w[2])))
+
+def legacy_clear(strip):
+    #  clear before the in-place fill: a new array from a new list every call
+    strip.pixels = array.array("I", [0] * strip.num_leds)
+
+def legacy_rotate_left(strip, num_of_pixels=1):
+    #  rotate_left before the ring offset: two slices and their sum, three new arrays a call
+    strip.pixels = strip.pixels[num_of_pixels:] + strip.pixels[:num_of_pixels]
+
+def make_strip(num_leds, mode, delay=0, dma=False):
+    strip = neopixel.Neopixel(num_leds, 0, 18, mode, delay=delay, dma=dma)
+    for i in range(num_leds):
+        strip[i] = strip.colorHSV((i * 65536) // num_leds, 255, 200) + ((i & 0xFF,) if strip.W_in_mode else ())
+    return strip
+
+def frames_per_second(run, sm, frames):
+    best = None
+    for r in range(5):
+        del sm.tx[:]
+        start = time.perf_counter()
+        for f in range(frames):
+            run()
+        seconds = time.perf_counter() - start
+        if best is None or seconds < best:
+            best = seconds
+    return frames / best
+
+def bench(mode):
+    print ('{:>8}{:>16}{:>16}{:>10}{:>12}{:>16}'.format('LEDS', 'OLD FRAMES/S', 'NEW FRAMES/S', 'SPEED UP', 'SAME WORDS', 'WIRE FRAMES/S'))
+    bits = 32 if 'W' in mode else 24
+    for num_leds in (10, 100, 1000):
+        strip = make_strip(num_leds, mode)
+        sm = strip.sm
+        unshifted = [pixval if strip.W_in_mode else pixval >> 8 for pixval in strip.pixels]
+        frames = max(20000 // num_leds, 5)
+        old_fps = frames_per_second(lambda: legacy_show(strip, unshifted), sm, frames)
+        new_fps = frames_per_second(strip.show, sm, frames)
+        del sm.tx[:]
+        legacy_show(strip, unshifted)
+        old_words = list(sm.tx)
+        del sm.tx[:]
+        strip.show()
+        print ('{:>8}{:>16.0f}{:>16.0f}{:>9.1f}x{:>12}{:>16.0f}'.format(
+            num_leds, old_fps, new_fps, new_fps / old_fps, str(old_words == list(sm.tx)),
+            1000000.0 / (num_leds * bits * 1.25)))
+
+def drive_loop(strip, seconds=1.0, tick_ms=10):
+    #  a control loop ticking every tick_ms that moves one lit pixel along and shows it; returns the
+    #  ticks run, frames sent, the longest show() in ms and the seconds the ticks really took
+    ticks = frames = 0
+    longest = 0.0
+    start = time.perf_counter()
+    next_tick = start
+    while next_tick - start < seconds:
+        now = time.perf_counter()
+        if now < next_tick:
+            time.sleep(next_tick - now)
+        next_tick += tick_ms / 1000.0
+        ticks += 1
+        if strip.dma is not None and strip.sending and strip.frame_done():
+            #  the frame end one shot, which the Pico's Timer would have run by now
+            if strip.pending:
+                frames += 1
+            strip.frame_timer.fire()
+        strip[(ticks - 1) % strip.num_leds] = (0, 0, 0)
+        strip[ticks % strip.num_leds] = (0, 0, 255)
+        begin = time.perf_counter()
+        if strip.show():
+            frames += 1
+        longest = max(longest, (time.perf_counter() - begin) * 1000.0)
+    return ticks, frames, longest, time.perf_counter() - start
+
+def bench_drive_loop(num_leds=1000, seconds=1.0, tick_ms=10):
+    #  a frame of 1000 LEDs takes 30.1ms, so with dma a frame goes out about every fourth 10ms tick,
+    #  the ticks in between latching the next
+    print ('{:>10}{:>12}{:>12}{:>14}{:>16}{:>12}'.format('SHOW', 'TICKS', 'FRAMES', 'SECONDS', 'LONGEST MS', 'SAME WORDS'))
+    sent = []
+    for dma in (False, True):
+        strip = make_strip(num_leds, 'GRB', delay=0.0001, dma=dma)
+        strip.sm.word_us = 24 * 1.25
+        ticks, frames, longest, taken = drive_loop(strip, seconds, tick_ms)
+        while strip.dma is not None and strip.sending:   #  the frames still going out, latched one too
+            if strip.frame_done():
+                strip.frame_timer.fire()
+        del strip.sm.tx[:]
+        strip.fill((10, 20, 30))
+        strip.show()
+        sent.append(list(strip.sm.tx))
+        strip.close()
+        print ('{:>10}{:>12}{:>12}{:>14.2f}{:>16.2f}{:>12}'.format(
+            'dma' if dma else 'put', ticks, frames, taken, longest, str(sent[0] == sent[-1])))
+
+def probe_latched_frame(num_leds=100):
+    #  with dma, a show() while a frame is going out must not be lost, and must go out as it was at
+    #  that show(), not as the pixels are by the time the frame before it ends
+    for brightness in (255, 100):
+        strip = make_strip(num_leds, 'GRB', dma=True)
+        strip.sm.word_us = 24 * 1.25
+        strip.brightness(brightness)
+        strip.fill((255, 0, 0))
+        first = strip.show()
+        strip.fill((0, 255, 0))
+        second = strip.show()
+        wanted = list(strip.back)   #  the green frame, packed by that show()
+        strip.clear()
+        strip.set_pixel(0, (0, 0, 255))
+        while strip.sending:
+            if strip.frame_done():
+                strip.frame_timer.fire()
+        sent = list(strip.sm.tx[-num_leds:])
+        strip.close()
+        print ('dma show() during a frame at brightness {}: first sent {}, second latched {}, second sent as shown {}'.format(
+            brightness, first, not second, sent == wanted))
+
+def bench_brightness(brightness=100):
+    #  a frame is a red to blue gradient over the strip, a green tenth filled over it, then show()
+    print ('{:>8}{:>16}{:>16}{:>10}{:>12}{:>14}'.format('LEDS', 'OLD FRAMES/S', 'NEW FRAMES/S', 'SPEED UP', 'SAME WORDS', 'PACK US'))
+    for num_leds in (10, 100, 1000):
+        strip = make_strip(num_leds, 'GRB')
+        strip.brightness(brightness)
+        sm = strip.sm
+        last = num_leds - 1
+        sector = slice_maker[0:num_leds // 10 + 1]
+        def old():
+            legacy_gradient(strip, 0, last, (255, 0, 0), (0, 0, 255))
+            legacy_set_pixel(strip, sector, (0, 255, 0))
+            sm.put(strip.pixels)
+        def new():
+            strip.set_pixel_line_gradient(0, last, (255, 0, 0), (0, 0, 255))
+            strip[sector] = (0, 255, 0)
+            strip.show()
+        frames = max(2000 // num_leds, 5)
+        old_fps = frames_per_second(old, sm, frames)
+        new_fps = frames_per_second(new, sm, frames)
+        del sm.tx[:]
+        old()
+        old_words = list(sm.tx)
+        del sm.tx[:]
+        new()
+        same = old_words == list(sm.tx)
+        pack_fps = frames_per_second(strip.pack, sm, frames)
+        print ('{:>8}{:>16.0f}{:>16.0f}{:>9.1f}x{:>12}{:>14.1f}'.format(
+            num_leds, old_fps, new_fps, new_fps / old_fps, str(same), 1000000.0 / pack_fps))
+
+def bytes_per_call(run, calls=100):
+    #  [largest bytes in use at once above the start, bytes still held after], per call for held
+    run()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    for n in range(calls):
+        run()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return [peak - base, (current - base) / calls]
+
+def us_per_call(run, calls=100, repeats=5):
+    best = None
+    for r in range(repeats):
+        start = time.perf_counter()
+        for n in range(calls):
+            run()
+        seconds = time.perf_counter() - start
+        if best is None or seconds < best:
+            best = seconds
+    return best * 1000000.0 / calls
+
+def check_line_slices(num_leds=20):
+    #  set_pixel_line covers the same pixels as the slice [pixel1:pixel2 + 1] it used to set,
+    #  negative and out of range ends included
+    old = make_strip(num_leds, 'GRB')
+    strip = make_strip(num_leds, 'GRB')
+    same = True
+    for pixel1, pixel2 in ((2, 5), (-5, -2), (-5, -1), (-3, 4), (-30, 3), (15, 40), (-40, 40), (5, 2), (0, 0)):
+        old.clear()
+        strip.clear()
+        if pixel2 >= pixel1:
+            legacy_set_pixel(old, slice_maker[pixel1:pixel2 + 1], (10, 20, 30))
+        strip.set_pixel_line(pixel1, pixel2, (10, 20, 30))
+        same = same and list(old.pixels) == list(strip.pixels)
+    print ('set_pixel_line against the old slices, negative and out of range ends:', same)
+
+def bench_allocations(num_leds=1000):
+    #  the old and new ways of clearing, filling and filling half the strip as a NeoPixel_V16 sector;
+    #  fill_sector includes its show(), with no latch delay and the host's record of words sent cleared
+    #  (that record is most of its peak, 4 bytes an LED, the same old and new).  The new calls' peak is
+    #  the memoryview slices of fill_range, freed at once and not growing with the strip.
+    if tracemalloc is None:
+        return
+    old = make_strip(num_leds, 'GRB')
+    strip = NeoPixel_V16.NeoPixel('bench', 18, num_leds, 'GRB')
+    strip.pixels.delay = 0
+    def old_sector():
+        legacy_set_pixel(old, slice_maker[start:end + 1], colour)
+        old.sm.put(old.pixels)
+        del old.sm.tx[:]
+    def new_sector():
+        strip.fill_sector('half', 'orange')
+        del strip.pixels.sm.tx[:]
+    strip.sectors['half'] = [num_leds // 4, (3 * num_leds) // 4 - 1]
+    start, end = strip.sectors['half']
+    colour = strip.colours['orange']
+    cases = [['clear', lambda: legacy_clear(old), strip.pixels.clear],
+             ['fill', lambda: legacy_set_pixel(old, slice_maker[:], colour), lambda: strip.pixels.fill(colour)],
+             ['fill_sector', old_sector, new_sector]]
+    print ('{:>12}{:>10}{:>10}{:>10}{:>16}{:>16}{:>12}{:>12}'.format(
+        'CALL', 'OLD US', 'NEW US', 'SPEED UP', 'OLD PEAK BYTES', 'NEW PEAK BYTES', 'OLD HELD', 'NEW HELD'))
+    for name, old_run, new_run in cases:
+        old_us = us_per_call(old_run)
+        new_us = us_per_call(new_run)
+        old_peak, old_held = bytes_per_call(old_run)
+        new_peak, new_held = bytes_per_call(new_run)
+        print ('{:>12}{:>10.1f}{:>10.1f}{:>9.1f}x{:>16}{:>16}{:>12.0f}{:>12.0f}'.format(
+            name, old_us, new_us, old_us / new_us, old_peak, new_peak, old_held, new_held))
+    strip.close()
+
+def bench_rotation(num_leds):
+    #  a chaser: rotate one to the left, then show, against the old rotation; the words sent must match.
+    #  The new rotation's bytes are CPython boxing the offset, a small int on the Pico; frame peaks are
+    #  mostly the host's record of words sent, 4 bytes an LED
+    old = make_strip(num_leds, 'GRB')
+    strip = make_strip(num_leds, 'GRB')
+    def old_frame():
+        legacy_rotate_left(old)
+        old.sm.put(old.pixels)
+        del old.sm.tx[:]
+    def new_frame():
+        strip.rotate_left()
+        strip.show()
+        del strip.sm.tx[:]
+    old_us = us_per_call(lambda: legacy_rotate_left(old))
+    new_us = us_per_call(strip.rotate_left)
+    old_peak, old_held = bytes_per_call(lambda: legacy_rotate_left(old))
+    new_peak, new_held = bytes_per_call(strip.rotate_left)
+    frame_peak = bytes_per_call(new_frame)[0]
+    old_frame_peak = bytes_per_call(old_frame)[0]
+    for n in range(num_leds // 3):
+        old_frame()
+        new_frame()
+    old.sm.put(old.pixels)
+    strip.show()
+    print ('{:>8}{:>10.2f}{:>10.2f}{:>9.1f}x{:>16}{:>16}{:>12}{:>16}{:>16}{:>12}'.format(
+        num_leds, old_us, new_us, old_us / new_us, old_peak, new_peak, new_held, old_frame_peak, frame_peak,
+        str(list(old.sm.tx) == list(strip.sm.tx))))
+
+def show_gamma(levels=(0, 32, 64, 96, 128, 160, 192, 224, 255)):
+    #  the byte sent for a color of 255 as brightness steps evenly, without and with gamma 2.5;
+    #  brightness() takes 0 as 1
+    strip = make_strip(1, 'GRB')
+    print ('{:>12}'.format('BRIGHTNESS') + ''.join(['{:>6}'.format(level) for level in levels]))
+    for gamma in (1.0, 2.5):
+        strip.gamma(gamma)
+        sent = []
+        for level in levels:
+            strip.brightness(level)
+            sent.append(strip.table[255])
+        print ('{:>12}'.format('gamma ' + str(gamma)) + ''.join(['{:>6}'.format(byte) for byte in sent]))
+
+if __name__ == "__main__":
+    print (module_name)
+    for mode in ('GRB', 'GRBW'):
+        print ('show(), mode', mode)
+        bench(mode)
+    print ('gradient and fill at brightness 100, float set_pixel against the brightness table:')
+    bench_brightness()
+    show_gamma()
+    for num_leds in (1000, 10000):
+        print (num_leds, 'GRB LEDs, the old calls against the in-place fill:')
+        bench_allocations(num_leds)
+    check_line_slices()
+    if tracemalloc is not None:
+        print ('rotate_left(1), old slices against the ring offset, and a chaser frame of rotate_left() then show():')
+        print ('{:>8}{:>10}{:>10}{:>10}{:>16}{:>16}{:>12}{:>16}{:>16}{:>12}'.format(
+            'LEDS', 'OLD US', 'NEW US', 'SPEED UP', 'OLD PEAK BYTES', 'NEW PEAK BYTES', 'NEW HELD',
+            'OLD FRAME PEAK', 'NEW FRAME PEAK', 'SAME WORDS'))
+        for num_leds in (100, 1000, 10000):
+            bench_rotation(num_leds)
+    print ('1000 GRB LEDs from a 10ms loop for 1s, blocking put against DMA:')
+    bench_drive_loop()
+    probe_latched_frame()
@@ -0,0 +1,81 @@
+module_name = 'BenchPulses.py'
+module_description = 'Host benchmarks for the FIT0441 pulse counters, Python IRQ against PIO. Created 18/Oct/2026'
+
+#  Run on a Linux host:   python3 BenchPulses.py
+#  HostPico models the count_pulses state machine edge by edge (HostPico.PulseCountModel), and
+#  machine.Pin.fall() gives an edge to both the IRQ handler and the state machine.
+
+import HostPico
+HostPico.install()
+
+import random
+import time
+import BenchSpeed
+import Motor_V07 as Motor
+
+now_us = BenchSpeed.now_us
+
+def make_motor(counter, n=0):
+    return Motor.FIT0441MotorWithPulses('bench ' + counter + ' ' + str(n), 2 + (3 * n), 3 + (3 * n), 4 + (3 * n),
+                                        counter=counter)
+
+def check_counts(no_edges=3000, seed=1):
+    #  the same edges to both counters, speeding up and slowing down; returns pulses counted by each
+    #  and the largest difference between their speed estimates, read every 20ms
+    rng = random.Random(seed)
+    BenchSpeed.virtual_clock()
+    now_us[0] = 1000000
+    motors = [make_motor('IRQ', 0), make_motor('PIO', 1)]
+    worst = 0.0
+    next_read = now_us[0] + 20000
+    for n in range(no_edges):
+        rpm = 20.0 + (140.0 * abs(((n // 500) % 2) - ((n % 500) / 500.0)))
+        now_us[0] += int(60000000.0 / (rpm * motors[0].pulses_per_rev) * rng.uniform(0.97, 1.03))
+        while now_us[0] >= next_read:
+            estimates = [motor.measure_rpm() for motor in motors]
+            worst = max(worst, abs(estimates[0] - estimates[1]))
+            next_read += 20000
+        for motor in motors:
+            motor.pulse_pin.fall()
+    counts = [motor.get_pulses() for motor in motors]
+    for motor in motors:
+        motor.close()
+    BenchSpeed.real_clock()
+    return counts, worst
+
+def best_ns(run, calls, repeats=20):
+    best = None
+    for r in range(repeats):
+        start = time.perf_counter()
+        for n in range(calls):
+            run()
+        seconds = time.perf_counter() - start
+        if best is None or seconds < best:
+            best = seconds
+    return best * 1000000000.0 / calls
+
+def bench_load(no_motors=4, rpm=159.0, period_ms=20):
+    #  Python time per second at full speed: the IRQ path runs per pulse, the PIO path only reads the
+    #  counter once per control period
+    motor = make_motor('IRQ')
+    pulses_per_s = rpm * motor.pulses_per_rev / 60.0
+    irq_ns = best_ns(lambda: motor.pulse_detected(None), 2000)
+    motor.close()
+    motor = make_motor('PIO')
+    read_ns = best_ns(motor.counter.read, 2000)
+    motor.close()
+    reads_per_s = 1000.0 / period_ms
+    print ('{:8}{:>14}{:>12}{:>16}{:>16}'.format('COUNTER', 'CALLS/S', 'NS/CALL', 'US/S, 1 MOTOR', 'US/S, ' + str(no_motors) + ' MOTORS'))
+    for name, calls, ns in (('IRQ', pulses_per_s, irq_ns), ('PIO', reads_per_s, read_ns)):
+        print ('{:8}{:>14.0f}{:>12.0f}{:>16.0f}{:>16.0f}'.format(
+            name, calls, ns, calls * ns / 1000.0, no_motors * calls * ns / 1000.0))
+
+if __name__ == "__main__":
+    print (module_name)
+    counts, worst = check_counts()
+    print ('3000 edges from 20 to 160 rpm: IRQ counted {}, PIO counted {}, max rpm difference {:.2f}'.format(
+        counts[0], counts[1], worst))
+    print ('Python time spent counting at 159 rpm, 270 pulses a turn:')
+    bench_load()
+    print ('closed loop on each counter:')
+    BenchSpeed.bench_side(counters=('IRQ', 'PIO'))
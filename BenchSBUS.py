@@ -0,0 +1,283 @@
+module_name = 'BenchSBUS.py'
+module_description = 'Host benchmarks for SBUSReceiver. Created 18/Oct/2026'
+
+#  Run on a Linux host:   python3 BenchSBUS.py [recorded_frames.bin]
+#  A recording is raw UART capture; every 25 byte 0x0F...0x00 frame in it is used.
+#  Without a recording a reproducible corpus of synthetic frames is generated.
+
+import HostPico
+HostPico.install()
+
+import _thread
+import array
+import random
+import sys
+import time
+import machine
+import SBUSReceiver_V06 as SBUSReceiver
+
+FRAME_LEN = 25
+
+def encode_frame(channels, flags=0):
+    #  channels is 16 values 0 to 2047, flags is byte 23 (digitals, lost, failsafe)
+    frame = bytearray(FRAME_LEN)
+    frame[0] = 0x0F
+    bits = 0
+    for i in range(16):
+        bits |= (channels[i] & 0x07FF) << (i * 11)
+    for i in range(22):
+        frame[1 + i] = (bits >> (i * 8)) & 0xFF
+    frame[23] = flags
+    frame[24] = 0x00
+    return frame
+
+def make_corpus(no_frames, seed=1):
+    rng = random.Random(seed)
+    corpus = []
+    channels = [1024] * 16
+    for n in range(no_frames):
+        for i in range(16):   #  random walk, like sticks being moved
+            channels[i] = min(2047, max(0, channels[i] + rng.randint(-40, 40)))
+        flags = rng.choice([0, 0, 0, 0, 0, 0, 1, 2, 3, 4])
+        corpus.append(encode_frame(channels, flags))
+    return corpus
+
+def load_corpus(file_name):
+    with open(file_name, 'rb') as f:
+        data = f.read()
+    corpus = []
+    i = 0
+    while i + FRAME_LEN <= len(data):
+        if data[i] == 0x0F and data[i + FRAME_LEN - 1] == 0x00:
+            corpus.append(bytearray(data[i:i + FRAME_LEN]))
+            i += FRAME_LEN
+        else:
+            i += 1
+    return corpus
+
+def legacy_decode_frame(rx):
+    #  The original bit-at-a-time decoder, kept here as the reference
+    for i in range(0, rx.SBUS_NUM_CHANNELS - 2):
+        rx.sbusChannels[i] = 0
+    byte_in_sbus = 1
+    bit_in_sbus = 0
+    ch = 0
+    bit_in_channel = 0
+    for i in range(0, 175):
+        if rx.sbusFrame[byte_in_sbus] & (1 << bit_in_sbus):
+            rx.sbusChannels[ch] |= (1 << bit_in_channel)
+        bit_in_sbus += 1
+        bit_in_channel += 1
+        if bit_in_sbus == 8:
+            bit_in_sbus = 0
+            byte_in_sbus += 1
+        if bit_in_channel == 11:
+            bit_in_channel = 0
+            ch += 1
+
+def check(corpus):
+    new_rx = SBUSReceiver.SBUSReceiver(machine.UART(0, 100000))
+    old_rx = SBUSReceiver.SBUSReceiver(machine.UART(1, 100000))
+    for frame in corpus:
+        new_rx.sbusFrame[:] = frame
+        old_rx.sbusFrame[:] = frame
+        new_rx.decode_frame()
+        legacy_decode_frame(old_rx)
+        new_channels = new_rx.get_rx_channels()
+        for i in range(15):
+            if new_channels[i] != old_rx.sbusChannels[i]:
+                return False
+        #  the legacy loop stops at bit 175 and so drops the top bit of channel 16
+        if (new_channels[15] & 0x03FF) != old_rx.sbusChannels[15]:
+            return False
+    return True
+
+def time_decoder(corpus, decode, rx):
+    start = time.perf_counter()
+    for frame in corpus:
+        rx.sbusFrame[:] = frame
+        decode()
+    return time.perf_counter() - start
+
+def bench_decode(corpus):
+    rx = SBUSReceiver.SBUSReceiver(machine.UART(0, 100000))
+    results = [['legacy bit loop', time_decoder(corpus, lambda: legacy_decode_frame(rx), rx)],
+               ['shift/mask', time_decoder(corpus, rx.decode_frame, rx)]]
+    print ('{:18}{:>14}{:>12}{:>10}{:>10}'.format('DECODER', 'FRAMES/S', 'US/FRAME', '% 7MS', '% 14MS'))
+    for name, seconds in results:
+        us_per_frame = seconds * 1000000.0 / len(corpus)
+        print ('{:18}{:>14.0f}{:>12.2f}{:>10.2f}{:>10.2f}'.format(
+            name, len(corpus) / seconds, us_per_frame, us_per_frame / 70.0, us_per_frame / 140.0))
+    print ('speed up: {:.1f}x'.format(results[0][1] / results[1][1]))
+
+def resync_run(mode, seed, garbage_len=200, poll_us=100, chunk_sizes=(1, 2, 3, 5, 8, 13, 32), limit_us=200000):
+    #  garbage then a frame every 7ms; returns bytes read, us after the garbage, polls and cpu seconds
+    #  up to the first valid frame, or None if no frame was decoded within limit_us
+    rng = random.Random(seed)
+    uart = HostPico.SimulatedUART(0, 100000, chunk_sizes=chunk_sizes, seed=seed)
+    uart.schedule(bytes(rng.randrange(256) for i in range(garbage_len)))
+    garbage_end_us = uart.line_free_us
+    for n, frame in enumerate(make_corpus(30, seed)):
+        uart.schedule(frame, garbage_end_us + rng.randint(0, 3000) + n * 7000)
+    rx = SBUSReceiver.SBUSReceiver(uart, mode)
+    polls = 0
+    cpu = 0.0
+    while uart.now_us < limit_us:
+        uart.advance(poll_us)
+        start = time.perf_counter()
+        rx.get_new_data()
+        cpu += time.perf_counter() - start
+        polls += 1
+        if rx.validSbusFrame > 0:
+            return uart.bytes_read, uart.now_us - garbage_end_us, polls, cpu
+    return None
+
+def bench_resync(runs=50):
+    print ('{:6}{:>8}{:>12}{:>14}{:>8}{:>12}'.format('MODE', 'SYNCED', 'BYTES', 'US AFTER JUNK', 'POLLS', 'CPU US'))
+    for mode in SBUSReceiver.SBUSReceiver.valid_modes:
+        results = [r for r in (resync_run(mode, seed) for seed in range(runs)) if r is not None]
+        if len(results) == 0:
+            print ('{:6}{:>8}'.format(mode, '0/' + str(runs)))
+            continue
+        averages = [sum(r[i] for r in results) / len(results) for i in range(4)]
+        print ('{:6}{:>8}{:>12.0f}{:>14.0f}{:>8.0f}{:>12.0f}'.format(
+            mode, str(len(results)) + '/' + str(runs), averages[0], averages[1], averages[2], averages[3] * 1000000.0))
+
+def count_torn(rx, read, reads):
+    #  a frame is torn if its 16 channels do not all carry the same value
+    torn = 0
+    for n in range(reads):
+        channels = read()
+        first = channels[0]
+        for i in range(1, 16):
+            if channels[i] != first:
+                torn += 1
+                break
+    return torn
+
+def bench_snapshot(reads=20000):
+    #  a second thread decodes frames whose channels are all equal while this thread reads them
+    frames = [encode_frame([v] * 16) for v in (100, 2000)]
+    rx = SBUSReceiver.SBUSReceiver(machine.UART(0, 100000))
+    rx.sbusFrame[:] = frames[0]
+    rx.decode_frame()
+    running = [True]
+    def writer():
+        n = 0
+        while running[0]:
+            rx.sbusFrame[:] = frames[n & 1]
+            rx.decode_frame()
+            n += 1
+        running[0] = None
+    old_interval = sys.getswitchinterval()
+    sys.setswitchinterval(0.00001)
+    _thread.start_new_thread(writer, ())
+    live = count_torn(rx, lambda: rx.sbusChannels, reads)   #  what thread_code used to share
+    out_channels = array.array('H', [0] * 18)
+    def snapshot():
+        rx.get_snapshot(out_channels)
+        return out_channels
+    start = time.perf_counter()
+    copied = count_torn(rx, snapshot, reads)
+    seconds = time.perf_counter() - start
+    running[0] = False
+    while running[0] is not None:
+        time.sleep(0.001)
+    sys.setswitchinterval(old_interval)
+    print ('torn reads of decode buffer:    {}/{}'.format(live, reads))
+    print ('torn reads of get_snapshot():   {}/{}  ({:.1f} us per read, no sleeping)'.format(
+        copied, reads, seconds * 1000000.0 / reads))
+
+def schedule_script(uart, script, seed=1):
+    #  script is a list of [frame period us, number of frames]; period 0 is a gap of that many us
+    at_us = 0
+    for period, count in script:
+        if period == 0:
+            at_us += count
+            continue
+        for frame in make_corpus(count, seed):
+            uart.schedule(frame, at_us)
+            at_us += period
+    return at_us
+
+def wakeup_run(frame_mode, script, poll_us=100):
+    uart = HostPico.SimulatedUART(0, 100000, chunk_sizes=(4, 8, 16))
+    end_us = schedule_script(uart, script)
+    rx = SBUSReceiver.SBUSReceiver(uart, 'BULK')
+    cpu = [0.0]
+    wakeups = 0
+    if frame_mode == 'IRQ':
+        rx.start_irq()
+        handler = uart.handler
+        def timed_handler(u):
+            start = time.perf_counter()
+            handler(u)
+            cpu[0] += time.perf_counter() - start
+        uart.handler = timed_handler
+    while uart.now_us < end_us:
+        uart.advance(poll_us)
+        if frame_mode == 'POLL':   #  thread_code: sleep_us(100) then get_new_data()
+            start = time.perf_counter()
+            rx.get_new_data()
+            cpu[0] += time.perf_counter() - start
+            wakeups += 1
+    if frame_mode == 'IRQ':
+        wakeups = rx.wakeups
+    seconds = end_us / 1000000.0
+    return rx.validSbusFrame, wakeups / seconds, cpu[0] * 1000000.0 / max(rx.validSbusFrame, 1), cpu[0] * 100.0 / seconds
+
+def bench_wakeups():
+    script = [[7000, 140], [0, 250000], [14000, 70]]   #  1s of digital, transmitter off, 1s of analog
+    print ('{:6}{:>8}{:>12}{:>16}{:>10}'.format('MODE', 'FRAMES', 'WAKEUPS/S', 'CPU US/FRAME', 'CPU %'))
+    for frame_mode in SBUSReceiver.SBUSReceiverMC6C.valid_frame_modes:
+        frames, rate, per_frame, percent = wakeup_run(frame_mode, script)
+        print ('{:6}{:>8}{:>12.0f}{:>16.1f}{:>10.2f}'.format(frame_mode, frames, rate, per_frame, percent))
+
+class PrintStream():   #  stands in for CommandStream
+    def send(self, message):
+        print ('   ', message)
+
+def bench_telemetry():
+    #  7ms frames with timing jitter, a noise burst and a run of failsafe frames, on the virtual clock
+    rng = random.Random(3)
+    uart = HostPico.SimulatedUART(0, 100000, chunk_sizes=(4, 8, 16))
+    corpus = make_corpus(300, 3)
+    at_us = 0
+    for n, frame in enumerate(corpus):
+        if n == 150:
+            uart.schedule(bytes(rng.randrange(256) for i in range(120)), at_us)
+            at_us = uart.line_free_us + 20000
+        if 200 <= n < 230:
+            frame[23] |= 0x0C
+        uart.schedule(frame, at_us)
+        at_us += 7000 + rng.randint(-300, 300)
+    rx = SBUSReceiver.SBUSReceiver(uart, 'BULK')
+    telemetry = rx.enable_telemetry('bench link', 50)
+    HostPico.clock_us = lambda: uart.now_us
+    rx.start_irq()
+    while uart.now_us < at_us:
+        uart.advance(100)
+    HostPico.clock_us = None
+    rep = telemetry.get_report()
+    for key in rep:
+        print ('   ', key, rep[key])
+    telemetry.dump(PrintStream())
+    telemetry.close()
+
+if __name__ == "__main__":
+    print (module_name)
+    if len(sys.argv) > 1:
+        corpus = load_corpus(sys.argv[1])
+    else:
+        corpus = make_corpus(20000)
+    print ('frames:', len(corpus))
+    print ('decoders agree:', check(corpus))
+    bench_decode(corpus)
+    print ('resync after 200 bytes of noise, chunked delivery, 100us polling:')
+    bench_resync()
+    print ('reader on one thread, decoder on another:')
+    bench_snapshot()
+    print ('polling thread against idle-line interrupt, scripted 7ms/gap/14ms frames:')
+    bench_wakeups()
+    print ('telemetry over a jittery link with noise and failsafe:')
+    bench_telemetry()
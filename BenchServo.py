@@ -0,0 +1,250 @@
+module_name = 'BenchServo.py'
+module_description = 'Host benchmarks for ColObjects.TrajectoryEngine and SequencePlayer driving PicoRobotics servos. Created 18/Oct/2026'
+
+#  Run on a Linux host:   python3 BenchServo.py
+#  Runs on a virtual clock: the engine's machine.Timer is fired every tick_ms as the Pico would.
+#  Kitronik_v14 is not imported, the engine is wired to the board exactly as Kitronik.__init__ does.
+
+import HostPico
+HostPico.install()
+
+import time
+import ColObjects_V16 as ColObjects
+import PicoRobotics
+
+now_us = [0]
+
+def virtual_clock():
+    HostPico.clock_us = lambda: now_us[0]
+
+def real_clock():
+    HostPico.clock_us = None
+
+STEPS = 20   #  Kitronik.Arm.steps
+DURATION = 2.0   #  Kitronik.Arm.duration
+
+def legacy_do_pose(board, pose, speed):
+    #  The original blocking Kitronik.Arm.do_pose, kept here as the reference; pose is
+    #  [[servo_no, start, target], ...] and the sleeps are added up rather than slept
+    blocked_ms = 0
+    interval_ms = int((DURATION / float(speed)) * 1000.0)
+    for i in range(STEPS):
+        for servo_no, start, target in pose:
+            board.servoWrite(servo_no, start + ((float(target - start) / STEPS) * i))
+            blocked_ms += interval_ms
+    for servo_no, start, target in pose:
+        board.servoWrite(servo_no, target)
+    return blocked_ms
+
+def make_board(pose):
+    board = PicoRobotics.KitronikPicoRobotics()
+    for servo_no, start, target in pose:
+        board.servoWrite(servo_no, start)
+    board.i2c.clear_counts()
+    return board
+
+def make_engine(board, tick_ms=20):
+    return ColObjects.TrajectoryEngine('bench trajectories', board.servoWrite, board.beginFrame,
+                                       board.commitFrame, no_channels=9, tick_ms=tick_ms, busy=board.frameOpen)
+
+def run_engine(engine, pose, speed, profile, on_tick=None):
+    #  returns the call time in us and the number of ticks to arrive
+    duration_ms = STEPS * len(pose) * int((DURATION / float(speed)) * 1000.0)
+    for servo_no, start, target in pose:
+        engine.positions[servo_no] = start
+    start = time.perf_counter()
+    move = engine.move([[servo_no, target] for servo_no, start, target in pose], duration_ms, profile)
+    call_us = (time.perf_counter() - start) * 1000000.0
+    ticks = 0
+    while not move.done:
+        now_us[0] += engine.tick_ms * 1000
+        engine.timer.fire()
+        ticks += 1
+        if on_tick is not None:
+            on_tick()
+    return call_us, ticks
+
+def bench_pose(pose, speed=20):
+    print ('pose', pose, 'speed', speed)
+    print ('{:22}{:>10}{:>10}{:>13}{:>14}{:>14}{:>12}'.format(
+        'PATH', 'CALL US', 'BLOCK MS', 'SERVO CALLS', 'TRANSACTIONS', 'ARRIVAL MS', 'SPREAD MS'))
+    virtual_clock()
+    board = make_board(pose)
+    start = time.perf_counter()
+    blocked_ms = legacy_do_pose(board, pose, speed)
+    call_us = (time.perf_counter() - start) * 1000000.0
+    #  each write is followed by its sleep, so the last write of a servo lands at the sum of
+    #  the sleeps before it
+    interval_ms = int((DURATION / float(speed)) * 1000.0)
+    last = [((STEPS - 1) * len(pose) + n) * interval_ms for n in range(len(pose))]
+    print ('{:22}{:>10.0f}{:>10}{:>13}{:>14}{:>14}{:>12}'.format(
+        'legacy do_pose', call_us, blocked_ms, (STEPS + 1) * len(pose), board.i2c.transactions,
+        blocked_ms, last[-1] - last[0]))
+    for profile in ColObjects.TrajectoryEngine.valid_profiles:
+        board = make_board(pose)
+        engine = make_engine(board)
+        now_us[0] = 0
+        arrived = {}
+        def on_tick():
+            for servo_no, start, target in pose:
+                if servo_no not in arrived and not engine.active[servo_no]:
+                    arrived[servo_no] = now_us[0] // 1000
+        call_us, ticks = run_engine(engine, pose, speed, profile, on_tick)
+        times = list(arrived.values())
+        print ('{:22}{:>10.0f}{:>10}{:>13}{:>14}{:>14}{:>12}'.format(
+            'engine ' + profile, call_us, 0, ticks * len(pose), board.i2c.transactions,
+            max(times), max(times) - min(times)))
+        engine.close()
+    real_clock()
+
+def bench_profiles(speed=20, tick_ms=20):
+    #  largest move in one tick, in degrees, for a single 90 degree move: the step the old
+    #  code made was 4.5 degrees every interval
+    print ('{:12}{:>14}{:>14}{:>14}'.format('PROFILE', 'TICKS', 'MAX STEP', 'FIRST STEP'))
+    virtual_clock()
+    for profile in ColObjects.TrajectoryEngine.valid_profiles:
+        board = make_board([[1, 0, 90]])
+        engine = make_engine(board, tick_ms)
+        now_us[0] = 0
+        steps = []
+        def on_tick():
+            steps.append(engine.positions[1])
+        call_us, ticks = run_engine(engine, [[1, 0, 90]], speed, profile, on_tick)
+        deltas = [steps[0]] + [steps[i] - steps[i - 1] for i in range(1, len(steps))]
+        print ('{:12}{:>14}{:>14.2f}{:>14.2f}'.format(profile, ticks, max(deltas), deltas[0]))
+        engine.close()
+    real_clock()
+
+def check_registers(pose, speed=20):
+    #  after the move the chip must hold the same servo registers as after the legacy code
+    virtual_clock()
+    old = make_board(pose)
+    legacy_do_pose(old, pose, speed)
+    new = make_board(pose)
+    engine = make_engine(new)
+    run_engine(engine, pose, speed, 'SCURVE')
+    engine.close()
+    real_clock()
+    low = PicoRobotics.KitronikPicoRobotics.SRV_REG_BASE
+    high = low + (8 * PicoRobotics.KitronikPicoRobotics.REG_OFFSET)
+    return old.i2c.registers(old.CHIP_ADDRESS)[low:high] == new.i2c.registers(new.CHIP_ADDRESS)[low:high]
+
+def make_player(board, tick_ms=20):
+    return ColObjects.SequencePlayer('bench sequences', board.servoRaw, board.beginFrame, board.commitFrame,
+                                     board.servoCount, tick_ms=tick_ms, busy=board.frameOpen)
+
+def bench_sequence(channels, start, keyframes, profile='TRAPEZOID', repeats=20):
+    #  the same keyframes through the engine, one move() per keyframe, and through a compiled sequence;
+    #  CPU is the best of the repeats per tick including the writes, the fake bus costing no time
+    print ('{:22}{:>10}{:>12}{:>14}{:>14}{:>14}'.format(
+        'PATH', 'TICKS', 'CPU US/TICK', 'TRANSACTIONS', 'TABLE BYTES', 'COMPILE US'))
+    pose = [[channel, start[j], start[j]] for j, channel in enumerate(channels)]
+    virtual_clock()
+    best = None
+    for r in range(repeats):
+        board = make_board(pose)
+        engine = make_engine(board)
+        for j, channel in enumerate(channels):
+            engine.positions[channel] = start[j]
+        ticks = 0
+        seconds = 0.0
+        counts = []
+        for positions, duration_ms in keyframes:
+            move = engine.move([[channel, positions[j]] for j, channel in enumerate(channels)], duration_ms, profile)
+            while not move.done:
+                now_us[0] += engine.tick_ms * 1000
+                begin = time.perf_counter()
+                engine.tick()
+                seconds += time.perf_counter() - begin
+                ticks += 1
+                counts.append([board.servoCount(engine.positions[channel]) for channel in channels])
+        engine.close()
+        if best is None or seconds < best:
+            best = seconds
+    engine_registers = board.i2c.registers(board.CHIP_ADDRESS)
+    print ('{:22}{:>10}{:>12.1f}{:>14}'.format('engine, per keyframe', ticks, best * 1000000.0 / ticks, board.i2c.transactions))
+    best = None
+    for r in range(repeats):
+        board = make_board(pose)
+        player = make_player(board)
+        begin = time.perf_counter()
+        sequence = player.compile(channels, start, keyframes, profile)
+        compile_us = (time.perf_counter() - begin) * 1000000.0
+        move = player.play(sequence)
+        seconds = 0.0
+        while not move.done:
+            begin = time.perf_counter()
+            player.tick()
+            seconds += time.perf_counter() - begin
+        player.close()
+        if best is None or seconds < best:
+            best = seconds
+    table_bytes = (len(sequence.table) * sequence.table.itemsize) + len(sequence.positions)
+    print ('{:22}{:>10}{:>12.1f}{:>14}{:>14}{:>14.0f}'.format(
+        'compiled sequence', len(sequence), best * 1000000.0 / len(sequence), board.i2c.transactions,
+        table_bytes, compile_us))
+    worst = 0
+    if len(counts) == len(sequence):
+        for t in range(len(sequence)):
+            for j in range(len(channels)):
+                worst = max(worst, abs(counts[t][j] - sequence.table[(t * len(channels)) + j]))
+    low = PicoRobotics.KitronikPicoRobotics.SRV_REG_BASE
+    high = low + (8 * PicoRobotics.KitronikPicoRobotics.REG_OFFSET)
+    print ('same ticks:', len(counts) == len(sequence), ' max count diff per tick:', worst,
+           ' final registers agree:', engine_registers[low:high] == board.i2c.registers(board.CHIP_ADDRESS)[low:high])
+    real_clock()
+
+def motor_register(board, motor):
+    return board.i2c.registers(board.CHIP_ADDRESS)[board.MOT_REG_BASE + (2 * (motor - 1) * board.REG_OFFSET)]
+
+def probe_trajectory_frame():
+    #  a tick landing inside the caller's begin_frame()/commit() must leave the caller's frame alone
+    virtual_clock()
+    board = PicoRobotics.KitronikPicoRobotics()
+    engine = make_engine(board)
+    engine.move([[1, 120]], 100)
+    board.beginFrame()
+    board.motorOn(1, 'f', 50)
+    now_us[0] += 20000
+    engine.timer.fire()
+    held = board.inFrame and motor_register(board, 1) == 0
+    board.commitFrame()
+    now_us[0] += 20000
+    engine.timer.fire()
+    print ('trajectory tick inside a frame: frame held', held, ' motor sent at commit', motor_register(board, 1) != 0,
+           ' servo moved on the next tick', engine.positions[1] > 0)
+    engine.close()
+    real_clock()
+
+def probe_sequence_frame():
+    virtual_clock()
+    board = PicoRobotics.KitronikPicoRobotics()
+    player = make_player(board)
+    sequence = player.compile([1], [90], [[[120], 100]])
+    player.play(sequence)
+    board.beginFrame()
+    board.motorOn(1, 'f', 50)
+    player.timer.fire()
+    held = board.inFrame and motor_register(board, 1) == 0 and player.index == 0
+    board.commitFrame()
+    player.timer.fire()
+    print ('sequence tick inside a frame: frame held', held, ' motor sent at commit', motor_register(board, 1) != 0,
+           ' sequence moved on the next tick', player.index == 1)
+    player.close()
+    real_clock()
+
+if __name__ == "__main__":
+    print (module_name)
+    arm = [[1, 90, 120], [2, 90, 130]]
+    print ('arm PARK to DOWN, registers agree:', check_registers(arm))
+    bench_pose(arm)
+    bench_pose([[1, 90, 120], [2, 90, 130], [3, 0, 180], [4, 180, 45]], 50)
+    print ('one servo 0 to 90 at speed 20, 20ms tick:')
+    bench_profiles()
+    print ('arm DOWN, UP, PARK routine from PARK, 1000/800/600ms:')
+    bench_sequence([1, 2], [90, 90], [[[120, 130], 1000], [[100, 110], 800], [[90, 90], 600]])
+    print ('four servos, the same timings:')
+    bench_sequence([1, 2, 3, 4], [90, 90, 0, 180],
+                   [[[120, 130, 180, 45], 1000], [[100, 110, 90, 90], 800], [[90, 90, 0, 180], 600]])
+    probe_trajectory_frame()
+    probe_sequence_frame()
@@ -0,0 +1,161 @@
+module_name = 'BenchSpeed.py'
+module_description = 'Host simulation of FIT0441MotorWithPulses closed-loop speed control. Created 18/Oct/2026'
+
+#  Run on a Linux host:   python3 BenchSpeed.py
+#  Runs on a virtual clock.  Each simulated motor is a first order plant, speed following duty with
+#  its own gain and time constant, whose encoder calls pulse_detected at the right moments; the
+#  control timer is fired every PID period as the Pico would.
+
+import HostPico
+HostPico.install()
+
+import time
+import Motor_V07 as Motor
+
+try:
+    import tracemalloc
+except ImportError:   #  MicroPython
+    tracemalloc = None
+
+now_us = [0]
+
+def virtual_clock():
+    HostPico.clock_us = lambda: now_us[0]
+
+def real_clock():
+    HostPico.clock_us = None
+
+class Plant():
+    #  rpm moves towards gain * duty% of max_rpm, less the load, with time constant tau_ms
+    def __init__(self, motor, gain, tau_ms, load_rpm=0.0):
+        self.motor = motor
+        self.gain = gain
+        self.tau_ms = tau_ms
+        self.load_rpm = load_rpm
+        self.rpm = 0.0
+        self.phase = 0.0   #  part of the way to the next pulse
+    def step(self, dt_us):
+        motor = self.motor
+        percent = (motor.min_speed_duty - motor.speed_pin.duty_u16()) * 100.0 / (motor.min_speed_duty - motor.max_speed_duty)
+        if motor.speed_pin.duty_u16() >= motor.stop_duty:
+            percent = 0.0
+        aim = max((self.gain * percent * motor.max_rpm / 100.0) - self.load_rpm, 0.0)
+        self.rpm += (aim - self.rpm) * (dt_us / 1000.0) / self.tau_ms
+        self.phase += self.rpm * motor.pulses_per_rev * dt_us / 60000000.0
+        if self.phase >= 1.0:
+            self.phase -= 1.0
+            motor.pulse_pin.fall()   #  to pulse_detected or the PIO counter
+
+def simulate(plants, ms, closed, step_us=100, load_at_ms=None, load_rpm=0.0, trace=None):
+    #  returns the control CPU time per call in us; trace gets [ms, rpm, rpm, ...] every 100ms
+    period_us = Motor.FIT0441MotorWithPulses.PERIOD_MS * 1000
+    next_control = now_us[0] + period_us
+    end = now_us[0] + (ms * 1000)
+    start_us = now_us[0]
+    control_seconds = 0.0
+    controls = 0
+    while now_us[0] < end:
+        now_us[0] += step_us
+        if load_at_ms is not None and now_us[0] - start_us == load_at_ms * 1000:
+            plants[0].load_rpm = load_rpm
+        for plant in plants:
+            plant.step(step_us)
+        if closed and now_us[0] >= next_control:
+            next_control += period_us
+            for plant in plants:
+                begin = time.perf_counter()
+                plant.motor.control()
+                control_seconds += time.perf_counter() - begin
+                controls += 1
+        if trace is not None and (now_us[0] - start_us) % 100000 == 0:
+            trace.append([(now_us[0] - start_us) // 1000] + [plant.rpm for plant in plants])
+    return control_seconds * 1000000.0 / max(controls, 1)
+
+def make_plants(gains=(0.85, 1.1), taus=(60.0, 90.0), counter='IRQ'):
+    #  two motors on one side that do not respond alike
+    plants = []
+    for n in range(len(gains)):
+        motor = Motor.FIT0441MotorWithPulses('bench motor ' + str(n), 2 + (3 * n), 3 + (3 * n), 4 + (3 * n),
+                                             counter=counter)
+        plants.append(Plant(motor, gains[n], taus[n]))
+    return plants
+
+def settle_ms(trace, column, target, band=0.05):
+    #  first time after which the speed stays within band of the target
+    settled = None
+    for row in trace:
+        if abs(row[column] - target) <= band * target:
+            if settled is None:
+                settled = row[0]
+        else:
+            settled = None
+    return settled
+
+def bench_side(rpm=80.0, ms=10000, counters=('IRQ',)):
+    #  both motors asked for the same speed; drift is the pulse difference at the end, in turns
+    print ('{:14}{:>12}{:>12}{:>12}{:>14}{:>14}{:>12}'.format(
+        'LOOP', 'RPM 0', 'RPM 1', 'SPREAD %', 'DRIFT TURNS', 'SETTLE MS', 'CPU US'))
+    virtual_clock()
+    for closed, counter in [[False, 'IRQ']] + [[True, counter] for counter in counters]:
+        now_us[0] = 1000000
+        plants = make_plants(counter=counter)
+        for plant in plants:
+            if closed:
+                plant.motor.set_rpm(rpm)
+            else:
+                plant.motor.clk(rpm * 100.0 / plant.motor.max_rpm)
+        trace = []
+        cpu_us = simulate(plants, ms, closed, trace=trace)
+        speeds = [plant.motor.measure_rpm() for plant in plants]
+        drift = abs(plants[0].motor.get_pulses() - plants[1].motor.get_pulses()) / plants[0].motor.pulses_per_rev
+        settled = [settle_ms(trace, n + 1, rpm) for n in range(len(plants))]
+        print ('{:14}{:>12.1f}{:>12.1f}{:>12.1f}{:>14.1f}{:>14}{:>12}'.format(
+            ('closed ' + counter) if closed else 'open', speeds[0], speeds[1], abs(speeds[0] - speeds[1]) * 100.0 / rpm,
+            drift, 'never' if None in settled else max(settled), '{:.1f}'.format(cpu_us) if closed else '-'))
+        for plant in plants:
+            plant.motor.close()
+    real_clock()
+
+def bench_load(rpm=80.0, load_rpm=25.0):
+    #  a load knocks 25 rpm off one motor at 2s; the loop pulls it back
+    virtual_clock()
+    now_us[0] = 1000000
+    plants = make_plants()
+    for plant in plants:
+        plant.motor.set_rpm(rpm)
+    trace = []
+    simulate(plants, 4000, True, load_at_ms=2000, load_rpm=load_rpm, trace=trace)
+    print ('{:>8}{:>10}{:>10}'.format('MS', 'RPM 0', 'RPM 1'))
+    for row in trace:
+        if row[0] % 400 == 0 or 2000 <= row[0] <= 2600:
+            print ('{:>8}{:>10.1f}{:>10.1f}'.format(row[0], row[1], row[2]))
+    for plant in plants:
+        plant.motor.close()
+    real_clock()
+
+def irq_bytes(pulses=1000):
+    #  bytes still held after the IRQ handler has run; on the Pico ticks_us() is a small int, here
+    #  a few boxed ints for the newest count are held, the same however many pulses
+    if tracemalloc is None:
+        return None
+    virtual_clock()
+    motor = Motor.FIT0441MotorWithPulses('bench irq', 20, 21, 22)
+    motor.pulse_detected(None)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for n in range(pulses):
+        now_us[0] += 100
+        motor.pulse_detected(None)
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    motor.close()
+    real_clock()
+    return held
+
+if __name__ == "__main__":
+    print (module_name)
+    print ('two motors on one side at 80 rpm for 10s, gains 0.85 and 1.1, time constants 60 and 90ms:')
+    bench_side()
+    print ('closed loop, 25 rpm of load on motor 0 at 2000ms:')
+    bench_load()
+    print ('bytes held after 1000 and 20000 pulse_detected calls:', irq_bytes(1000), irq_bytes(20000))
@@ -0,0 +1,164 @@
+module_name = 'BenchStepper.py'
+module_description = 'Host benchmarks for the PicoRobotics steppers. Created 18/Oct/2026'
+
+#  Run on a Linux host:   python3 BenchStepper.py
+#  Runs on a virtual clock: the stepper tick (1ms) calls serviceSteppers as the machine.Timer would.
+
+import HostPico
+HostPico.install()
+
+import time
+import utime
+import PicoRobotics
+
+now_us = [0]
+
+def virtual_clock():
+    HostPico.clock_us = lambda: now_us[0]
+
+def real_clock():
+    HostPico.clock_us = None
+
+def coil_state(board, stepper):
+    #  signed levels of the two coils as the chip holds them
+    registers = board.i2c.registers(board.CHIP_ADDRESS)
+    levels = []
+    for coil in (stepper.coilA, stepper.coilB):
+        reg = board.MOT_REG_BASE + (2 * (coil - 1) * board.REG_OFFSET)
+        fwd = registers[reg] | (registers[reg + 1] << 8)
+        rev = registers[reg + 4] | (registers[reg + 5] << 8)
+        levels.append(fwd - rev)
+    return tuple(levels)
+
+def legacy_step(board, motor, direction, steps, speed=20, holdPosition=False, on_step=None):
+    #  The original blocking KitronikPicoRobotics.step, kept here as the reference
+    if(direction =="f"):
+        directions = ["f", "r"]
+        coils = [((motor*2)-1),(motor*2)]
+    else:
+        directions = ["r", "f"]
+        coils = [(motor*2),((motor*2)-1)]
+    blocked_ms = 0
+    while steps > 0:
+        for direction in directions:
+            if(steps == 0):
+                break
+            for coil in coils:
+                board.motorOn(coil,direction,100)
+                if on_step is not None:
+                    on_step()
+                blocked_ms += speed   #  utime.sleep_ms(speed)
+                steps -=1
+                if(steps == 0):
+                    break
+    if(holdPosition == False):
+        for coil in coils:
+            board.motorOff(coil)
+    return blocked_ms
+
+def check_full_sequence(direction, steps=40):
+    #  the FULL table must visit the same coil states in the same order as the legacy loop
+    old_board = PicoRobotics.KitronikPicoRobotics()
+    old_states = []
+    legacy_step(old_board, 1, direction, steps, holdPosition=True,
+                on_step=lambda: old_states.append(coil_state(old_board, old_board.stepper(1))))
+    new_board = PicoRobotics.KitronikPicoRobotics()
+    new_board.setStepperDriver('CALLER')
+    stepper = new_board.stepper(1)
+    new_states = []
+    move = stepper.move(direction, steps, 1000.0)
+    while not move.done:
+        now_us[0] += 1000
+        stepper.service()
+        new_states.append(coil_state(new_board, stepper))
+    old_states = old_states[1:]   #  the legacy first step energises one coil only
+    for offset in range(4):
+        if new_states[offset:offset + len(old_states) - 4] == old_states[:len(old_states) - 4]:
+            return True
+    return False
+
+def run_move(board, stepper, direction, steps, rate, accel, tick_us=1000):
+    #  returns the move, virtual us taken, us the caller spent starting it, and step times
+    times = []
+    real_start = time.perf_counter()
+    move = stepper.move(direction, steps, rate, False, accel)
+    start_us = (time.perf_counter() - real_start) * 1000000.0
+    begin = now_us[0]
+    last = 0
+    while not move.done:
+        now_us[0] += tick_us
+        board.serviceSteppers()
+        if move.stepsDone != last:
+            last = move.stepsDone
+            times.append(now_us[0] - begin)
+    return move, now_us[0] - begin, start_us, times
+
+def bench_modes(steps=200, rate=200.0, accel=800.0):
+    print ('{:18}{:>8}{:>10}{:>10}{:>12}{:>12}{:>13}{:>12}'.format(
+        'MODE', 'STEPS', 'MOVE MS', 'PEAK/S', 'START US', 'TRANS/STEP', 'BUS US/STEP', 'POSITION'))
+    for mode, microsteps in (('FULL', 1), ('HALF', 2), ('MICRO', 8)):
+        board = PicoRobotics.KitronikPicoRobotics()
+        board.setStepperDriver('CALLER')
+        stepper = board.stepper(1, mode, microsteps)
+        board.i2c.clear_counts()
+        move, move_us, start_us, times = run_move(board, stepper, 'f', steps, rate, accel)
+        peak = 0.0
+        for i in range(1, len(times)):
+            if times[i] > times[i - 1]:
+                peak = max(peak, 1000000.0 / (times[i] - times[i - 1]))
+        print ('{:18}{:>8}{:>10.0f}{:>10.0f}{:>12.1f}{:>12.2f}{:>13.0f}{:>12}'.format(
+            mode + ' x' + str(stepper.microsteps), move.steps, move_us / 1000.0, peak, start_us,
+            board.i2c.transactions / move.steps, board.i2c.bus_us / move.steps, stepper.fullSteps()))
+
+def bench_blocking(steps=200, speed=20):
+    board = PicoRobotics.KitronikPicoRobotics()
+    blocked_ms = legacy_step(board, 1, 'f', steps, speed)
+    board = PicoRobotics.KitronikPicoRobotics()
+    board.setStepperDriver('CALLER')
+    start = time.perf_counter()
+    move = board.stepAngle(1, 'f', steps * 1.8, speed)
+    returned_us = (time.perf_counter() - start) * 1000000.0
+    ticks = 0
+    while not move.done:
+        now_us[0] += 1000
+        board.serviceSteppers()
+        ticks += 1
+    print ('legacy step({}) blocks the caller for {} ms'.format(steps, blocked_ms))
+    print ('stepAngle({:.0f}) returns in {:.0f} us; the move then takes {} ms of 1ms ticks'.format(
+        steps * 1.8, returned_us, ticks))
+
+def probe_caller_queue(steps=20, speed=1):
+    #  with the queue drained by the caller, step() services and drains for itself, and a TIMER
+    #  driver keeps its timer; the host Timer only runs when fired, so that one is stepped by hand here
+    board = PicoRobotics.KitronikPicoRobotics()
+    board.setStepperDriver('CALLER')
+    board.startQueue(drainer='CALLER')
+    move = board.step(1, 'f', steps, speed, holdPosition=True)
+    print ('step({}) with a CALLER queue: done {}, position {}, coils {}'.format(
+        steps, move.done, board.stepper(1).fullSteps(), coil_state(board, board.stepper(1))))
+    board.stopQueue()
+    board = PicoRobotics.KitronikPicoRobotics()
+    board.startQueue(drainer='CALLER')
+    move = board.stepAngle(1, 'f', steps * 1.8, speed, holdPosition=True)
+    timer = board.stepperTimer
+    while not move.done:
+        time.sleep(0.001)
+        timer.fire()
+        board.drainQueue()
+    print ('stepAngle({:.0f}) with a CALLER queue and the TIMER driver: timer kept {}, position {}, coils {}'.format(
+        steps * 1.8, timer is not None, board.stepper(1).fullSteps(), coil_state(board, board.stepper(1))))
+    board.stopQueue()
+    try:
+        board.step(1, 'f', steps, 0)
+    except Exception as e:
+        print ('step() at speed 0:', e)
+
+if __name__ == "__main__":
+    print (module_name)
+    virtual_clock()
+    print ('FULL table against the legacy step sequence: f', check_full_sequence('f'), ' r', check_full_sequence('r'))
+    bench_blocking()
+    print ('200 full steps, 200 full steps/s top rate, 800 steps/s/s ramps, 100kHz I2C:')
+    bench_modes()
+    real_clock()
+    probe_caller_queue()
@@ -4,6 +4,8 @@ module_decription = 'Foundation abstract objects. Created 11/Aug/2023'
 if __name__ == "__main__":
     print (module_name, 'starting')
 
+import array
+import machine
 import math
 import utime
 
@@ -40,35 +42,736 @@ class ColObj():
     def close(self):
         ColObj.allocated[self.name] = ColObj.free_code
 
-class Interpolator(ColObj):
+class Curve():
+    #  The working of Interpolator, kept apart from ColObj so a module on another ColObjects version
+    #  can register its interpolators in its own allocated list: class X(Curve, ThatColObj).
+    #  Everything is checked here, before the name is registered; error is the ColError raised.
+    error = ColError
+    SCAN_SEGMENTS = 8   #  up to this many segments interpolate() scans, above it bisects
     def __init__(self, name, keys, values): # arrays of matching pairs
                                             # keys ascending integers
                                             # values any floats
-        super().__init__(name)
+        if len(keys) != len(values):
+            raise self.error('**** ' + name + ' needs one value per key')
+        if len(keys) < 2:
+            raise self.error('**** ' + name + ' needs at least two keys')
+        for i in range(1, len(keys)):
+            if keys[i] <= keys[i - 1]:
+                raise self.error('**** ' + name + ' keys must be ascending')
         self.keys = keys
         self.values = values
+        #  Each segment i (keys[i] to keys[i+1]) is stored as value = intercept + slope * key
+        #  so interpolate() is a search plus one multiply and add.  Lists rather than arrays: an
+        #  array('d') makes a new float on every read, which costs more than the search saves
+        self.last = len(keys) - 1
+        self.key_array = array.array('d', keys)
+        self.key_list = list(keys)
+        self.value_list = list(values)
+        self.slopes = [0.0] * self.last
+        self.intercepts = [0.0] * self.last
+        for i in range(self.last):
+            slope = (values[i + 1] - values[i]) / (keys[i + 1] - keys[i])
+            self.slopes[i] = slope
+            self.intercepts[i] = values[i] - (slope * keys[i])
     def interpolate(self, in_key):  #  input is integer
         if in_key is None:
             return None
-        below_ok = False
-        above_ok = False
-        for i in range(len(self.keys)):
-            if in_key == self.keys[i]:
-                return self.values[i]
-            if in_key > self.keys[i]:
-                below_key = self.keys[i]
-                below_value = self.values[i]
-                below_ok = True
-            if in_key < self.keys[i]:
-                above_key = self.keys[i]
-                above_value = self.values[i]
-                above_ok = True
-                break
-        if above_ok and below_ok:
-            out_value = below_value + (((in_key - below_key) / (above_key - below_key)) * (above_value - below_value))
-            return out_value
+        keys = self.key_list
+        if in_key < keys[0] or in_key > keys[self.last]:
+            return None
+        if self.last <= Curve.SCAN_SEGMENTS:
+            #  short curves, as every deployed one is: a scan beats the bisection's bookkeeping
+            high = 1
+            while in_key > keys[high]:
+                high += 1
+            low = high - 1
+        else:
+            low = 0
+            high = self.last
+            while high - low > 1:
+                middle = (low + high) >> 1
+                if in_key < keys[middle]:
+                    high = middle
+                else:
+                    low = middle
+        if in_key == keys[high]:
+            return self.value_list[high]
+        if in_key == keys[low]:
+            return self.value_list[low]
+        return self.intercepts[low] + (self.slopes[low] * in_key)
+
+class LUTCurve(Curve):
+    def __init__(self, name, keys, values, low=None, high=None, step=1, max_bytes=4096):
+                                            # low to high is the integer input domain, defaults to the keys
+                                            # outputs are quantised to multiples of step
+                                            # the table must fit in max_bytes
+        if low is None:
+            low = keys[0]
+        if high is None:
+            high = keys[-1]
+        if low < keys[0] or high > keys[-1] or low > high:
+            raise self.error('**** ' + name + ' domain must lie within the keys')
+        no_entries = int(high) - int(low) + 1
+        if no_entries > max_bytes:   #  over budget at even a byte an entry; checked before any allocation
+            raise self.error('**** ' + name + ' table needs at least ' + str(no_entries) +
+                             ' bytes, budget is ' + str(max_bytes))
+        Curve.__init__(self, name, keys, values)
+        self.low = int(low)
+        self.high = int(high)
+        self.step = step
+        #  a straight-line curve is at its extremes at the ends of the domain or at a key inside it
+        extremes = [int(round(Curve.interpolate(self, in_key) / step))
+                    for in_key in [self.low, self.high] + [key for key in keys if self.low < key < self.high]]
+        smallest = min(extremes)
+        biggest = max(extremes)
+        if smallest >= -128 and biggest <= 127:
+            typecode = 'b'
+            item_bytes = 1
+        elif smallest >= -32768 and biggest <= 32767:
+            typecode = 'h'
+            item_bytes = 2
         else:
+            raise self.error('**** ' + name + ' values too big for a table, use a bigger step')
+        if no_entries * item_bytes > max_bytes:
+            raise self.error('**** ' + name + ' table needs ' + str(no_entries * item_bytes) +
+                             ' bytes, budget is ' + str(max_bytes))
+        #  table[in_key - low] is the output in steps, filled in place
+        self.table = array.array(typecode, bytearray(no_entries * item_bytes))
+        for i in range(no_entries):
+            self.table[i] = int(round(Curve.interpolate(self, self.low + i) / step))
+    def __str__(self):
+        return (self.name + ' table ' + str(self.low) + ' to ' + str(self.high) +
+                ' in steps of ' + str(self.step))
+    def interpolate(self, in_key):  #  input is integer
+        if in_key is None:
+            return None
+        if in_key < self.low or in_key > self.high:
+            return Curve.interpolate(self, in_key)   #  still on the curve, just outside the table
+        return self.table[in_key - self.low] * self.step
+
+class Interpolator(Curve, ColObj):
+    def __init__(self, name, keys, values):
+        Curve.__init__(self, name, keys, values)
+        ColObj.__init__(self, name)
+
+class LUTInterpolator(LUTCurve, ColObj):
+    def __init__(self, name, keys, values, low=None, high=None, step=1, max_bytes=4096):
+        LUTCurve.__init__(self, name, keys, values, low, high, step, max_bytes)
+        ColObj.__init__(self, name)
+
+class ChannelMap(ColObj):
+    def __init__(self, name, mapping, step=1):  #  mapping is a list of [channel name, input index, keys, values]
+                                                #  one output per entry, in mapping order
+        super().__init__(name)
+        self.names = []
+        self.interpolators = []
+        self.indices = array.array('B', [entry[1] for entry in mapping])
+        try:
+            for entry in mapping:
+                self.names.append(entry[0])
+                self.interpolators.append(LUTInterpolator(name + ' ' + entry[0], entry[2], entry[3], step=step))
+        except ColError:   #  a bad curve: give back the names taken so far
+            for interpolator in self.interpolators:
+                interpolator.close()
+            super().close()
+            raise
+        self.tables = [interpolator.table for interpolator in self.interpolators]
+        self.lows = array.array('l', [interpolator.low for interpolator in self.interpolators])
+        self.highs = array.array('l', [interpolator.high for interpolator in self.interpolators])
+        self.step = step
+        self.size = len(mapping)
+        self.valid = bytearray(self.size)   #  1 where the last convert() had the input on the curve
+    def __str__(self):
+        return self.name + ': ' + ', '.join(self.names)
+    def new_output(self):
+        return array.array('f', [0.0] * self.size)
+    def index(self, channel_name):
+        return self.names.index(channel_name)
+    def convert(self, raws, outputs):  #  writes every channel into outputs, allocating nothing
+                                       #  returns how many inputs were off the curve (those outputs are 0)
+        bad = 0
+        for i in range(self.size):
+            raw = raws[self.indices[i]]
+            low = self.lows[i]
+            if low <= raw <= self.highs[i]:
+                outputs[i] = self.tables[i][raw - low] * self.step
+                self.valid[i] = 1
+            else:
+                outputs[i] = 0
+                self.valid[i] = 0
+                bad += 1
+        return bad
+    def close(self):
+        for interpolator in self.interpolators:
+            interpolator.close()
+        super().close()
+
+class KinematicMixer(ColObj):
+
+    valid_modes = ['NONE', 'CLAMP', 'RATIO', 'PRIORITY']  #  NONE leaves the outputs as mixed
+                                                          #  CLAMP cuts each output at the limit
+                                                          #  RATIO scales so the biggest output matches the biggest input
+                                                          #  PRIORITY keeps the priority input and gives up the others first
+    MAX_INPUTS = 4
+
+    #  name: [input names, output names, one row of input coefficients per output, priority input or -1]
+    geometries = {
+        'TANK':         [['left', 'right'],
+                         ['left', 'right'],
+                         [[1, 0],
+                          [0, 1]], -1],
+        'DIFFERENTIAL': [['throttle', 'steering'],
+                         ['left', 'right'],
+                         [[1,  1],
+                          [1, -1]], 1],
+        'MECANUM':      [['fore_and_aft', 'spin', 'crab'],
+                         ['left_front', 'right_front', 'left_back', 'right_back'],
+                         [[1,  1,  1],
+                          [1, -1, -1],
+                          [1,  1, -1],
+                          [1, -1,  1]], 1]}
+
+    def check_geometry(geometry):   #  returns [geometry name, geometry list], or raises ColError
+        if isinstance(geometry, str):
+            if geometry not in KinematicMixer.geometries:
+                raise ColError('**** geometry ' + geometry + ' not in ' + str(list(KinematicMixer.geometries)))
+            return [geometry, KinematicMixer.geometries[geometry]]
+        input_names, output_names, rows, priority = geometry
+        if len(rows) != len(output_names):
+            raise ColError('**** geometry needs one row per output')
+        for row in rows:
+            if len(row) != len(input_names):
+                raise ColError('**** geometry needs one coefficient per input in every row')
+        if len(input_names) > KinematicMixer.MAX_INPUTS:
+            raise ColError('**** geometry has more than ' + str(KinematicMixer.MAX_INPUTS) + ' inputs')
+        return ['CUSTOM', geometry]
+
+    def __init__(self, name, geometry, mode='CLAMP', limit=100.0):  #  geometry is a key of geometries or a list like them
+        if mode not in KinematicMixer.valid_modes:
+            raise ColError('**** mixer mode ' + mode + ' not in ' + str(KinematicMixer.valid_modes))
+        geometry_name, geometry = KinematicMixer.check_geometry(geometry)
+        super().__init__(name)
+        self.geometry = geometry_name
+        input_names, output_names, rows, priority = geometry
+        self.mode = mode
+        self.limit = limit
+        self.input_names = input_names
+        self.output_names = output_names
+        self.no_inputs = len(input_names)
+        self.no_outputs = len(output_names)
+        #  padded to MAX_INPUTS so apply() is one fixed width multiply-accumulate per output
+        padding = [0.0] * (KinematicMixer.MAX_INPUTS - self.no_inputs)
+        self.rows = tuple([tuple([float(c) for c in row] + padding) for row in rows])
+        self.priority = priority
+        self.inputs = [0.0] * KinematicMixer.MAX_INPUTS   #  reused by mix_into(), the padding stays 0
+        self.fixed = array.array('f', [0.0] * self.no_outputs)   #  the priority input's share of each output
+        self.outputs = array.array('f', [0.0] * self.no_outputs)
+    def __str__(self):
+        return self.name + ' ' + self.geometry + ' ' + self.mode
+    def new_output(self):
+        return array.array('f', [0.0] * self.no_outputs)
+    def apply(self, inputs, outputs=None, magnitude=None):
+                                            #  one multiply-accumulate pass of the inputs through the matrix;
+                                            #  inputs has MAX_INPUTS entries, those past no_inputs 0
+                                            #  magnitude overrides the RATIO target (biggest input by default)
+        if outputs is None:
+            outputs = self.outputs
+        x0 = inputs[0]
+        x1 = inputs[1]
+        x2 = inputs[2]
+        x3 = inputs[3]
+        biggest = 0.0
+        i = 0
+        for row in self.rows:
+            total = (row[0] * x0) + (row[1] * x1) + (row[2] * x2) + (row[3] * x3)
+            outputs[i] = total
+            if total > biggest:
+                biggest = total
+            elif -total > biggest:
+                biggest = -total
+            i += 1
+        mode = self.mode
+        limit = self.limit
+        if mode == 'RATIO':
+            if magnitude is None:
+                magnitude = 0.0
+                for i in range(self.no_inputs):
+                    if abs(inputs[i]) > magnitude:
+                        magnitude = abs(inputs[i])
+            ratio = 0.0 if biggest == 0 else magnitude / biggest
+            for i in range(self.no_outputs):
+                outputs[i] = outputs[i] * ratio
+            biggest = magnitude
+        elif mode == 'PRIORITY' and biggest > limit and self.priority >= 0:
+            #  the largest share of the other inputs that keeps every output within the limit
+            p = self.priority
+            xp = inputs[p]
+            fixed = self.fixed
+            scale = 1.0
+            for i in range(self.no_outputs):
+                fixed[i] = self.rows[i][p] * xp
+                rest = abs(outputs[i] - fixed[i])
+                if rest > 0:
+                    room = limit - abs(fixed[i])
+                    if room < rest * scale:
+                        scale = room / rest if room > 0 else 0.0
+            for i in range(self.no_outputs):
+                outputs[i] = fixed[i] + ((outputs[i] - fixed[i]) * scale)
+        if mode != 'NONE' and biggest > limit:
+            for i in range(self.no_outputs):
+                x = outputs[i]
+                if x > limit:
+                    outputs[i] = limit
+                elif x < -limit:
+                    outputs[i] = -limit
+        return outputs
+    def mix_into(self, a, b, c=0, outputs=None, magnitude=None):   #  inputs in the order of input_names
+        inputs = self.inputs
+        inputs[0] = a
+        inputs[1] = b
+        if self.no_inputs > 2:
+            inputs[2] = c
+        return self.apply(inputs, outputs, magnitude)
+
+class CompiledMix():
+
+    #  A two input, two output geometry worked out as four scalars and clamped to a range per output,
+    #  for the drive classes' tick: mix() returns the whole speeds they send, allocating nothing
+    #  when the coefficients are whole (they are kept as ints then).  Not a ColObj, so a class
+    #  without a name of its own can hold one.
+
+    def __init__(self, geometry, limits=((-100, 100), (-100, 100))):   #  limits is [lowest, highest] per output
+        geometry_name, geometry = KinematicMixer.check_geometry(geometry)
+        input_names, output_names, rows, priority = geometry
+        if len(input_names) != 2 or len(output_names) != 2:
+            raise ColError('**** CompiledMix needs two inputs and two outputs, not ' + geometry_name)
+        coefficients = [int(c) if c == int(c) else float(c) for c in rows[0] + rows[1]]
+        self.geometry = geometry_name
+        self.r00, self.r01, self.r10, self.r11 = coefficients
+        self.low0, self.high0 = limits[0]
+        self.low1, self.high1 = limits[1]
+    def mix(self, a, b):   #  returns int(output 0), int(output 1), each clamped to its limits first
+        first = (self.r00 * a) + (self.r01 * b)
+        second = (self.r10 * a) + (self.r11 * b)
+        if first > self.high0:
+            first = self.high0
+        elif first < self.low0:
+            first = self.low0
+        if second > self.high1:
+            second = self.high1
+        elif second < self.low1:
+            second = self.low1
+        return int(first), int(second)
+
+class MecanumMixer(KinematicMixer):
+
+    valid_modes = ['RATIO', 'CLAMP', 'PRIORITY']  #  PRIORITY keeps spin and gives up fore/aft and crab first
+
+    def __init__(self, name, mode='RATIO', crab_signs=(1, -1, -1, 1), limit=100.0):
+                                            # wheels are in the order left front, right front, left back, right back
+                                            # spin is always +, -, +, -
+        if mode not in MecanumMixer.valid_modes:
+            raise ColError('**** mixer mode ' + mode + ' not in ' + str(MecanumMixer.valid_modes))
+        input_names, output_names, rows, priority = KinematicMixer.geometries['MECANUM']
+        rows = [[row[0], row[1], crab_signs[i]] for i, row in enumerate(rows)]
+        super().__init__(name, [input_names, output_names, rows, priority], mode, limit)
+        self.geometry = 'MECANUM'
+        self.lf_crab, self.rf_crab, self.lb_crab, self.rb_crab = [float(sign) for sign in crab_signs]
+    def mix_into(self, fore_and_aft, spin, crab=0, outputs=None, magnitude=None):
+                                            #  writes the four wheel levels into outputs (default self.outputs)
+                                            #  RATIO and CLAMP are worked out here in scalars, PRIORITY by apply()
+        if self.mode == 'PRIORITY':
+            inputs = self.inputs
+            inputs[0] = fore_and_aft
+            inputs[1] = spin
+            inputs[2] = crab
+            return self.apply(inputs, outputs, magnitude)
+        if outputs is None:
+            outputs = self.outputs
+        lf = fore_and_aft + spin + (self.lf_crab * crab)
+        rf = fore_and_aft - spin + (self.rf_crab * crab)
+        lb = fore_and_aft + spin + (self.lb_crab * crab)
+        rb = fore_and_aft - spin + (self.rb_crab * crab)
+        limit = self.limit
+        if self.mode == 'RATIO':
+            if magnitude is None:
+                magnitude = abs(fore_and_aft)
+                if abs(spin) > magnitude:
+                    magnitude = abs(spin)
+                if abs(crab) > magnitude:
+                    magnitude = abs(crab)
+            biggest = abs(lf)
+            if abs(rf) > biggest:
+                biggest = abs(rf)
+            if abs(lb) > biggest:
+                biggest = abs(lb)
+            if abs(rb) > biggest:
+                biggest = abs(rb)
+            ratio = 0.0 if biggest == 0 else magnitude / biggest
+            lf = lf * ratio
+            rf = rf * ratio
+            lb = lb * ratio
+            rb = rb * ratio
+        outputs[0] = lf if -limit <= lf <= limit else (limit if lf > 0 else -limit)
+        outputs[1] = rf if -limit <= rf <= limit else (limit if rf > 0 else -limit)
+        outputs[2] = lb if -limit <= lb <= limit else (limit if lb > 0 else -limit)
+        outputs[3] = rb if -limit <= rb <= limit else (limit if rb > 0 else -limit)
+        return outputs
+
+def trajectory_fraction(profile, u):   #  share of the distance covered after share u of the time
+    #  profile is the index into TrajectoryEngine.valid_profiles
+    if profile == 0:
+        return u
+    if profile == 1:
+        if u < 1.0 / 3.0:
+            return 2.25 * u * u
+        if u < 2.0 / 3.0:
+            return (1.5 * u) - 0.25
+        v = 1.0 - u
+        return 1.0 - (2.25 * v * v)
+    return u * u * u * (10.0 + (u * ((6.0 * u) - 15.0)))
+
+class TrajectoryMove():   #  what TrajectoryEngine.move() hands back
+    def __init__(self, engine, channels):
+        self.engine = engine
+        self.remaining = channels   #  channels still moving
+        self.done = channels == 0
+        self.cancelled = False
+    def wait(self, timeout_ms=None):   #  False on timeout; ticks the engine itself if nothing else does
+        start = utime.ticks_ms()
+        while not self.done:
+            if (timeout_ms is not None) and (utime.ticks_diff(utime.ticks_ms(), start) > timeout_ms):
+                return False
+            if self.engine.driver == 'CALLER':
+                self.engine.tick()
+            utime.sleep_ms(1)
+        return True
+    async def wait_async(self, period_ms=5):
+        try:
+            import uasyncio as asyncio
+        except ImportError:
+            import asyncio
+        while not self.done:
+            await asyncio.sleep(period_ms / 1000.0)
+        return not self.cancelled
+
+class TrajectoryEngine(ColObj):
+
+    valid_profiles = ['LINEAR', 'TRAPEZOID', 'SCURVE']   #  TRAPEZOID spends a third each accelerating, cruising, braking
+                                                         #  SCURVE is minimum jerk (no step in acceleration)
+    valid_drivers = ['TIMER', 'CALLER']
+
+    def __init__(self, name, write, begin=None, commit=None, no_channels=16, tick_ms=20, driver='TIMER', busy=None):
+        #  write(channel, position) sets one output; begin() and commit() bracket each tick's writes
+        #  so they can go out as one burst; while busy() is True someone else's burst is open and
+        #  the tick is left to the next one
+        super().__init__(name)
+        if driver not in TrajectoryEngine.valid_drivers:
+            raise ColError('**** trajectory driver ' + driver + ' not in ' + str(TrajectoryEngine.valid_drivers))
+        self.write = write
+        self.begin = begin
+        self.commit = commit
+        self.busy = busy
+        self.no_channels = no_channels
+        self.tick_ms = tick_ms
+        self.driver = driver
+        self.timer = None
+        self.active = bytearray(no_channels)
+        self.profiles = bytearray(no_channels)
+        self.starts = array.array('f', [0.0] * no_channels)
+        self.targets = array.array('f', [0.0] * no_channels)
+        self.positions = array.array('f', [0.0] * no_channels)   #  last position written
+        self.start_ticks = [0] * no_channels
+        self.durations = [0] * no_channels
+        self.owners = [None] * no_channels   #  object whose current_position follows the channel
+        self.moves = [None] * no_channels
+        self.no_active = 0
+    def __str__(self):
+        return self.name + ' ' + str(self.no_active) + ' moving'
+    def move(self, moves, duration_ms, profile='TRAPEZOID'):
+        #  moves is a list of [channel, target] or [channel, target, owner]; all arrive together
+        #  after duration_ms.  A channel already moving is taken over from where it is.
+        if profile not in TrajectoryEngine.valid_profiles:
+            raise ColError('**** trajectory profile ' + profile + ' not in ' + str(TrajectoryEngine.valid_profiles))
+        handle = TrajectoryMove(self, len(moves))
+        now = utime.ticks_ms()
+        for entry in moves:
+            channel = entry[0]
+            owner = entry[2] if len(entry) > 2 else None
+            self.cancel(channel)
+            if owner is not None:
+                self.positions[channel] = owner.current_position
+            self.starts[channel] = self.positions[channel]
+            self.targets[channel] = entry[1]
+            self.start_ticks[channel] = now
+            self.durations[channel] = max(int(duration_ms), 1)
+            self.profiles[channel] = TrajectoryEngine.valid_profiles.index(profile)
+            self.owners[channel] = owner
+            self.moves[channel] = handle
+            self.active[channel] = 1
+            self.no_active += 1
+        if self.driver == 'TIMER' and self.timer is None and self.no_active > 0:
+            self.timer = machine.Timer(-1)
+            self.timer.init(mode=machine.Timer.PERIODIC, period=self.tick_ms, callback=lambda timer: self.tick())
+        return handle
+    def release(self, channel, cancelled):
+        self.active[channel] = 0
+        self.no_active -= 1
+        handle = self.moves[channel]
+        self.moves[channel] = None
+        handle.remaining -= 1
+        if cancelled:
+            handle.cancelled = True
+        if handle.remaining == 0:
+            handle.done = True
+    def cancel(self, channel):   #  stop one channel where it is
+        if self.active[channel]:
+            self.release(channel, True)
+    def tick(self):   #  advance every moving channel and write them all in one burst
+        if self.no_active == 0:
+            if self.timer is not None:
+                self.timer.deinit()
+                self.timer = None
+            return
+        if self.busy is not None and self.busy():
+            return
+        now = utime.ticks_ms()
+        if self.begin is not None:
+            self.begin()
+        for channel in range(self.no_channels):
+            if not self.active[channel]:
+                continue
+            u = utime.ticks_diff(now, self.start_ticks[channel]) / self.durations[channel]
+            if u >= 1.0:
+                position = self.targets[channel]
+            else:
+                start = self.starts[channel]
+                position = start + ((self.targets[channel] - start) * trajectory_fraction(self.profiles[channel], u))
+            self.write(channel, position)
+            self.positions[channel] = position
+            owner = self.owners[channel]
+            if owner is not None:
+                owner.current_position = position
+            if u >= 1.0:
+                self.release(channel, False)
+        if self.commit is not None:
+            self.commit()
+    def stop(self):   #  everything stays where it is now
+        for channel in range(self.no_channels):
+            if self.active[channel]:
+                self.release(channel, True)
+    def close(self):
+        self.stop()
+        if self.timer is not None:
+            self.timer.deinit()
+            self.timer = None
+        super().close()
+
+class CompiledSequence():   #  what SequencePlayer.compile() hands back
+    def __init__(self, channels, no_ticks, typecode):
+        self.channels = bytearray(channels)
+        self.no_channels = len(channels)
+        self.no_ticks = no_ticks
+        self.table = array.array(typecode, [0] * (no_ticks * self.no_channels))   #  values sent, tick by tick
+        self.positions = bytearray(no_ticks * self.no_channels)   #  the same as whole positions, 0 to 255
+    def __len__(self):
+        return self.no_ticks
+
+class SequencePlayer(ColObj):
+
+    #  A sequence of keyframes is worked out once by compile() into a table of the values to send on
+    #  every tick; play() then only indexes the table, so playback costs no arithmetic at all.
+
+    def __init__(self, name, write, begin=None, commit=None, convert=None, tick_ms=20, driver='TIMER', busy=None):
+        #  write(channel, value) sends one table value; convert(position) turns a position into that
+        #  value at compile time (the position itself if None); begin() and commit() bracket a tick,
+        #  which waits for the next while busy() is True
+        super().__init__(name)
+        if driver not in TrajectoryEngine.valid_drivers:
+            raise ColError('**** sequence driver ' + driver + ' not in ' + str(TrajectoryEngine.valid_drivers))
+        self.write = write
+        self.begin = begin
+        self.commit = commit
+        self.busy = busy
+        self.convert = convert
+        self.tick_ms = tick_ms
+        self.driver = driver
+        self.timer = None
+        self.sequence = None
+        self.owners = None
+        self.handle = None
+        self.index = 0
+        self.repeat = False
+    def __str__(self):
+        if self.sequence is None:
+            return self.name + ' idle'
+        return self.name + ' tick ' + str(self.index) + ' of ' + str(self.sequence.no_ticks)
+    def compile(self, channels, start, keyframes, profile='TRAPEZOID'):
+        #  channels and start are lists, keyframes is [[positions, duration_ms], ...]; each keyframe
+        #  is reached from the one before in duration_ms, every channel arriving together
+        if profile not in TrajectoryEngine.valid_profiles:
+            raise ColError('**** sequence profile ' + profile + ' not in ' + str(TrajectoryEngine.valid_profiles))
+        profile_no = TrajectoryEngine.valid_profiles.index(profile)
+        counts = [max(int((duration_ms + (self.tick_ms // 2)) // self.tick_ms), 1) for positions, duration_ms in keyframes]
+        n = len(channels)
+        sequence = CompiledSequence(channels, sum(counts), 'f' if self.convert is None else 'H')
+        k = 0
+        before = start
+        for f in range(len(keyframes)):
+            after = keyframes[f][0]
+            if len(after) != n:
+                raise ColError('**** keyframe ' + str(f) + ' has ' + str(len(after)) + ' positions for ' + str(n) + ' channels')
+            for t in range(1, counts[f] + 1):
+                share = trajectory_fraction(profile_no, t / counts[f])
+                for j in range(n):
+                    position = before[j] + ((after[j] - before[j]) * share)
+                    sequence.table[k] = position if self.convert is None else self.convert(position)
+                    sequence.positions[k] = min(max(int(position + 0.5), 0), 255)
+                    k += 1
+            before = after
+        return sequence
+    def play(self, sequence, owners=None, repeat=False):
+        #  owners, if given, is a list of objects whose current_position is set when playback ends;
+        #  returns a TrajectoryMove
+        self.stop()
+        self.sequence = sequence
+        self.owners = owners
+        self.repeat = repeat
+        self.index = 0
+        self.handle = TrajectoryMove(self, 1)
+        if self.driver == 'TIMER' and self.timer is None:
+            self.timer = machine.Timer(-1)
+            self.timer.init(mode=machine.Timer.PERIODIC, period=self.tick_ms, callback=lambda timer: self.tick())
+        return self.handle
+    def tick(self):
+        sequence = self.sequence
+        if sequence is None:
+            if self.timer is not None:
+                self.timer.deinit()
+                self.timer = None
+            return
+        if self.busy is not None and self.busy():
+            return
+        n = sequence.no_channels
+        base = self.index * n
+        if self.begin is not None:
+            self.begin()
+        for j in range(n):
+            self.write(sequence.channels[j], sequence.table[base + j])
+        if self.commit is not None:
+            self.commit()
+        self.index += 1
+        if self.index == sequence.no_ticks:
+            if self.repeat:
+                self.index = 0
+            else:
+                self.finish(False)
+    def finish(self, cancelled):
+        sequence = self.sequence
+        if self.owners is not None and self.index > 0:
+            last = (self.index - 1) * sequence.no_channels
+            for j in range(len(self.owners)):
+                self.owners[j].current_position = sequence.positions[last + j]
+        self.sequence = None
+        self.owners = None
+        self.handle.remaining = 0
+        self.handle.cancelled = cancelled
+        self.handle.done = True
+    def playing(self):
+        return self.sequence is not None
+    def uses(self, channel):   #  True if the sequence playing drives channel
+        return self.sequence is not None and channel in self.sequence.channels
+    def stop(self):   #  everything stays where the last tick put it
+        if self.sequence is not None:
+            self.finish(True)
+    def close(self):
+        self.stop()
+        if self.timer is not None:
+            self.timer.deinit()
+            self.timer = None
+        super().close()
+
+class PID(ColObj):
+
+    #  Fixed-rate PID: update() is called every period_ms.  The derivative is taken on the measurement,
+    #  so a step in the setpoint does not kick the output, and the integral stops growing while the
+    #  output is held at a limit.
+
+    def __init__(self, name, kp, ki=0.0, kd=0.0, out_min=-100.0, out_max=100.0, period_ms=20):
+        super().__init__(name)
+        self.period_ms = period_ms
+        self.out_min = out_min
+        self.out_max = out_max
+        self.set_gains(kp, ki, kd)
+        self.reset()
+    def __str__(self):
+        return '{} kp {} ki {} kd {} out {}'.format(self.name, self.kp, self.ki, self.kd, self.output)
+    def set_gains(self, kp, ki=0.0, kd=0.0):   #  ki per second, kd in seconds
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.ki_dt = ki * self.period_ms / 1000.0
+        self.kd_dt = kd * 1000.0 / self.period_ms
+    def reset(self, output=0.0):   #  output is where a bumpless start carries on from
+        self.integral = output
+        self.last_measured = None
+        self.output = output
+    def update(self, setpoint, measured):
+        error = setpoint - measured
+        integral = self.integral + (self.ki_dt * error)
+        derivative = 0.0
+        if self.last_measured is not None:
+            derivative = self.kd_dt * (measured - self.last_measured)
+        self.last_measured = measured
+        output = (self.kp * error) + integral - derivative
+        if output > self.out_max:
+            output = self.out_max
+            if integral > self.integral:
+                integral = self.integral
+        elif output < self.out_min:
+            output = self.out_min
+            if integral < self.integral:
+                integral = self.integral
+        self.integral = integral
+        self.output = output
+        return output
+
+class Histogram(ColObj):
+    def __init__(self, name, bin_width, no_bins):  #  bins are preallocated so add() never allocates
+                                                   #  the last bin also counts everything above range
+        super().__init__(name)
+        self.bin_width = bin_width
+        self.no_bins = no_bins
+        self.counts = array.array('L', [0] * no_bins)
+        self.total = 0
+        self.biggest = 0
+    def __str__(self):
+        return self.name + ' x' + str(self.bin_width) + ': ' + ','.join([str(c) for c in self.counts])
+    def add(self, value):
+        i = value // self.bin_width
+        if i >= self.no_bins:
+            i = self.no_bins - 1
+        elif i < 0:
+            i = 0
+        self.counts[i] += 1
+        self.total += 1
+        if value > self.biggest:
+            self.biggest = value
+    def clear(self):
+        for i in range(self.no_bins):
+            self.counts[i] = 0
+        self.total = 0
+        self.biggest = 0
+    def percentile(self, percent):  #  upper edge of the bin holding that percentile
+        if self.total == 0:
             return None
+        needed = self.total * percent / 100.0
+        running = 0
+        for i in range(self.no_bins):
+            running += self.counts[i]
+            if running >= needed:
+                return (i + 1) * self.bin_width
+        return self.no_bins * self.bin_width
 
 class Joystick(ColObj):
     def __init__(self, name, receiver, channel, interpolator):
@@ -87,9 +790,46 @@ class Servo(ColObj):
     def move_to(self, angle):
         raise ColError('**** Must be overriden')
 
+def make_duty_table(name, min_speed_duty, max_speed_duty, calibration=None, deadband=0, signed=False):
+    #  returns array of 201 duties, entry speed + 100 for every whole speed from -100 to +100, so
+    #  a speed command is one index.  calibration is [keys, values] mapping speed to the percentage
+    #  actually wanted (keys 0 to 100 are applied to both directions, keys from -100 to each one);
+    #  deadband lifts every speed but 0 to at least that percentage.  signed gives negative
+    #  duties for negative speeds, otherwise both directions get the same duty.
+    #  A function, so motors on an older ColObjects can build one too
+    curve = None
+    if calibration is not None:
+        curve = Curve(name + ' calibration', calibration[0], calibration[1])
+    table = array.array('h' if signed else 'H', [0] * 201)
+    for speed in range(-100, 101):
+        if curve is None:
+            percent = abs(speed)
+        elif curve.key_list[0] < 0:
+            percent = abs(curve.interpolate(speed))
+        else:
+            percent = abs(curve.interpolate(abs(speed)))
+        if percent > 0 and deadband > 0:
+            percent = deadband + ((100 - deadband) * percent / 100.0)
+        duty = min_speed_duty + int(float(max_speed_duty - min_speed_duty) * (percent / 100.0))
+        if signed and speed < 0:
+            duty = -duty
+        table[speed + 100] = duty
+    return table
+
+def duty_index(speed, lowest=-100):   #  entry of a duty table for speed, held to lowest..100
+    speed = int(speed)
+    if speed > 100:
+        return 200
+    if speed < lowest:
+        return lowest + 100
+    return speed + 100
+
 class Motor(ColObj):
     def __init__(self, name, description=''):
         super().__init__(name, description)
+    def make_duty_table(self, min_speed_duty, max_speed_duty, calibration=None, deadband=0, signed=False):
+        return make_duty_table(self.name, min_speed_duty, max_speed_duty, calibration, deadband, signed)
+    duty_index = staticmethod(duty_index)
     def clk(self, speed):
         raise ColError('**** Must be overriden')
     def anti(self, speed):
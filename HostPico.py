@@ -0,0 +1,382 @@
+module_name = 'HostPico.py'
+module_description = 'Stand-ins for MicroPython modules so classes can be exercised on a Linux host. Created 18/Oct/2026'
+
+#  Usage (before importing any Pico module):
+#      import HostPico
+#      HostPico.install()
+#  Only the parts of machine, utime and rp2 used by these classes are modelled.
+#  _thread is the real CPython module.
+
+import array
+import sys
+import time
+import types
+
+###################  utime  ############################################
+
+clock_us = None   #  set to a function returning microseconds to run utime on a virtual clock
+
+def ticks_us():
+    if clock_us is not None:
+        return int(clock_us())
+    return time.perf_counter_ns() // 1000
+
+def ticks_ms():
+    return ticks_us() // 1000
+
+def ticks_diff(new, old):
+    return new - old
+
+def ticks_add(ticks, delta):
+    return ticks + delta
+
+def sleep_us(us):
+    time.sleep(us / 1000000.0)
+
+def sleep_ms(ms):
+    time.sleep(ms / 1000.0)
+
+###################  machine  ##########################################
+
+class Pin():
+    IN = 0
+    OUT = 1
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+    def __init__(self, pin_no, mode=-1, pull=-1, value=None):
+        self.pin_no = pin_no
+        self.mode = mode
+        self.pull = pull
+        self.level = 0 if value is None else value
+        self.handler = None
+        self.listeners = []   #  state machine models reading this pin
+    def value(self, level=None):
+        if level is None:
+            return self.level
+        self.level = level
+    def on(self):
+        self.level = 1
+    def off(self):
+        self.level = 0
+    def irq(self, handler=None, trigger=IRQ_FALLING):
+        self.handler = handler
+    def fall(self):   #  host only: a falling edge from outside, as an encoder gives
+        self.level = 0
+        if self.handler is not None:
+            self.handler(self)
+        for listener in self.listeners:
+            listener.fall()
+
+class PWM():
+    def __init__(self, pin):
+        self.pin = pin
+        self.frequency = 0
+        self.duty = 0
+    def freq(self, frequency=None):
+        if frequency is None:
+            return self.frequency
+        self.frequency = frequency
+    def duty_u16(self, duty=None):
+        if duty is None:
+            return self.duty
+        self.duty = duty
+    def deinit(self):
+        pass
+
+class UART():
+    #  Receive side only. Bytes queued with feed() are handed out by any()/read()/readinto()
+    IRQ_RXIDLE = 4096
+    def __init__(self, uart_no, baudrate=9600, **kwargs):
+        self.uart_no = uart_no
+        self.baudrate = baudrate
+        self.rx = bytearray()
+        self.handler = None
+    def irq(self, handler=None, trigger=IRQ_RXIDLE):
+        self.handler = handler
+    def feed(self, data):
+        self.rx.extend(data)
+    def any(self):
+        return len(self.rx)
+    def read(self, nbytes=None):
+        if not self.rx:
+            return None
+        if nbytes is None:
+            nbytes = len(self.rx)
+        data = bytes(self.rx[:nbytes])
+        del self.rx[:nbytes]
+        return data
+    def readinto(self, buf, nbytes=None):
+        if not self.rx:
+            return None
+        if nbytes is None:
+            nbytes = len(buf)
+        nbytes = min(nbytes, len(self.rx))
+        buf[:nbytes] = self.rx[:nbytes]
+        del self.rx[:nbytes]
+        return nbytes
+
+class SimulatedUART(UART):
+    #  Bytes are scheduled on a virtual clock at the line rate and become visible
+    #  to the reader in chunks (FIFO threshold / DMA granularity), the remainder
+    #  being released once the line has gone idle.
+    def __init__(self, uart_no=0, baudrate=100000, bits_per_byte=12, chunk_sizes=(1,), seed=1, **kwargs):
+        super().__init__(uart_no, baudrate)
+        import random
+        self.rng = random.Random(seed)
+        self.byte_us = bits_per_byte * 1000000.0 / baudrate
+        self.chunk_sizes = chunk_sizes
+        self.now_us = 0.0
+        self.line_free_us = 0.0
+        self.arrivals = []   #  [arrival_us, byte] not yet visible
+        self.next_chunk = self.rng.choice(self.chunk_sizes)
+        self.bytes_read = 0
+        self.line_idle = True
+    def schedule(self, data, at_us=None):
+        if at_us is not None and at_us > self.line_free_us:
+            self.line_free_us = at_us
+        for byte in data:
+            self.line_free_us += self.byte_us
+            self.arrivals.append([self.line_free_us, byte])
+    def advance(self, us):
+        self.now_us += us
+        arrived = 0
+        while arrived < len(self.arrivals) and self.arrivals[arrived][0] <= self.now_us:
+            arrived += 1
+        idle = (arrived == len(self.arrivals) or
+                self.arrivals[arrived][0] - self.byte_us > self.now_us)
+        released = 0
+        while arrived - released >= self.next_chunk:
+            released += self.next_chunk
+            self.next_chunk = self.rng.choice(self.chunk_sizes)
+        if idle:
+            released = arrived
+        for i in range(released):
+            self.rx.append(self.arrivals[i][1])
+        del self.arrivals[:released]
+        fire = idle and not self.line_idle and len(self.rx) > 0
+        self.line_idle = idle
+        if fire and self.handler is not None:
+            self.handler(self)   #  idle-line interrupt
+    def pending(self):
+        return len(self.arrivals) + len(self.rx)
+    def readinto(self, buf, nbytes=None):
+        n = super().readinto(buf, nbytes)
+        if n:
+            self.bytes_read += n
+        return n
+
+class I2C():
+    #  Counts transactions, bytes on the wire and bus time, and keeps a 256 byte register file
+    #  per device so that what was written can be compared.  Register 0 bit 5 is taken as the
+    #  auto-increment flag (PCA9685 MODE1); without it every data byte lands on the same register.
+    #  A general call reset (address 0, 0x06) puts every device back to MODE1 0x11.
+    #  With realtime set each transaction sleeps for its bus time, releasing other threads meanwhile.
+    AUTO_INCREMENT = 0x20
+    def __init__(self, i2c_no, sda=None, scl=None, freq=400000):
+        self.i2c_no = i2c_no
+        self.freq = freq
+        self.devices = {}
+        self.realtime = False   #  set to make each transaction take its bus time, as a blocking write does
+        self.clear_counts()
+    def clear_counts(self):
+        self.transactions = 0
+        self.bytes = 0        #  address and register bytes included
+        self.bus_us = 0.0     #  9 clocks a byte plus start and stop
+    def count(self, nbytes):
+        self.transactions += 1
+        self.bytes += nbytes
+        us = ((nbytes * 9) + 2) * 1000000.0 / self.freq
+        self.bus_us += us
+        if self.realtime:
+            time.sleep(us / 1000000.0)
+    def registers(self, address):
+        if address not in self.devices:
+            self.devices[address] = bytearray(256)
+            self.devices[address][0] = 0x11
+        return self.devices[address]
+    def writeto(self, address, data):
+        if isinstance(data, str):
+            data = data.encode('latin-1')
+        self.count(1 + len(data))
+        if address == 0 and len(data) > 0 and data[0] == 0x06:
+            for registers in self.devices.values():
+                registers[:] = bytearray(256)
+                registers[0] = 0x11
+        return len(data)
+    def writeto_mem(self, address, register, data):
+        if isinstance(data, str):
+            data = data.encode('latin-1')
+        self.count(2 + len(data))
+        registers = self.registers(address)
+        for byte in data:
+            auto_increment = registers[0] & I2C.AUTO_INCREMENT
+            registers[register] = byte
+            if auto_increment:
+                register = (register + 1) & 0xFF
+
+class Timer():
+    PERIODIC = 1
+    ONE_SHOT = 0
+    def __init__(self, timer_no=-1, **kwargs):
+        self.callback = None
+        if kwargs:
+            self.init(**kwargs)
+    def init(self, mode=PERIODIC, freq=-1, period=-1, callback=None):
+        self.callback = callback
+    def deinit(self):
+        self.callback = None
+    def fire(self):   #  host only: run the callback as if the timer had expired
+        if self.callback is not None:
+            self.callback(self)
+
+def idle():
+    time.sleep(0)
+
+###################  rp2  ##############################################
+
+class PIO():
+    OUT_LOW = 0
+    OUT_HIGH = 1
+    IN_LOW = 0
+    IN_HIGH = 1
+    SHIFT_LEFT = 0
+    SHIFT_RIGHT = 1
+
+def asm_pio(**kwargs):
+    def assemble(program):
+        return program
+    return assemble
+
+def asm_pio_encode(instr, sideset_count, sideset_opt=False):
+    return instr   #  StateMachine.exec takes the text back on the host
+
+class PulseCountModel():
+    #  What Motor_V07.count_pulses does, event by event rather than cycle by cycle: x counts falling
+    #  edges down from all ones, y counts 3 cycle steps since the last edge down from all ones, and
+    #  osr holds the steps between the last two edges.
+    MASK = 0xFFFFFFFF
+    def __init__(self, sm, jmp_pin=None, **kwargs):
+        self.sm = sm
+        self.x = PulseCountModel.MASK
+        self.osr = 0
+        self.last_edge = ticks_us()
+        if jmp_pin is not None:
+            jmp_pin.listeners.append(self)
+    def start(self):
+        self.last_edge = ticks_us()
+    def steps(self):
+        return int((ticks_us() - self.last_edge) * self.sm.freq / 3000000)
+    def fall(self):
+        if self.sm.running:
+            self.x = (self.x - 1) & PulseCountModel.MASK
+            self.osr = self.steps() & PulseCountModel.MASK
+            self.last_edge = ticks_us()
+    def exec(self, instr):
+        if instr == 'mov(isr, x)':
+            self.sm.isr = self.x
+        elif instr == 'mov(isr, osr)':
+            self.sm.isr = self.osr
+        elif instr == 'mov(isr, invert(y))':
+            self.sm.isr = self.steps() & PulseCountModel.MASK
+        elif instr == 'push(noblock)':
+            if len(self.sm.rx) < 4:
+                self.sm.rx.append(self.sm.isr)
+        else:
+            raise ValueError('host model of count_pulses has no ' + instr)
+
+class StateMachine():
+    models = {'count_pulses': PulseCountModel}   #  programs modelled on the host, by name
+    machines = {}   #  by number, for DMA
+    def __init__(self, sm_no, program=None, freq=125000000, **kwargs):
+        StateMachine.machines[sm_no] = self
+        self.sm_no = sm_no
+        self.word_us = 0   #  host only: set to make put() take this long a word, as a full TX FIFO does
+        self.program = program
+        self.freq = freq
+        self.running = 0
+        self.rx = []
+        self.tx = array.array('I')
+        self.isr = 0
+        self.model = None
+        if program is not None and getattr(program, '__name__', None) in StateMachine.models:
+            self.model = StateMachine.models[program.__name__](self, **kwargs)
+    def active(self, value=None):
+        if value is None:
+            return self.running
+        if value and not self.running and self.model is not None:
+            self.model.start()
+        self.running = value
+    def put(self, value, shift=0):   #  what went out is kept in tx, as 32 bit words
+        if isinstance(value, int):
+            self.tx.append((value << shift) & 0xFFFFFFFF)
+        elif shift == 0:
+            self.tx.extend(value)
+        else:
+            for word in value:
+                self.tx.append((word << shift) & 0xFFFFFFFF)
+        if self.word_us:
+            sleep_us(self.word_us * (1 if isinstance(value, int) else len(value)))
+    def get(self):
+        return self.rx.pop(0)
+    def rx_fifo(self):
+        return len(self.rx)
+    def exec(self, instr):
+        self.model.exec(instr)
+
+class DMA():
+    #  Only transfers into a state machine TX FIFO are modelled: the words land in its tx at once,
+    #  and the channel stays active for the state machine's word_us a word.
+    PIO_TXF = {0x50200010: 0, 0x50300010: 4}
+    def __init__(self):
+        self.busy_until = ticks_us()
+        self.closed = False
+    def pack_ctrl(self, default=None, **kwargs):
+        return kwargs   #  the real one packs these into an int
+    def config(self, read=None, write=None, count=None, ctrl=None, trigger=False):
+        sm = StateMachine.machines[DMA.PIO_TXF[write & ~0xF] + ((write & 0xF) // 4)]
+        if ctrl.get('treq_sel') != ((sm.sm_no // 4) * 8) + (sm.sm_no % 4):
+            raise ValueError('DREQ does not match state machine ' + str(sm.sm_no))
+        self.read = read
+        self.sm = sm
+        self.count = count
+        if trigger:
+            self.active(1)
+    def active(self, value=None):
+        if value is None:
+            return ticks_diff(self.busy_until, ticks_us()) > 0
+        if value:
+            self.sm.tx.extend(self.read[:self.count])
+            self.busy_until = ticks_add(ticks_us(), int(self.count * self.sm.word_us))
+    def close(self):
+        self.closed = True
+
+###################  installation  #####################################
+
+def make_module(name, members):
+    module = types.ModuleType(name)
+    for member in members:
+        setattr(module, member.__name__, member)
+    return module
+
+def install():
+    if 'machine' in sys.modules:
+        return False
+    sys.modules['utime'] = make_module('utime', [ticks_us, ticks_ms, ticks_diff, ticks_add,
+                                                 sleep_us, sleep_ms, time.sleep, time.time])
+    sys.modules['machine'] = make_module('machine', [Pin, PWM, UART, I2C, Timer, idle])
+    sys.modules['rp2'] = make_module('rp2', [PIO, asm_pio, asm_pio_encode, StateMachine, DMA])
+    return True
+
+if __name__ == "__main__":
+    print (module_name)
+    install()
+    import utime
+    import machine
+    start = utime.ticks_us()
+    utime.sleep_ms(2)
+    print ('slept', utime.ticks_diff(utime.ticks_us(), start), 'us')
+    uart = machine.UART(0, 100000)
+    uart.feed(b'\x0f\x00')
+    print ('uart any', uart.any())
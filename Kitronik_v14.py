@@ -2,18 +2,19 @@ module_name = 'Kitronik_v14.py'
 
 import GPIOPico_v26 as GPIO
 ColObjects = GPIO.ColObjects
+import ColObjects_V16
 import PicoRobotics
 import math
 import utime
 
 class Kitronik(ColObjects.ColObj):
     allocated = False
-    def __init__(self, name):
+    def __init__(self, name, freq=100000):   #  I2C clock, up to 1000000 (Fast-mode Plus)
         if Kitronik.allocated:
             raise ColObjects.ColError('Can only have one Kitronik instance')
         Kitronik.allocated = True
         super().__init__(name)
-        self.board = PicoRobotics.KitronikPicoRobotics()
+        self.board = PicoRobotics.KitronikPicoRobotics(freq=freq)
         self.sda = GPIO.Reserved('Kitronik SDA', 'CONTROL', 8)
         self.scl = GPIO.Reserved('Kitronik SCL', 'CONTROL', 9)
         self.last_servo = 8
@@ -23,6 +24,12 @@ class Kitronik(ColObjects.ColObj):
         self.last_motor = 4
         self.motor_list = [self.free_code]*(self.last_motor + 1)
         self.motor_list[0] = 'NOT_USED'
+        #  servo moves with a speed run here, one burst of writes per tick, channel = servo no
+        self.trajectories = ColObjects_V16.TrajectoryEngine(name + ' trajectories', self.board.servoWrite,
+            self.board.beginFrame, self.board.commitFrame, no_channels=self.last_servo + 1, busy=self.board.frameOpen)
+        #  compiled sequences hold the servo counts to send on each tick, ready made
+        self.sequences = ColObjects_V16.SequencePlayer(name + ' sequences', self.board.servoRaw,
+            self.board.beginFrame, self.board.commitFrame, self.board.servoCount, busy=self.board.frameOpen)
     def str_servo_list(self):
         output = ''
         for i in range(1,len(self.servo_list)):
@@ -33,7 +40,33 @@ class Kitronik(ColObjects.ColObj):
         for i in range(1,len(self.motor_list)):
             output += str(i) + '  ' + self.motor_list[i] + '\n'
         return output
+    def begin_frame(self):
+        #  motor and servo setpoints from here to commit() are held back and sent together,
+        #  so every wheel changes at the same moment.  Moves with a speed go on in the
+        #  background and are not held back.
+        self.board.beginFrame()
+    def commit(self):
+        #  returns the number of I2C transactions used
+        return self.board.commitFrame()
+    def start_queue(self, max_depth=64, drainer='THREAD'):
+        #  motor and servo calls then return at once and a drainer does the I2C:
+        #  'THREAD' runs it on the second core, 'TASK' expects board.queueTask() to be
+        #  added to uasyncio, 'CALLER' means calling drain() from the control loop
+        self.board.startQueue(max_depth, drainer)
+    def drain(self):
+        return self.board.drainQueue()
+    def get_queue_report(self):
+        return self.board.queueReport()
+    def stop_queue(self):
+        self.board.stopQueue()
+    def stop_servos(self):
+        #  servos moving with a speed or playing a sequence stay where they are
+        self.trajectories.stop()
+        self.sequences.stop()
     def close(self):
+        self.trajectories.close()
+        self.sequences.close()
+        self.board.stopQueue()
         self.sda.close()
         self.scl.close()
         self.board.swReset()
@@ -90,29 +123,28 @@ class Servo(ColObjects.ColObj):
         self.max_rotation = max_rotation
         self.min_rotation = min_rotation
         self.current_position = 90
-    def move_to(self, new_position, speed=0):     # speed is from 1 to 100. Zero means as fast as possible
+    def move_to(self, new_position, speed=0, profile='TRAPEZOID'):
+        #  speed is from 1 to 100. Zero means as fast as possible.  With a speed the move runs in the
+        #  background and a TrajectoryMove is returned; call its wait() to block until it is there.
         if new_position < self.min_rotation:
             target_position = self.min_rotation
         elif new_position > self.max_rotation:
             target_position = self.max_rotation
         else:
             target_position = new_position
+        if self.board_object.sequences.uses(self.servo_no):
+            self.board_object.sequences.stop()
         if speed != 0:
-            delay = int(1000 / speed)
-            rotation = target_position - self.current_position
-            no_increments = int(math.fabs(rotation) / 3)
-            if no_increments < 1:
-                return
-            increment = rotation / no_increments
-            for i  in range(no_increments):
-                self.board.servoWrite(self.servo_no, self.current_position + (increment * i))
-                utime.sleep_ms(delay)
+            #  the same time as the old 3 degree steps, 1000 / speed ms apart
+            duration_ms = int(math.fabs(target_position - self.current_position) / 3) * int(1000 / speed)
+            return self.board_object.trajectories.move([[self.servo_no, target_position, self]], duration_ms, profile)
+        self.board_object.trajectories.cancel(self.servo_no)   #  a fast move takes over from a slow one
         self.board.servoWrite(self.servo_no, target_position)
         self.current_position = target_position
     def up(self, speed=0):
-        self.move_to(new_position=self.max_rotation, speed=speed)
+        return self.move_to(new_position=self.max_rotation, speed=speed)
     def down(self, speed=0):
-        self.move_to(new_position=self.min_rotation, speed=speed)
+        return self.move_to(new_position=self.min_rotation, speed=speed)
     def close(self):
         self.board_object.deallocate_servo(self.servo_no)
         super().close()
@@ -125,9 +157,9 @@ class TypicalKitronikServo(Servo):
                  max_rotation=180,
                  min_rotation=0)
     def up(self, speed=25):
-        self.move_to(new_position=90, speed=speed)
+        return self.move_to(new_position=90, speed=speed)
     def down(self, speed=25):
-        self.move_to(new_position=159, speed=speed)
+        return self.move_to(new_position=159, speed=speed)
 
 
 class Arm(ColObjects.ColObj):
@@ -141,36 +173,56 @@ class Arm(ColObjects.ColObj):
         self.board = self.board_object.board
         self.shoulder_servo = shoulder_servo
         self.bucket_servo = bucket_servo
+        self.servos = [self.shoulder_servo, self.bucket_servo]
         self.poses = {}
         self.poses['PARK'] = [[self.shoulder_servo,90],[self.bucket_servo,90]]
         self.poses['UP'] = [[self.shoulder_servo,100],[self.bucket_servo,110]]
         self.poses['DOWN'] = [[self.shoulder_servo,120],[self.bucket_servo,130]]
     
-    def do_pose(self, pose_id, speed=0):  #  from 1 to 100. Zero is ASAP
+    def do_pose(self, pose_id, speed=0, profile='TRAPEZOID'):  #  from 1 to 100. Zero is ASAP
+        #  with a speed every servo starts together and arrives together, in the background;
+        #  the TrajectoryMove returned has wait() to block until the pose is reached
         this_pose = self.poses[pose_id]
-        nservos = len(this_pose)
-        for j in range(nservos):
-            servo = this_pose[j][0]
-            target = this_pose[j][1]
-            servo.start_position = servo.current_position
-            servo.target_position = target
+        trajectories = self.board_object.trajectories
+        self.board_object.sequences.stop()
         if speed != 0:
+            #  the same overall time as the old steps, one servo at a time
             interval_ms = int((Arm.duration / float(speed)) * 1000.0)
-            for i in range(Arm.steps):
-                for j in range(nservos):
-                    servo = this_pose[j][0]
-                    target = servo.target_position
-                    start = servo.start_position
-                    new_position = start + ((float(target - start) / Arm.steps) * i)
-                    self.board.servoWrite(servo.servo_no, new_position)
-                    utime.sleep_ms(interval_ms)
-        for j in range(nservos):
-            servo = this_pose[j][0]
-            self.board.servoWrite(servo.servo_no, servo.target_position)
-            servo.current_position = servo.target_position
+            duration_ms = Arm.steps * len(this_pose) * interval_ms
+            return trajectories.move([[servo.servo_no, target, servo] for servo, target in this_pose], duration_ms, profile)
+        self.board.beginFrame()
+        for servo, target in this_pose:
+            trajectories.cancel(servo.servo_no)
+            self.board.servoWrite(servo.servo_no, target)
+            servo.current_position = target
+        self.board.commitFrame()
+
+    def pose_positions(self, pose_id, before):
+        #  angles of self.servos in a pose, a servo the pose leaves out staying where it was
+        positions = list(before)
+        for servo, target in self.poses[pose_id]:
+            positions[self.servos.index(servo)] = target
+        return positions
+
+    def compile_sequence(self, steps, start_pose='PARK', profile='TRAPEZOID'):
+        #  steps is [[pose_id, duration_ms], ...], e.g. [['DOWN', 1000], ['UP', 800], ['PARK', 600]],
+        #  played from start_pose; everything is worked out here, once
+        before = self.pose_positions(start_pose, [servo.current_position for servo in self.servos])
+        start = before
+        keyframes = []
+        for pose_id, duration_ms in steps:
+            before = self.pose_positions(pose_id, before)
+            keyframes.append([before, duration_ms])
+        return self.board_object.sequences.compile([servo.servo_no for servo in self.servos], start, keyframes, profile)
+
+    def play_sequence(self, sequence, repeat=False):
+        #  returns at once with a TrajectoryMove; do_pose(start_pose) first if the arm is elsewhere
+        for servo in self.servos:
+            self.board_object.trajectories.cancel(servo.servo_no)
+        return self.board_object.sequences.play(sequence, self.servos, repeat)
 
 class KitronikMotor(ColObjects.Motor):  
-    def __init__(self, name, board_object, motor_no, clockwise='r'):
+    def __init__(self, name, board_object, motor_no, clockwise='r', calibration=None, deadband=0):
         super().__init__(name)
         self.board_object = board_object
         self.board_object.allocate_motor(motor_no, name)
@@ -184,10 +236,20 @@ class KitronikMotor(ColObjects.Motor):
         else:
             self.clockwise = 'f'
             self.anticlockwise = 'r'
-    def clk(self, speed):
-        self.board.motorOn(self.motor_no, self.clockwise, speed)
+        self.calibrate(calibration, deadband)
+    def calibrate(self, calibration=None, deadband=0):  #  see ColObjects_V16.make_duty_table
+        #  signed PCA9685 counts, positive clockwise, so a speed is one index and one coilWrite
+        #  (the table functions are taken from ColObjects_V16, GPIO.ColObjects may be older)
+        self.duty_table = ColObjects_V16.make_duty_table(self.name, 0, 4095, calibration, deadband, signed=True)
+        if self.clockwise == 'r':
+            for i in range(len(self.duty_table)):
+                self.duty_table[i] = -self.duty_table[i]
+    def clk(self, speed):  #  speed is from 0 to 100, as motorOn capped it
+        self.board.coilWrite(self.motor_no, self.duty_table[ColObjects_V16.duty_index(speed, 0)])
     def anti(self, speed):
-        self.board.motorOn(self.motor_no, self.anticlockwise, speed)
+        self.board.coilWrite(self.motor_no, self.duty_table[200 - ColObjects_V16.duty_index(speed, 0)])
+    def run(self, speed):  #  speed is from -100 to +100, positive clockwise
+        self.board.coilWrite(self.motor_no, self.duty_table[ColObjects_V16.duty_index(speed)])
     def stop(self):
         self.board.motorOff(self.motor_no)
     def close(self):
@@ -6,11 +6,77 @@ if __name__ == "__main__":
 
 import GPIOPico_V30 as GPIO
 ColObjects = GPIO.ColObjects
+import array
 import utime
 import machine
+import rp2
+
+@rp2.asm_pio()
+def count_pulses():
+    #  x counts falling edges down from all ones; y counts 3 cycle steps since the last one, also down;
+    #  osr holds the steps between the last two.  Nothing is pushed: PulseCounter.read() execs the
+    #  moves and pushes when it wants them.
+    mov(x, invert(null))
+    mov(y, invert(null))
+    mov(osr, null)
+    wrap_target()
+    label('low')   #  3 cycles a step while the pin is low
+    jmp(pin, 'high')
+    nop()
+    jmp(y_dec, 'low')
+    jmp('low')   #  y has wrapped, after 71 minutes at 1us a step
+    label('high')   #  3 cycles a step while it is high
+    jmp(pin, 'still_high')
+    jmp(x_dec, 'fallen')   #  x never reaches zero, we only want the decrement
+    label('fallen')
+    mov(osr, invert(y))
+    mov(y, invert(null))
+    jmp('low')
+    label('still_high')
+    nop()
+    jmp(y_dec, 'high')
+    wrap()
+
+class PulseCounter(ColObjects.PIO):
+
+    #  Counts falling edges on a pin in a state machine, so no Python runs per pulse.  read() fetches
+    #  the count, the time between the last two edges and the time since the last one on demand.
+
+    FREQ = 3000000   #  one step of the program is 1us
+    MOV_ISR_X = rp2.asm_pio_encode('mov(isr, x)', 0)
+    MOV_ISR_OSR = rp2.asm_pio_encode('mov(isr, osr)', 0)
+    MOV_ISR_NOT_Y = rp2.asm_pio_encode('mov(isr, invert(y))', 0)
+    PUSH = rp2.asm_pio_encode('push(noblock)', 0)
+
+    def __init__(self, name, pin, block_no=0):
+        #  pin is a machine.Pin set up by the owner; block 0 is shared with remote control
+        super().__init__(name, block_no)
+        self.pin = pin
+        self.instance = rp2.StateMachine(self.pio_no, count_pulses, freq=PulseCounter.FREQ, jmp_pin=pin)
+        self.instance.active(1)
+        self.count = 0
+        self.period_us = 0
+        self.since_us = 0
+    def read(self):   #  returns the count; period_us and since_us are set as well
+        sm = self.instance
+        while sm.rx_fifo():
+            sm.get()
+        sm.exec(PulseCounter.MOV_ISR_X)
+        sm.exec(PulseCounter.PUSH)
+        sm.exec(PulseCounter.MOV_ISR_OSR)
+        sm.exec(PulseCounter.PUSH)
+        sm.exec(PulseCounter.MOV_ISR_NOT_Y)
+        sm.exec(PulseCounter.PUSH)
+        self.count = 0xFFFFFFFF - sm.get()
+        self.period_us = sm.get()
+        self.since_us = sm.get()
+        return self.count
+    def close(self):
+        self.instance.active(0)
+        super().close()
 
 class FIT0441BasicMotor(ColObjects.Motor):  #  cut down for R/C
-    def __init__(self, name, direction_pin_no, speed_pin_no):
+    def __init__(self, name, direction_pin_no, speed_pin_no, calibration=None, deadband=0):
         super().__init__(name)
         self.direction_pin_GPIO = GPIO.GPIO(pin_no=direction_pin_no, type_code='MOTOR', name=name+'_direction_'+str(direction_pin_no))
         self.direction_pin = machine.Pin(direction_pin_no, machine.Pin.OUT)
@@ -23,6 +89,7 @@ class FIT0441BasicMotor(ColObjects.Motor):  #  cut down for R/C
         self.max_speed_duty = 0
         self.clockwise = 1
         self.anticlockwise = 0
+        self.calibrate(calibration, deadband)
 
     def __str__(self):
         outstring = self.name
@@ -43,9 +110,11 @@ class FIT0441BasicMotor(ColObjects.Motor):  #  cut down for R/C
             self.stop()
             return
         if speed > 0:
-            self.clk(speed)
+            self.direction_pin.value(self.clockwise)
         else:
-            self.anti(-speed)
+            self.direction_pin.value(self.anticlockwise)
+        self.duty = self.duty_table[self.duty_index(speed)]
+        self.speed_pin.duty_u16(self.duty)
 
     def stop(self):
         duty = self.stop_duty
@@ -57,10 +126,11 @@ class FIT0441BasicMotor(ColObjects.Motor):  #  cut down for R/C
         self.speed_pin_GPIO.close()
         super().close()
 
+    def calibrate(self, calibration=None, deadband=0):  #  see ColObjects.Motor.make_duty_table
+        self.duty_table = self.make_duty_table(self.min_speed_duty, self.max_speed_duty, calibration, deadband)
+
     def set_speed(self, speed):  #  as a percentage
-        self.duty = (self.min_speed_duty
-                     - int(float(self.min_speed_duty - self.max_speed_duty)
-                        * (float(speed) / 100.0)))
+        self.duty = self.duty_table[self.duty_index(speed, 0)]
         self.speed_pin.duty_u16(self.duty)
     
     def set_direction(self, direction):  # 1 = clockwise, 0 = anticlockwise
@@ -70,7 +140,7 @@ class FIT0441BasicMotor(ColObjects.Motor):  #  cut down for R/C
             self.direction_pin.value(self.anticlockwise)
 
 class FIT0441Motor(ColObjects.Motor):
-    def __init__(self, name, direction_pin_no, speed_pin_no, pulse_pin_no=None):
+    def __init__(self, name, direction_pin_no, speed_pin_no, pulse_pin_no=None, calibration=None, deadband=0):
         super().__init__(name)
         self.direction_pin_GPIO = GPIO.GPIO(pin_no=direction_pin_no, type_code='MOTOR', name=name+'_direction_'+str(direction_pin_no))
         self.direction_pin = machine.Pin(direction_pin_no, machine.Pin.OUT)
@@ -82,6 +152,7 @@ class FIT0441Motor(ColObjects.Motor):
         self.max_speed_duty = 0
         self.clockwise = 1
         self.anticlockwise = 0
+        self.calibrate(calibration, deadband)
 
     def __str__(self):
         outstring = self.name
@@ -112,10 +183,11 @@ class FIT0441Motor(ColObjects.Motor):
         self.speed_pin_GPIO.close()
         super().close()
 
+    def calibrate(self, calibration=None, deadband=0):  #  see ColObjects.Motor.make_duty_table
+        self.duty_table = self.make_duty_table(self.min_speed_duty, self.max_speed_duty, calibration, deadband)
+
     def set_speed(self, speed):  #  as a percentage
-        self.duty = (self.min_speed_duty
-                     - int(float(self.min_speed_duty - self.max_speed_duty)
-                        * (float(speed) / 100.0)))
+        self.duty = self.duty_table[self.duty_index(speed, 0)]
         self.speed_pin.duty_u16(self.duty)
     
     def set_direction(self, direction):  # 1 = clockwise, 0 = anticlockwise
@@ -125,7 +197,25 @@ class FIT0441Motor(ColObjects.Motor):
             self.direction_pin.value(self.anticlockwise)
 
 class FIT0441MotorWithPulses(ColObjects.Motor):
-    def __init__(self, name, direction_pin_no, speed_pin_no, pulse_pin_no):
+
+    #  set_rpm() runs the motor closed loop: every PID period a machine.Timer measures the speed from
+    #  the pulse timestamps and a PID on the percentage of max_rpm picks the duty, so motors that
+    #  respond differently still turn at the same speed.
+    PULSE_RING = 16   #  pulse timestamps kept by the IRQ, a power of two
+    STALL_US = 250000   #  no pulse for this long reads as stopped
+    GAINS = [0.6, 6.0, 0.0]   #  kp, ki per second, kd seconds: duty % per speed % of max_rpm
+    PERIOD_MS = 20
+
+    valid_counters = ['IRQ', 'PIO']
+
+    def __init__(self, name, direction_pin_no, speed_pin_no, pulse_pin_no, calibration=None, deadband=0,
+                 max_rpm=159, pulses_per_rev=270, counter='IRQ'):
+        #  max_rpm is the output shaft at full duty; pulses_per_rev is FG pulses per output shaft turn,
+        #  6 per motor turn through the 45:1 gearbox - check it against get_pulses() over one turn.
+        #  counter 'IRQ' counts in a Python pin IRQ; 'PIO' in a state machine (see PulseCounter), when
+        #  pulse_endpoint is checked by get_pulses() and the control loop instead of on every pulse.
+        if counter not in FIT0441MotorWithPulses.valid_counters:
+            raise ColObjects.ColError('**** counter ' + counter + ' not in ' + str(FIT0441MotorWithPulses.valid_counters))
         super().__init__(name)
         self.direction_pin_GPIO = GPIO.GPIO(pin_no=direction_pin_no, type_code='MOTOR', name=name+'_direction_'+str(direction_pin_no))
         self.direction_pin = machine.Pin(direction_pin_no, machine.Pin.OUT)
@@ -133,16 +223,34 @@ class FIT0441MotorWithPulses(ColObjects.Motor):
         self.speed_pin = machine.PWM(machine.Pin(speed_pin_no))
         self.pulse_pin_GPIO = GPIO.GPIO(pin_no=pulse_pin_no, type_code='MOTOR', name=name+'_pulse_'+str(pulse_pin_no))
         self.pulse_pin = machine.Pin(pulse_pin_no, machine.Pin.IN, machine.Pin.PULL_UP)
-        self.pulse_pin.irq(self.pulse_detected, machine.Pin.IRQ_FALLING)
         self.pulse_count = 0
         self.pulse_checkpoint = 0
         self.pulse_endpoint = 0
+        self.pulse_times = array.array('L', [0] * FIT0441MotorWithPulses.PULSE_RING)
+        self.pulse_mask = FIT0441MotorWithPulses.PULSE_RING - 1
+        self.pulse_head = 0   #  slot for the next timestamp
         self.duty = 0
         self.stop_duty = 65534
         self.min_speed_duty = 65000
         self.max_speed_duty = 0
         self.clockwise = 1
         self.anticlockwise = 0
+        self.calibrate(calibration, deadband)
+        self.max_rpm = max_rpm
+        self.pulses_per_rev = pulses_per_rev
+        self.rate_count = 0   #  pulse_count at the last measurement
+        self.rpm = 0.0
+        self.target_rpm = 0
+        self.closed_loop = False
+        self.control_timer = None
+        kp, ki, kd = FIT0441MotorWithPulses.GAINS
+        self.pid = ColObjects.PID(name + '_pid', kp, ki, kd, 0.0, 100.0, FIT0441MotorWithPulses.PERIOD_MS)
+        self.counter = None
+        self.last_edge_us = 0   #  PIO: when the newest edge at the last measurement came
+        if counter == 'PIO':
+            self.counter = PulseCounter(name + '_counter', self.pulse_pin)
+        else:
+            self.pulse_pin.irq(self.pulse_detected, machine.Pin.IRQ_FALLING)
 
     def __str__(self):
         outstring = self.name
@@ -151,28 +259,136 @@ class FIT0441MotorWithPulses(ColObjects.Motor):
         outstring += ', pulse pin: ' + str(self.pulse_pin_GPIO.pin_no)
         return outstring
 
-    def clk(self, speed):
+    def clk(self, speed):   #  open loop, ends any set_rpm()
+        self.closed_loop = False
         self.direction_pin.value(self.clockwise)
         self.set_speed(speed)
 
     def anti(self, speed):
+        self.closed_loop = False
         self.direction_pin.value(self.anticlockwise)
         self.set_speed(speed)
 
-    def pulse_detected(self, sender):
+    def pulse_detected(self, sender):   #  allocation free, it runs on every pulse
+        self.pulse_times[self.pulse_head] = utime.ticks_us()
+        self.pulse_head = (self.pulse_head + 1) & self.pulse_mask
         self.pulse_count += 1
         if self.pulse_endpoint > 0:
             if self.pulse_count >= self.pulse_endpoint:
                 self.stop()
 
     def get_pulses(self):
+        if self.counter is not None:
+            self.pulse_count = self.counter.read()
+            self.check_endpoint()
         return self.pulse_count
 
+    def check_endpoint(self):   #  PIO: what pulse_detected does on every pulse
+        if self.pulse_endpoint > 0:
+            if self.pulse_count >= self.pulse_endpoint:
+                self.stop()
+
+    def measure_rpm(self):
+        #  the pulses since the last call over the time from the edge before them to the newest;
+        #  with no new pulse the speed can only fall, as the time since the newest one grows.
+        #  A pulse landing part way through only moves the window on by one.
+        if self.counter is not None:
+            return self.measure_rpm_pio()
+        head = self.pulse_head
+        count = self.pulse_count
+        new = count - self.rate_count
+        self.rate_count = count
+        if count < 2:
+            self.rpm = 0.0
+            return self.rpm
+        newest = self.pulse_times[(head - 1) & self.pulse_mask]
+        since = utime.ticks_diff(utime.ticks_us(), newest)
+        if since > FIT0441MotorWithPulses.STALL_US:
+            self.rpm = 0.0
+        elif new > 0:
+            n = min(new, self.pulse_mask, count - 1)
+            span = utime.ticks_diff(newest, self.pulse_times[(head - 1 - n) & self.pulse_mask])
+            if span > 0:
+                self.rpm = (n * 60000000.0) / (span * self.pulses_per_rev)
+        elif since > 0:
+            ceiling = 60000000.0 / (since * self.pulses_per_rev)
+            if ceiling < self.rpm:
+                self.rpm = ceiling
+        return self.rpm
+
+    def measure_rpm_pio(self):
+        #  the same window as the IRQ count, from the newest edge at the last call to the newest now;
+        #  the first time, the state machine's own time between the last two edges
+        now = utime.ticks_us()
+        count = self.counter.read()
+        self.pulse_count = count
+        self.check_endpoint()
+        first = self.rate_count == 0
+        new = count - self.rate_count
+        self.rate_count = count
+        since = self.counter.since_us
+        newest = utime.ticks_add(now, -since)
+        if count < 2 or since > FIT0441MotorWithPulses.STALL_US:
+            self.rpm = 0.0
+        elif new > 0:
+            span = utime.ticks_diff(newest, self.last_edge_us)
+            if first:
+                span = self.counter.period_us
+                new = 1
+            if span > 0:
+                self.rpm = (new * 60000000.0) / (span * self.pulses_per_rev)
+        elif since > 0:
+            ceiling = 60000000.0 / (since * self.pulses_per_rev)
+            if ceiling < self.rpm:
+                self.rpm = ceiling
+        self.last_edge_us = newest
+        return self.rpm
+
+    def set_gains(self, kp, ki=0.0, kd=0.0):   #  see GAINS
+        self.pid.set_gains(kp, ki, kd)
+
+    def set_rpm(self, rpm):   #  closed loop; positive is clockwise, 0 stops
+        self.target_rpm = rpm
+        if rpm == 0:
+            self.stop()
+            return
+        if rpm > 0:
+            self.direction_pin.value(self.clockwise)
+        else:
+            self.direction_pin.value(self.anticlockwise)
+        if not self.closed_loop:
+            self.measure_rpm()
+            self.pid.reset()
+            self.closed_loop = True
+        if self.control_timer is None:
+            self.control_timer = machine.Timer(-1)
+            self.control_timer.init(mode=machine.Timer.PERIODIC, period=self.pid.period_ms, callback=self.control)
+
+    def control(self, timer=None):   #  one PID period
+        if not self.closed_loop:
+            if self.control_timer is not None:
+                self.control_timer.deinit()
+                self.control_timer = None
+            return
+        target = abs(self.target_rpm) * 100.0 / self.max_rpm
+        output = self.pid.update(target, self.measure_rpm() * 100.0 / self.max_rpm)
+        self.duty = self.duty_table[self.duty_index(output)]
+        self.speed_pin.duty_u16(self.duty)
+
     def deinit(self):
-        self.pulse_pin.irq(None)
+        self.closed_loop = False
+        if self.control_timer is not None:
+            self.control_timer.deinit()
+            self.control_timer = None
+        if self.counter is not None:
+            self.counter.close()
+            self.counter = None
+        else:
+            self.pulse_pin.irq(None)
         self.speed_pin.deinit()
 
     def stop(self):
+        self.closed_loop = False
         duty = self.stop_duty
         self.speed_pin.duty_u16(duty)
         utime.sleep_ms(1)
@@ -183,12 +399,14 @@ class FIT0441MotorWithPulses(ColObjects.Motor):
         self.direction_pin_GPIO.close()
         self.speed_pin_GPIO.close()
         self.pulse_pin_GPIO.close()
+        self.pid.close()
         super().close()
 
+    def calibrate(self, calibration=None, deadband=0):  #  see ColObjects.Motor.make_duty_table
+        self.duty_table = self.make_duty_table(self.min_speed_duty, self.max_speed_duty, calibration, deadband)
+
     def set_speed(self, speed):  #  as a percentage
-        self.duty = (self.min_speed_duty
-                     - int(float(self.min_speed_duty - self.max_speed_duty)
-                        * (float(speed) / 100.0)))
+        self.duty = self.duty_table[self.duty_index(speed, 0)]
         self.speed_pin.duty_u16(self.duty)
     
     def set_direction(self, direction):  # 1 = clockwise, 0 = anticlockwise
@@ -198,7 +416,7 @@ class FIT0441MotorWithPulses(ColObjects.Motor):
             self.direction_pin.value(self.anticlockwise)
 
 class L298NMotor(ColObjects.Motor):
-    def __init__(self, name, clk_pin_no, anti_pin_no):
+    def __init__(self, name, clk_pin_no, anti_pin_no, calibration=None, deadband=0):
         super().__init__(name)
         #  clk is clockwise looking at the motor from the wheel side
         self.stop_duty = 0
@@ -218,14 +436,16 @@ class L298NMotor(ColObjects.Motor):
         self.anti_PWM = machine.PWM(self.anti_pin)
         self.anti_PWM.freq(self.freq)
         self.anti_PWM.duty_u16(self.stop_duty)
+        self.calibrate(calibration, deadband)
+    def calibrate(self, calibration=None, deadband=0):  #  see ColObjects.Motor.make_duty_table
+        self.duty_table = self.make_duty_table(self.min_speed_duty, self.max_speed_duty, calibration, deadband)
     def __str__(self):
         outstring = self.name
         outstring += ', clockwise pin: ' + str(self.clk_pin_GPIO.pin_no)
         outstring += ', anticlockwise pin: ' + str(self.anti_pin_GPIO.pin_no)
         return outstring
     def convert_speed_to_duty(self, speed):
-        duty = int((self.max_speed_duty - self.min_speed_duty) / 100 * speed)
-        return duty
+        return self.duty_table[self.duty_index(speed, 0)]
     def clk(self, speed):
         self.anti_PWM.duty_u16(self.stop_duty)
         self.clk_PWM.duty_u16(self.convert_speed_to_duty(speed))
@@ -243,45 +463,11 @@ class L298NMotor(ColObjects.Motor):
         self.anti_pin_GPIO.close()
         super().close()
 
-class Mixer(ColObjects.ColObj):
-    def __init__(self, name):
-        super().__init__(name)
-    def array_abs(self, input_array):
-        output_array = []
-        for element in input_array:
-            if element is None:
-                output_array.append(0)
-            else:
-                output_array.append(abs(element))
-        return output_array
+class Mixer(ColObjects.MecanumMixer):
+    def __init__(self, name, mode='RATIO'):
+        super().__init__(name, mode)
     def mix(self, spin, fore_and_aft, crab=0):  #  expects values in range -100 to +100
-        inputs_abs = self.array_abs([spin, fore_and_aft, crab])
-        biggest_in = max(inputs_abs)
-        total_in = sum(inputs_abs)
-        if total_in == 0:
-            return 0,0,0,0
-        fwd_levels = [fore_and_aft, fore_and_aft, fore_and_aft, fore_and_aft]
-        spin_levels = [spin, -spin, spin, -spin]
-        fwd_abs = self.array_abs(fwd_levels)
-        spin_abs = self.array_abs(spin_levels)
-        total_out = sum(fwd_abs) + sum(spin_abs)
-        crab_levels = [0,0,0,0]
-        if crab != 0:
-            crab_levels = [crab, crab, -crab, -crab]
-            crab_abs = self.array_abs(crab_levels)
-            total_out = total_out + sum(crab_abs)
-        ratio_a = 1.0
-        lf_level = (fwd_levels[0] + spin_levels[0] + crab_levels[0]) * ratio_a
-        rf_level = (fwd_levels[1] + spin_levels[1] - crab_levels[1]) * ratio_a
-        lb_level = (fwd_levels[2] + spin_levels[2] + crab_levels[2]) * ratio_a
-        rb_level = (fwd_levels[3] + spin_levels[3] - crab_levels[3]) * ratio_a
-        output_abs = self.array_abs([lf_level, rf_level, lb_level, rb_level])
-        biggest_out = max(output_abs)
-        ratio_b = biggest_in / biggest_out
-        lf_level = lf_level * ratio_b
-        rf_level = rf_level * ratio_b
-        lb_level = lb_level * ratio_b
-        rb_level = rb_level * ratio_b
+        lf_level, rf_level, lb_level, rb_level = self.mix_into(fore_and_aft, spin, crab)
         return lf_level, rf_level, lb_level, rb_level
 
 class Side(ColObjects.ColObj):
@@ -314,6 +500,12 @@ class Side(ColObjects.ColObj):
             self.rev(-speed)
         else:
             self.fwd(speed)
+    def drive_rpm(self, rpm):   #  closed loop, motors with set_rpm() only; negative is reverse
+        for motor in self.my_motors:
+            if self.which_side == 'L':
+                motor.set_rpm(-rpm)
+            else:
+                motor.set_rpm(rpm)
     def stop(self):
         for motor in self.my_motors:
             motor.stop()
@@ -7,7 +7,7 @@ import machine
 import utime
 
 class NeoPixel(GPIOPico.Reserved):
-    def __init__(self, name, pin_no, no_pixels, mode):
+    def __init__(self, name, pin_no, no_pixels, mode, dma=False):
         super().__init__(name, 'NEOPIXEL', pin_no)
         self.valid = False
         #  On Pico W the wireless uses state machine 4 in block 1
@@ -17,7 +17,9 @@ class NeoPixel(GPIOPico.Reserved):
         #GPIOPico.GPIO.allocate(pin_no, self)
         self.no_pixels = no_pixels
         self.mode = mode
-        self.pixels = neopixel.Neopixel(self.no_pixels, self.state_machine_no, self.pin_no, self.mode)
+        #  With dma show() returns at once and frames go out while the next is drawn; a show() that
+        #  comes while the last frame is still going out returns False and goes out after it
+        self.pixels = neopixel.Neopixel(self.no_pixels, self.state_machine_no, self.pin_no, self.mode, dma=dma)
         #  The following definitions are examples which can be overriden or augmented
         self.colours = {'red':(255, 0, 0),
                         'dim_red':(63,0,0),
@@ -67,18 +69,20 @@ class NeoPixel(GPIOPico.Reserved):
     def fill_sector(self, sector, colour):
         start = self.sectors[sector][0]
         end = self.sectors[sector][1]
-        self.pixels[start:end+1] = self.colours[colour]
+        self.pixels.set_pixel_line(start, end, self.colours[colour])
         self.pixels.show()
 
     def show(self):
-        self.pixels.show()
+        return self.pixels.show()
         
     def clear(self):
         self.pixels.clear()
         self.pixels.show()
 
     def close(self):
-        self.clear()
+        self.pixels.clear()
+        self.pixels.show()
+        self.pixels.close()   #  with dma, waits for the clear to go out
         utime.sleep_ms(100)
         super().close()
         utime.sleep_ms(100)
@@ -1,4 +1,6 @@
+import array
 import machine
+import math
 import utime
 
 class KitronikPicoRobotics:
@@ -8,11 +10,322 @@ class KitronikPicoRobotics:
     SRV_REG_BASE = 0x08
     MOT_REG_BASE = 0x28
     REG_OFFSET = 4
+    LED_REG_FIRST = 0x06 #LED0_ON_L
+    LED_REG_LAST = 0x45 #LED15_OFF_H
+    MODE1_AI = 0x20 #MODE1 auto-increment bit - lets one write fill a block of registers
+    MAX_FREQ = 1000000 #the PCA9685 runs up to Fast-mode Plus
+    QUEUE_DRAINERS = ['THREAD', 'TASK', 'CALLER']
 
     #to perform a software reset on the PCA chip.
     #Separate from the init function so we can reset at any point if required - useful for development...
     def swReset(self):
         self.i2c.writeto(0,"\x06")
+        self.autoIncrement = False #reset clears MODE1, so back to one register per write until initPCA
+        self.invalidate()
+
+    #forget what the chip holds, so the next write to every register goes out on the bus.
+    #Call this after anything that changes the chip behind our back (swReset already does).
+    def invalidate(self):
+        for i in range(len(self.shadowValid)):
+            self.shadowValid[i] = 0
+
+    #write a block of registers unless the chip already holds exactly these bytes
+    #inside a frame the bytes are only staged, and go out at commitFrame
+    def writeBlock(self, register, block):
+        n = len(block)
+        if self.queued:
+            self.enqueueBlock(register, block)
+            return
+        if self.inFrame:
+            for i in range(n):
+                self.staged[register + i] = block[i]
+                self.dirty[register + i] = 1
+            if register < self.dirtyLow:
+                self.dirtyLow = register
+            if register + n - 1 > self.dirtyHigh:
+                self.dirtyHigh = register + n - 1
+            return
+        if self.useShadow:
+            same = True
+            for i in range(n):
+                if not self.shadowValid[register + i] or self.shadow[register + i] != block[i]:
+                    same = False
+                    break
+            if same:
+                self.cacheHits += 1
+                self.cacheBytesSaved += n + 2 #address and register bytes too
+                return
+            self.cacheMisses += 1
+        self.i2c.writeto_mem(self.CHIP_ADDRESS, register, block)
+        for i in range(n):
+            self.shadow[register + i] = block[i]
+            self.staged[register + i] = block[i]
+            self.shadowValid[register + i] = 1
+
+    #single register version for when auto-increment is off
+    def writeReg(self, register, value):
+        self.regBlock[0] = value
+        self.writeBlock(register, self.regBlock)
+
+    #################
+    #Frames
+    #################
+    #Between beginFrame and commitFrame motorOn and servoWrite only record the new register values.
+    #commitFrame then sends the registers that really changed as a few auto-increment runs, so every
+    #motor and servo of a control tick changes at the same STOP.
+    #Unchanged registers up to FRAME_GAP long are sent again inside a run rather than starting another
+    #transaction - 2 is the break-even for bus time (a new transaction costs the address and register
+    #bytes, start and stop).  Inside the motor registers any gap is bridged, so all the wheels change
+    #together at one STOP however many of them moved, and the same inside the servo registers, so a
+    #pose reaches every servo at once.
+    FRAME_GAP = 2
+    FRAME_SYNC_FIRST = MOT_REG_BASE
+    FRAME_SYNC_LAST = MOT_REG_BASE + (8 * REG_OFFSET) - 1
+    SERVO_SYNC_FIRST = SRV_REG_BASE
+    SERVO_SYNC_LAST = SRV_REG_BASE + (8 * REG_OFFSET) - 1
+
+    #Frames nest: a beginFrame inside an open frame (a pose or a stepper stop inside the caller's tick)
+    #joins it, and only the outermost commitFrame sends.
+    #With the queue started the frame state changes under queueLock, so a drainer on the other core sees
+    #a frame whole or not at all.
+    def beginFrame(self):
+        if self.queued:
+            self.queueLock.acquire()
+        self.frameDepth += 1
+        self.inFrame = True
+        if self.queued:
+            self.queueLock.release()
+
+    #for timer driven writers, which leave a tick alone rather than commit someone else's frame
+    def frameOpen(self):
+        return self.inFrame
+
+    def commitFrame(self):
+        if self.queued:
+            self.queueLock.acquire()
+            if self.frameDepth > 1:
+                self.frameDepth -= 1
+            else:
+                self.frameDepth = 0
+                self.inFrame = False
+            self.queueLock.release()
+            return 0 #the queue drainer sends it
+        if self.frameDepth > 1:
+            self.frameDepth -= 1
+            return 0 #the outer frame sends it
+        self.frameDepth = 0
+        self.inFrame = False
+        runs = self.buildRuns()
+        self.sendRuns(runs, self.stagedView, self.staged)
+        self.frameTransactions += runs
+        return runs
+
+    #send each run and only then take its bytes into the shadow; if a write fails the chip may hold
+    #anything, so the whole shadow is forgotten and every later write goes out on the bus
+    def sendRuns(self, runs, view, source):
+        for k in range(runs):
+            try:
+                self.i2c.writeto_mem(self.CHIP_ADDRESS, self.runFirst[k], view[self.runFirst[k]:self.runLast[k] + 1])
+            except OSError:
+                self.invalidate()
+                raise
+            for register in range(self.runFirst[k], self.runLast[k] + 1):
+                self.shadow[register] = source[register]
+                self.shadowValid[register] = 1
+
+    #turn the dirty registers into runs in runFirst/runLast; the shadow is left to sendRuns.
+    #runQueued gets the enqueue time of the oldest register in each run.
+    def buildRuns(self):
+        runs = 0
+        runStart = -1
+        runEnd = -1
+        for register in range(self.dirtyLow, self.dirtyHigh + 1):
+            if not self.dirty[register]:
+                continue
+            self.dirty[register] = 0
+            if self.useShadow and self.shadowValid[register] and self.shadow[register] == self.staged[register]:
+                continue
+            if runStart >= 0:
+                #carry on the run if the gap is short and every byte in it is known
+                gapOk = self.autoIncrement and (register - runEnd - 1 <= self.FRAME_GAP or
+                        (runEnd >= self.FRAME_SYNC_FIRST and register <= self.FRAME_SYNC_LAST) or
+                        (runEnd >= self.SERVO_SYNC_FIRST and register <= self.SERVO_SYNC_LAST))
+                for gap in range(runEnd + 1, register):
+                    if not self.shadowValid[gap]:
+                        gapOk = False
+                if gapOk:
+                    runEnd = register
+                    if utime.ticks_diff(self.queuedAt[register], self.runQueued[runs - 1]) < 0:
+                        self.runQueued[runs - 1] = self.queuedAt[register]
+                    continue
+                self.runLast[runs - 1] = runEnd
+            runStart = register
+            runEnd = register
+            self.runFirst[runs] = register
+            self.runQueued[runs] = self.queuedAt[register]
+            runs += 1
+        if runStart >= 0:
+            self.runLast[runs - 1] = runEnd
+        self.dirtyLow = 256
+        self.dirtyHigh = -1
+        return runs
+
+    #################
+    #Queued writer
+    #################
+    #With the queue started, motorOn and servoWrite only stage their registers and return; a drainer
+    #(the second core via queueThread, a uasyncio task via queueTask, or the caller via drainQueue)
+    #sends them. A register written again before it goes out just takes the newer value.
+    #Queue depth is counted in pending registers; an update that would take it past maxDepth waits
+    #for the drainer (back-pressure), or drains in line if no drainer is running.
+    #Inside a frame nothing can drain until commitFrame, so a frame is taken whole even past maxDepth
+    #and the next update outside it waits instead.
+    def startQueue(self, maxDepth=64, drainer='THREAD'):
+        if drainer not in self.QUEUE_DRAINERS:
+            raise Exception("INVALID QUEUE DRAINER")
+        import _thread
+        import ColObjects_V16 as ColObjects
+        self.queueLock = _thread.allocate_lock()
+        self.maxQueueDepth = maxDepth
+        self.queueDepth = 0
+        self.queueStalls = 0
+        self.queueUpdates = 0
+        self.queueTransactions = 0
+        self.depthHistogram = ColObjects.Histogram('PCA9685 queue depth', 4, 17)
+        self.latencyHistogram = ColObjects.Histogram('PCA9685 queue latency', 250, 64)
+        self.queueDrainer = drainer
+        self.queueRunning = drainer != 'CALLER'
+        self.queued = True
+        if drainer == 'THREAD':
+            _thread.start_new_thread(self.queueThread, ())
+
+    def stopQueue(self):
+        if not self.queued:
+            return
+        self.queueRunning = False
+        if self.queueDrainer == 'THREAD':
+            for i in range(100): #give the thread up to 100ms to see the flag
+                if self.queueDrainer == 'STOPPED':
+                    break
+                utime.sleep_ms(1)
+        self.queued = False
+        self.inFrame = False
+        self.frameDepth = 0
+        self.drainRuns()
+        self.queueDepth = 0 #so a uasyncio task finishing late finds nothing to do
+        self.depthHistogram.close()
+        self.latencyHistogram.close()
+
+    def enqueueBlock(self, register, block):
+        n = len(block)
+        while True:
+            self.queueLock.acquire()
+            new = 0
+            for i in range(n):
+                if not self.dirty[register + i]:
+                    new += 1
+            if self.inFrame or self.queueDepth + new <= self.maxQueueDepth:
+                break
+            self.queueLock.release()
+            self.queueStalls += 1
+            if self.queueRunning:
+                utime.sleep_us(50)
+            else:
+                self.drainQueue()
+        self.stageBlock(register, block)
+        self.queueLock.release()
+
+    #take a block into the pending registers; the caller holds queueLock
+    def stageBlock(self, register, block):
+        n = len(block)
+        now = utime.ticks_us()
+        for i in range(n):
+            r = register + i
+            if self.dirty[r]:
+                self.staged[r] = block[i] #superseded before it went out
+            elif not (self.useShadow and self.shadowValid[r] and self.shadow[r] == block[i]):
+                self.staged[r] = block[i]
+                self.dirty[r] = 1
+                self.queuedAt[r] = now
+                self.queueDepth += 1
+        if register < self.dirtyLow:
+            self.dirtyLow = register
+        if register + n - 1 > self.dirtyHigh:
+            self.dirtyHigh = register + n - 1
+        self.queueUpdates += 1
+        self.depthHistogram.add(self.queueDepth)
+
+    #one pass of the drainer: take the pending runs under the lock, send them outside it
+    def drainQueue(self):
+        if self.inFrame or self.queueDepth == 0:
+            return 0
+        self.queueLock.acquire()
+        if self.inFrame: #a frame began while we waited for the lock
+            self.queueLock.release()
+            return 0
+        runs = self.buildRuns()
+        for k in range(runs):
+            for register in range(self.runFirst[k], self.runLast[k] + 1):
+                self.sendBuffer[register] = self.staged[register]
+        self.queueDepth = 0
+        self.queueLock.release()
+        for k in range(runs):
+            try:
+                self.i2c.writeto_mem(self.CHIP_ADDRESS, self.runFirst[k], self.sendView[self.runFirst[k]:self.runLast[k] + 1])
+            except OSError:
+                self.invalidate()
+                raise
+            self.queueLock.acquire()
+            for register in range(self.runFirst[k], self.runLast[k] + 1):
+                self.shadow[register] = self.sendBuffer[register]
+                self.shadowValid[register] = 1
+            self.queueLock.release()
+            self.latencyHistogram.add(utime.ticks_diff(utime.ticks_us(), self.runQueued[k]))
+        self.queueTransactions += runs
+        return runs
+
+    #whatever is still pending once the queue has stopped goes out synchronously
+    def drainRuns(self):
+        runs = self.buildRuns()
+        self.sendRuns(runs, self.stagedView, self.staged)
+        return runs
+
+    def queueThread(self):
+        while self.queueRunning:
+            self.serviceSteppers()
+            if self.drainQueue() == 0:
+                utime.sleep_us(100)
+        self.queueDrainer = 'STOPPED'
+
+    async def queueTask(self, period_ms=1):
+        try:
+            import uasyncio as asyncio
+        except ImportError:
+            import asyncio
+        while self.queueRunning:
+            self.serviceSteppers()
+            self.drainQueue()
+            await asyncio.sleep(period_ms / 1000.0)
+        self.queueDrainer = 'STOPPED'
+
+    def queueReport(self):
+        if not self.queued:
+            return {}
+        return {'Queue Depth':self.queueDepth, 'Max Depth Seen':self.depthHistogram.biggest,
+                'Depth P99':self.depthHistogram.percentile(99), 'Updates':self.queueUpdates,
+                'Stalls':self.queueStalls, 'Transactions':self.queueTransactions,
+                'Latency P50 us':self.latencyHistogram.percentile(50),
+                'Latency P99 us':self.latencyHistogram.percentile(99), 'Latency Max us':self.latencyHistogram.biggest}
+
+    def cacheReport(self):
+        return {'Hits':self.cacheHits, 'Misses':self.cacheMisses, 'Bytes Saved':self.cacheBytesSaved,
+                'Frame Transactions':self.frameTransactions}
+
+    def clearCacheCounts(self):
+        self.cacheHits = 0
+        self.cacheMisses = 0
+        self.cacheBytesSaved = 0
+        self.frameTransactions = 0
 
     #setup the PCA chip for 50Hz and zero out registers.
     def initPCA(self):
@@ -24,8 +337,14 @@ class KitronikPicoRobotics:
         self.i2c.writeto_mem(108,0xfb,"\x00")
         self.i2c.writeto_mem(108,0xfc,"\x00")
         self.i2c.writeto_mem(108,0xfd,"\x00")
-        #come out of sleep
-        self.i2c.writeto_mem(108,0x00,"\x01")
+        #which loads every LEDn register, so the shadow now knows them all to be 0
+        for register in range(self.LED_REG_FIRST, self.LED_REG_LAST + 1):
+            self.shadow[register] = 0
+            self.staged[register] = 0
+            self.shadowValid[register] = 1
+        #come out of sleep, with register auto-increment on
+        self.i2c.writeto_mem(108,0x00,bytes([0x01 | self.MODE1_AI]))
+        self.autoIncrement = True
 
 #useful if you need to read the vaules out - but needs ubinascii to make it nice to read.
     #def readMode1Reg():
@@ -49,24 +368,39 @@ class KitronikPicoRobotics:
     # (degrees x count per degree )+ offset 
 
     def servoWrite(self,servo, degrees):
+        self.servoRaw(servo, self.servoCount(degrees))
+
+    #the count servoWrite sends for an angle, so a sequence can be worked out ahead of time
+    def servoCount(self, degrees):
         #check the degrees is a reasonable number. we expect 0-180, so cap at those values.
         if(degrees>180):
             degrees = 180
         elif (degrees<0):
             degrees = 0
+        return int((degrees*2.2755)+102) # see comment above for maths
+
+    #send a count from servoCount
+    def servoRaw(self, servo, PWMVal):
         #check the servo number
         if((servo<1) or (servo>8)):
             raise Exception("INVALID SERVO NUMBER") #harsh, but at least you'll know
         calcServo = self.SRV_REG_BASE + ((servo - 1) * self.REG_OFFSET)
-        PWMVal = int((degrees*2.2755)+102) # see comment above for maths
         lowByte = PWMVal & 0xFF
         highByte = (PWMVal>>8)&0x01 #cap high byte at 1 - shoud never be more than 2.5mS.
-        self.i2c.writeto_mem(self.CHIP_ADDRESS, calcServo,bytes([lowByte]))
-        self.i2c.writeto_mem(self.CHIP_ADDRESS, calcServo+1,bytes([highByte]))
+        if self.autoIncrement:
+            #one transaction for the OFF low and high bytes
+            self.servoBlock[0] = lowByte
+            self.servoBlock[1] = highByte
+            self.writeBlock(calcServo,self.servoBlock)
+            return
+        self.writeReg(calcServo,lowByte)
+        self.writeReg(calcServo+1,highByte)
 
 
     #Driving the motor is simpler than the servo - just convert 0-100% to 0-4095 and push it to the correct registers.
     #each motor has 4 writes - low and high bytes for a pair of registers. 
+    #With auto-increment on they go as one 6 byte block: OFF of the first channel, ON of the second (always 0)
+    #and OFF of the second, so the motor changes in one transaction - the chip updates the outputs at the STOP.
     def motorOn(self,motor, direction, speed):
         #cap speed to 0-100%
         if (speed<0):
@@ -79,74 +413,366 @@ class KitronikPicoRobotics:
         lowByte = PWMVal & 0xFF
         highByte = (PWMVal>>8) & 0xFF #motors can use all 0-4096
         #print (motor, direction, "LB ",lowByte," HB ",highByte)
-        if direction == "f":
-            self.i2c.writeto_mem(self.CHIP_ADDRESS, motorReg,bytes([lowByte]))
-            self.i2c.writeto_mem(self.CHIP_ADDRESS, motorReg+1,bytes([highByte]))
-            self.i2c.writeto_mem(self.CHIP_ADDRESS, motorReg+4,bytes([0]))
-            self.i2c.writeto_mem(self.CHIP_ADDRESS, motorReg+5,bytes([0]))
+        if self.autoIncrement and (direction == "f" or direction == "r"):
+            block = self.motorBlock
+            if direction == "f":
+                block[0] = lowByte
+                block[1] = highByte
+                block[4] = 0
+                block[5] = 0
+            else:
+                block[0] = 0
+                block[1] = 0
+                block[4] = lowByte
+                block[5] = highByte
+            self.writeBlock(motorReg,block)
+        elif direction == "f":
+            self.writeReg(motorReg,lowByte)
+            self.writeReg(motorReg+1,highByte)
+            self.writeReg(motorReg+4,0)
+            self.writeReg(motorReg+5,0)
         elif direction == "r":
-            self.i2c.writeto_mem(self.CHIP_ADDRESS, motorReg+4,bytes([lowByte]))
-            self.i2c.writeto_mem(self.CHIP_ADDRESS, motorReg+5,bytes([highByte]))
-            self.i2c.writeto_mem(self.CHIP_ADDRESS, motorReg,bytes([0]))
-            self.i2c.writeto_mem(self.CHIP_ADDRESS, motorReg+1,bytes([0]))
+            self.writeReg(motorReg+4,lowByte)
+            self.writeReg(motorReg+5,highByte)
+            self.writeReg(motorReg,0)
+            self.writeReg(motorReg+1,0)
         else:
-            self.i2c.writeto_mem(self.CHIP_ADDRESS, motorReg+4,bytes([0]))
-            self.i2c.writeto_mem(self.CHIP_ADDRESS, motorReg+5,bytes([0]))
-            self.i2c.writeto_mem(self.CHIP_ADDRESS, motorReg,bytes([0]))
-            self.i2c.writeto_mem(self.CHIP_ADDRESS, motorReg+1,bytes([0]))
+            self.writeReg(motorReg+4,0)
+            self.writeReg(motorReg+5,0)
+            self.writeReg(motorReg,0)
+            self.writeReg(motorReg+1,0)
             raise Exception("INVALID DIRECTION")
     #To turn off set the speed to 0...
     def motorOff(self,motor):
         self.motorOn(motor,"f",0)
         
+    #write a signed raw level (-4095 to 4095) to one motor output, as used for stepper coils and for
+    #motors that look their level up in a duty table
+    def coilWrite(self, coil, pwm):
+        motorReg = self.MOT_REG_BASE + (2 * (coil - 1) * self.REG_OFFSET)
+        level = pwm if pwm >= 0 else -pwm
+        lowByte = level & 0xFF
+        highByte = (level>>8) & 0x0F
+        if pwm >= 0:
+            lowA, highA, lowB, highB = lowByte, highByte, 0, 0
+        else:
+            lowA, highA, lowB, highB = 0, 0, lowByte, highByte
+        if self.autoIncrement:
+            block = self.motorBlock
+            block[0] = lowA
+            block[1] = highA
+            block[4] = lowB
+            block[5] = highB
+            self.writeBlock(motorReg,block)
+        else:
+            self.writeReg(motorReg,lowA)
+            self.writeReg(motorReg+1,highA)
+            self.writeReg(motorReg+4,lowB)
+            self.writeReg(motorReg+5,highB)
+
+    #both coils of a stepper change together. Queued, they are staged under one hold of queueLock, so a
+    #stepper serviced on the second core never opens or closes the caller's frame and never shares the
+    #caller's motorBlock; otherwise they go out as a frame of their own (or join the caller's).
+    def coilPair(self, coilA, pwmA, coilB, pwmB):
+        if self.queued:
+            self.queueLock.acquire()
+            self.stageCoil(coilA, pwmA)
+            self.stageCoil(coilB, pwmB)
+            self.queueLock.release()
+            return
+        self.beginFrame()
+        self.coilWrite(coilA, pwmA)
+        self.coilWrite(coilB, pwmB)
+        self.commitFrame()
+
+    #coilWrite for the queued stepper path, into the pending registers; the caller holds queueLock
+    def stageCoil(self, coil, pwm):
+        motorReg = self.MOT_REG_BASE + (2 * (coil - 1) * self.REG_OFFSET)
+        level = pwm if pwm >= 0 else -pwm
+        block = self.coilBlock
+        if pwm >= 0:
+            block[0], block[1], block[4], block[5] = level & 0xFF, (level>>8) & 0x0F, 0, 0
+        else:
+            block[0], block[1], block[4], block[5] = 0, 0, level & 0xFF, (level>>8) & 0x0F
+        if self.autoIncrement:
+            self.stageBlock(motorReg, block)
+            return
+        for offset in (0, 1, 4, 5):
+            self.coilReg[0] = block[offset]
+            self.stageBlock(motorReg + offset, self.coilReg)
+
     #################
     #Stepper Motors
     #################
-    #this is only a basic full stepping.
-    #speed sets the length of the pulses (and hence the speed...)
-    #so is 'backwards' - the fastest that works reliably with the motors I have to hand is 20mS, but slower than that is good. tested to 2000 (2 seconds per step).
+    #Steppers run in the background: every STEPPER_TICK_MS a machine.Timer calls serviceSteppers, which
+    #makes any steps that are due. With the queue started the drainer services them instead, and with
+    #stepperDriver = 'CALLER' the program calls serviceSteppers itself (uasyncio task, host benchmarks).
+    #Both coils of a step are written in one frame, so they change together.
     # motor should be 1 or 2 - 1 is terminals for motor 1 and 2 on PCB, 2 is terminals for motor 3 and 4 on PCB
+    STEPPER_TICK_MS = 1
+    STEPPER_DRIVERS = ['TIMER', 'CALLER']
 
-    def step(self,motor, direction, steps, speed =20, holdPosition=False):
+    #the Stepper for motor 1 or 2, made (or remade, if the mode changes) as needed
+    def stepper(self, motor, mode='FULL', microsteps=8):
+        if (motor<1) or (motor>2):
+            raise Exception("INVALID STEPPER NUMBER")
+        current = self.steppers[motor]
+        if (current is None) or (current.mode != mode) or (mode == 'MICRO' and current.microsteps != microsteps):
+            if (current is not None) and current.moving():
+                raise Exception("STEPPER BUSY")
+            self.steppers[motor] = Stepper(self, motor, mode, microsteps)
+        return self.steppers[motor]
 
-        if(direction =="f"):
-            directions = ["f", "r"]
-            coils = [((motor*2)-1),(motor*2)]
-        elif (direction == "r"):
-            directions = ["r", "f"]
-            coils = [(motor*2),((motor*2)-1)]
-        else:
-            raise Exception("INVALID DIRECTION") #harsh, but at least you'll know
-        while steps > 0: 
-            for direction in directions:
-                if(steps == 0):
-                    break
-                for coil in coils:
-                    self.motorOn(coil,direction,100)
-                    utime.sleep_ms(speed)
-                    steps -=1
-                    if(steps == 0):
-                        break
-    #to save power turn off the coils once we have finished.
-    #this means the motor wont hold position.
-        if(holdPosition == False):            
-            for coil in coils:
-                self.motorOff(coil)
+    def serviceSteppers(self):
+        if self.inFrame:
+            return #someone else's frame is open, try again next tick
+        moving = False
+        for stepper in self.steppers:
+            if (stepper is not None) and stepper.moving():
+                stepper.service()
+                moving = moving or stepper.moving()
+        if (not moving) and (self.stepperTimer is not None):
+            self.stepperTimer.deinit()
+            self.stepperTimer = None
+
+    def setStepperDriver(self, driver):
+        if driver not in self.STEPPER_DRIVERS:
+            raise Exception("INVALID STEPPER DRIVER")
+        self.stepperDriver = driver
+
+    #a running queue drainer services the steppers itself; with the caller draining the timer still runs
+    def startStepperTimer(self):
+        if (self.queued and self.queueRunning) or (self.stepperDriver != 'TIMER') or (self.stepperTimer is not None):
+            return
+        self.stepperTimer = machine.Timer(-1)
+        self.stepperTimer.init(mode=machine.Timer.PERIODIC, period=self.STEPPER_TICK_MS,
+                               callback=lambda timer: self.serviceSteppers())
+
+    #speed is milliseconds per full step, as before - so is 'backwards'. Blocks until done.
+    def step(self,motor, direction, steps, speed =20, holdPosition=False):
+        if speed <= 0:
+            raise Exception("INVALID SPEED")
+        move = self.stepper(motor).move(direction, steps, 1000.0 / speed, holdPosition)
+        move.wait()
+        return move
 
     #Step an angle. this is limited by the step resolution - so 200 steps is 1.8 degrees per step for instance.
     # a request for 20 degrees with 200 steps/rev will result in 11 steps - or 19.8 rather than 20.
-    def stepAngle(self,motor, direction, angle, speed =20, holdPosition=False, stepsPerRev=200):
+    #Returns at once with a StepperMove: call wait(), await waitAsync(), or poll done.
+    #accel is in full steps per second per second, 0 for none.
+    def stepAngle(self,motor, direction, angle, speed =20, holdPosition=False, stepsPerRev=200, accel=0):
+        if speed <= 0:
+            raise Exception("INVALID SPEED")
         steps = int(angle/(360/stepsPerRev))
-        print (steps)
-        self.step(motor, direction, steps, speed, holdPosition)
+        return self.stepper(motor).move(direction, steps, 1000.0 / speed, holdPosition, accel)
         
 
     #initialaisation code for using:
         #defaluts to the standard pins and address for the kitronik board, but could be overridden
-    def __init__(self, I2CAddress=108,sda=8,scl=9):
+        #freq is the I2C clock: 100000 standard, 400000 fast mode, up to 1000000 Fast-mode Plus
+    def __init__(self, I2CAddress=108,sda=8,scl=9,freq=100000):
+        if (freq<=0) or (freq>self.MAX_FREQ):
+            raise Exception("INVALID I2C FREQUENCY")
         self.CHIP_ADDRESS = 108
+        self.autoIncrement = False
+        self.motorBlock = bytearray(6) #reused for every coalesced write, bytes 2 and 3 stay 0
+        self.coilBlock = bytearray(6) #the same for the queued stepper path, see coilPair
+        self.coilReg = bytearray(1)
+        self.servoBlock = bytearray(2)
+        self.regBlock = bytearray(1)
+        #shadow copy of the chip's registers, so unchanged writes can be skipped
+        self.useShadow = True
+        self.shadow = bytearray(256)
+        self.shadowValid = bytearray(256)
+        #frame staging, see beginFrame
+        self.inFrame = False
+        self.frameDepth = 0
+        self.staged = bytearray(256)
+        self.stagedView = memoryview(self.staged)
+        self.dirty = bytearray(256)
+        self.dirtyLow = 256
+        self.dirtyHigh = -1
+        self.runFirst = bytearray(128)
+        self.runLast = bytearray(128)
+        self.queuedAt = [0] * 256 #ticks_us each pending register was queued
+        self.runQueued = [0] * 128
+        #queued writer, see startQueue
+        self.queued = False
+        self.sendBuffer = bytearray(256)
+        self.sendView = memoryview(self.sendBuffer)
+        self.clearCacheCounts()
         sda=machine.Pin(sda)
         scl=machine.Pin(scl)
-        self.i2c=machine.I2C(0,sda=sda, scl=scl, freq=100000)
+        self.i2c=machine.I2C(0,sda=sda, scl=scl, freq=freq)
+        self.steppers = [None, None, None] #index 1 and 2
+        self.stepperDriver = 'TIMER'
+        self.stepperTimer = None
         self.initPCA()
          
+
+
+#One stepper on a pair of motor outputs. The coil levels for one electrical cycle are precomputed:
+# FULL   4 steps, both coils on (the sequence the old blocking step made)
+# HALF   8 steps, alternating one and both coils on
+# MICRO  4 x microsteps steps, sine and cosine PWM levels
+#position counts table steps, signed, forward positive.
+class Stepper:
+    MODES = ['FULL', 'HALF', 'MICRO']
+
+    def __init__(self, board, motor, mode='FULL', microsteps=8):
+        if mode not in self.MODES:
+            raise Exception("INVALID STEPPER MODE")
+        self.board = board
+        self.motor = motor
+        self.coilA = (motor*2)-1
+        self.coilB = motor*2
+        self.mode = mode
+        if mode == 'FULL':
+            self.microsteps = 1
+        elif mode == 'HALF':
+            self.microsteps = 2
+        else:
+            self.microsteps = microsteps
+        self.stepsPerCycle = 4 * self.microsteps
+        self.table = Stepper.coilTable(mode, self.stepsPerCycle)
+        self.phase = 0
+        self.position = 0
+        self.current = None #the StepperMove in progress
+        self.remaining = 0
+        self.stepsDone = 0
+        self.direction = 1
+        self.nextAt = 0
+
+    #coil A and B levels interleaved, one pair per table step; step i is at 45 + (i x 360 / steps) degrees
+    def coilTable(mode, steps):
+        table = []
+        for i in range(steps):
+            angle = (math.pi / 4) + (2 * math.pi * i / steps)
+            for level in (math.cos(angle), math.sin(angle)):
+                if mode == 'MICRO':
+                    table.append(int(round(4095 * level)))
+                elif level > 0.01:
+                    table.append(4095)
+                elif level < -0.01:
+                    table.append(-4095)
+                else:
+                    table.append(0)
+        return array.array('h', table)
+
+    def moving(self):
+        return self.remaining > 0
+
+    def fullSteps(self):
+        return self.position / self.microsteps
+
+    #start a move of steps full steps at rate full steps per second; accel 0 is a constant rate.
+    #A new move replaces one in progress, which is marked cancelled.
+    def move(self, direction, steps, rate, holdPosition=False, accel=0):
+        if direction == "f":
+            sign = 1
+        elif direction == "r":
+            sign = -1
+        else:
+            raise Exception("INVALID DIRECTION") #harsh, but at least you'll know
+        if self.current is not None:
+            self.current.finish(True)
+        move = StepperMove(self, int(steps) * self.microsteps)
+        self.current = move
+        self.direction = sign
+        self.holdPosition = holdPosition
+        self.maxRate = rate * self.microsteps
+        self.accel = accel * self.microsteps
+        self.stepsDone = 0
+        self.nextAt = utime.ticks_us()
+        self.remaining = move.steps
+        if self.remaining == 0:
+            move.finish(False)
+            self.current = None
+            return move
+        self.board.startStepperTimer()
+        return move
+
+    #current rate in table steps per second; accelerate from the start, brake for the end
+    def rate(self):
+        if self.accel <= 0:
+            return self.maxRate
+        up = math.sqrt(2 * self.accel * (self.stepsDone + 1))
+        down = math.sqrt(2 * self.accel * self.remaining)
+        rate = min(self.maxRate, up, down)
+        return rate if rate > 1 else 1
+
+    def service(self):
+        now = utime.ticks_us()
+        if utime.ticks_diff(now, self.nextAt) < 0:
+            return
+        self.phase = (self.phase + self.direction) % self.stepsPerCycle
+        self.writeCoils(self.phase)
+        self.position += self.direction
+        self.remaining -= 1
+        self.stepsDone += 1
+        self.current.stepsDone = self.stepsDone
+        if self.remaining == 0:
+            if not self.holdPosition:
+                self.coilsOff()
+            self.current.finish(False)
+            self.current = None
+            return
+        interval = int(1000000 / self.rate())
+        self.nextAt = utime.ticks_add(self.nextAt, interval)
+        if utime.ticks_diff(now, self.nextAt) > interval:
+            self.nextAt = utime.ticks_add(now, interval) #fell well behind, do not try to catch up in a burst
+
+    def writeCoils(self, phase):
+        self.board.coilPair(self.coilA, self.table[2 * phase], self.coilB, self.table[(2 * phase) + 1])
+
+    def coilsOff(self):
+        self.board.coilPair(self.coilA, 0, self.coilB, 0)
+
+    def stop(self, holdPosition=False):
+        if self.current is not None:
+            self.current.finish(True)
+            self.current = None
+        self.remaining = 0
+        if not holdPosition:
+            self.coilsOff()
+
+#What stepAngle hands back; done is set once the last step is made (or the move is cancelled)
+class StepperMove:
+    def __init__(self, stepper, steps):
+        self.stepper = stepper
+        self.steps = steps
+        self.stepsDone = 0
+        self.done = False
+        self.cancelled = False
+
+    def finish(self, cancelled):
+        self.cancelled = cancelled
+        self.done = True
+
+    def cancel(self):
+        if not self.done:
+            self.stepper.stop(self.stepper.holdPosition)
+
+    #block until done, servicing the stepper and draining the queue here if nothing else does; False on timeout
+    def wait(self, timeout_ms=None):
+        board = self.stepper.board
+        start = utime.ticks_ms()
+        while not self.done:
+            if (timeout_ms is not None) and (utime.ticks_diff(utime.ticks_ms(), start) > timeout_ms):
+                return False
+            callerDrains = board.queued and not board.queueRunning
+            if (board.stepperDriver == 'CALLER') and ((not board.queued) or callerDrains):
+                board.serviceSteppers()
+            if callerDrains:
+                board.drainQueue()
+            utime.sleep_us(100)
+        return True
+
+    async def waitAsync(self, period_ms=2):
+        try:
+            import uasyncio as asyncio
+        except ImportError:
+            import asyncio
+        while not self.done:
+            await asyncio.sleep(period_ms / 1000.0)
+        return not self.cancelled
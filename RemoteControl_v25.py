@@ -2,6 +2,7 @@ module_name = 'RemoteControl_v25.py'
 
 import GPIOPico_v28 as GPIO
 ColObjects = GPIO.ColObjects
+import ColObjects_V16 as ColObjectsV16
 import utime
 import rp2
 
@@ -107,35 +108,17 @@ class Joystick(ColObjects.ColObj):
         self.previous_final_position = final_position
         return final_position
 
-class Interpolator(ColObjects.ColObj):
-    def __init__(self, name, keys, values):  #  arrays of matching pairs
-                                        # keys ascending integers
-                                        # values any floats
-        super().__init__(name)
-        self.keys = keys
-        self.values = values
-    def interpolate(self, in_key):  #  input is integer
-        if in_key is None:
-            return None
-        below_ok = False
-        above_ok = False
-        for i in range(len(self.keys)):
-            if in_key == self.keys[i]:
-                return self.values[i]
-            if in_key > self.keys[i]:
-                below_key = self.keys[i]
-                below_value = self.values[i]
-                below_ok = True
-            if in_key < self.keys[i]:
-                above_key = self.keys[i]
-                above_value = self.values[i]
-                above_ok = True
-                break
-        if above_ok and below_ok:
-            out_value = below_value + (((in_key - below_key) / (above_key - below_key)) * (above_value - below_value))
-            return out_value
-        else:
-            return None
+class Interpolator(ColObjectsV16.Curve, ColObjects.ColObj):  #  precomputed segments, scanned for curves this short
+    error = ColObjects.ColError                                 #  registered with this module's other objects
+    def __init__(self, name, keys, values):
+        ColObjectsV16.Curve.__init__(self, name, keys, values)
+        ColObjects.ColObj.__init__(self, name)
+
+class LUTInterpolator(ColObjectsV16.LUTCurve, ColObjects.ColObj):  #  one table lookup per pulse measurement
+    error = ColObjects.ColError
+    def __init__(self, name, keys, values, low=None, high=None, step=1, max_bytes=4096):
+        ColObjectsV16.LUTCurve.__init__(self, name, keys, values, low, high, step, max_bytes)
+        ColObjects.ColObj.__init__(self, name)
 
 VALID_MODES = ['TANK','CAR']
 
@@ -166,11 +149,17 @@ class RemoteControl(ColObjects.ColObj):
         self.left_side_interpolator = Interpolator('remls',keys, values)
         values = [-1.0, 0.0, 1.0, 1.0, 1.0, 1.0]
         self.right_side_interpolator = Interpolator('remrs',keys, values)
-        self.min_throttle = -100
-        self.max_throttle = 100
-        self.min_steering = -100
-        self.max_steering = 100
         self.reversing_mode = 0
+        self.set_limits(-100, 100, -100, 100)
+
+    def set_limits(self, min_throttle, max_throttle, min_steering, max_steering):
+        #  the tank and car mixes are compiled with the limits, so change them here
+        self.min_throttle = min_throttle
+        self.max_throttle = max_throttle
+        self.min_steering = min_steering
+        self.max_steering = max_steering
+        self.tank_mix = ColObjectsV16.CompiledMix('TANK', [[min_throttle, max_throttle], [min_steering, max_steering]])
+        self.car_mix = ColObjectsV16.CompiledMix('DIFFERENTIAL', [[min_throttle, max_throttle], [min_throttle, max_throttle]])
 
     def constrain(self, n, lowest, highest):
         if n > highest:
@@ -187,18 +176,15 @@ class RemoteControl(ColObjects.ColObj):
         return out_string
 
     def calculate_speeds_tank(self, left_value, right_value):
-        left = self.constrain (left_value, self.min_throttle, self.max_throttle)
-        right = self.constrain (right_value, self.min_steering, self.max_steering)
-        return int(left), int(right)
+        return self.tank_mix.mix(left_value, right_value)
 
     def calculate_speeds_car(self, throttle, steering):
+        #  the mix gives throttle + steering, throttle - steering
         if ((throttle < 0) and (self.reversing_mode == 0)):
-                left = self.constrain (throttle + steering, self.min_throttle, self.max_throttle)
-                right = self.constrain (throttle - steering, self.min_throttle, self.max_throttle)
+            left, right = self.car_mix.mix(throttle, steering)
         else:
-            right = self.constrain (throttle + steering, self.min_throttle, self.max_throttle)
-            left = self.constrain (throttle - steering, self.min_throttle, self.max_throttle)
-        return int(left), int(right)
+            right, left = self.car_mix.mix(throttle, steering)
+        return left, right
 
     def set_mode_from_switch(self):
         if self.mode_switch == None:
@@ -8,9 +8,103 @@ import machine
 import _thread
 import utime
 
+class SBUSTelemetry(ColObjects.ColObj):
+    """
+    Link quality for one receiver, held in preallocated histograms and counters so recording
+    a frame never allocates. Flag bits (lost frame, failsafe) are totalled per window of frames
+    and the last no_windows windows are kept.
+    """
+    def __init__(self, name, window_frames=100, no_windows=16):
+        super().__init__(name)
+        self.intervals = ColObjects.Histogram(name + ' interval us', 250, 64)   #  0 to 16ms
+        self.decodes = ColObjects.Histogram(name + ' decode us', 25, 40)        #  0 to 1ms
+        self.resyncs = ColObjects.Histogram(name + ' resync ms', 5, 40)         #  0 to 200ms
+        self.window_frames = window_frames
+        self.no_windows = no_windows
+        self.lost_windows = array.array('H', [0] * no_windows)
+        self.failsafe_windows = array.array('H', [0] * no_windows)
+        self.window_index = 0
+        self.frames_in_window = 0
+        self.lost_in_window = 0
+        self.failsafe_in_window = 0
+        self.last_ticks = None
+        self.sync_lost_ticks = None
+
+    def __str__(self):
+        return self.name + ' windows of ' + str(self.window_frames) + ' frames'
+
+    def record_frame(self, start_ticks, end_ticks, flags):
+        self.decodes.add(utime.ticks_diff(end_ticks, start_ticks))
+        if self.last_ticks is not None:
+            self.intervals.add(utime.ticks_diff(end_ticks, self.last_ticks))
+        self.last_ticks = end_ticks
+        if self.sync_lost_ticks is not None:
+            self.resyncs.add(utime.ticks_diff(end_ticks, self.sync_lost_ticks) // 1000)
+            self.sync_lost_ticks = None
+        if flags & (1 << 2):
+            self.lost_in_window += 1
+        if flags & (1 << 3):
+            self.failsafe_in_window += 1
+        self.frames_in_window += 1
+        if self.frames_in_window >= self.window_frames:
+            self.lost_windows[self.window_index] = self.lost_in_window
+            self.failsafe_windows[self.window_index] = self.failsafe_in_window
+            self.window_index = (self.window_index + 1) % self.no_windows
+            self.frames_in_window = 0
+            self.lost_in_window = 0
+            self.failsafe_in_window = 0
+
+    def record_sync_lost(self, ticks):
+        if self.sync_lost_ticks is None:
+            self.sync_lost_ticks = ticks
+
+    def windows_oldest_first(self, windows):
+        return [windows[(self.window_index + i) % self.no_windows] for i in range(self.no_windows)]
+
+    def get_report(self):
+        rep = {}
+        rep['Interval p50 us'] = self.intervals.percentile(50)
+        rep['Interval p99 us'] = self.intervals.percentile(99)
+        rep['Decode p99 us'] = self.decodes.percentile(99)
+        rep['Resyncs'] = self.resyncs.total
+        rep['Resync max ms'] = self.resyncs.biggest
+        rep['Lost bits per window'] = self.windows_oldest_first(self.lost_windows)
+        rep['Failsafe bits per window'] = self.windows_oldest_first(self.failsafe_windows)
+        return rep
+
+    def dump(self, stream):
+        #  stream is anything with send(message), e.g. a CommandStream
+        for histogram in (self.intervals, self.decodes, self.resyncs):
+            stream.send('TLM ' + str(histogram))
+        stream.send('TLM ' + self.name + ' lost: ' + ','.join([str(n) for n in self.windows_oldest_first(self.lost_windows)]))
+        stream.send('TLM ' + self.name + ' failsafe: ' + ','.join([str(n) for n in self.windows_oldest_first(self.failsafe_windows)]))
+
+    def clear(self):
+        self.intervals.clear()
+        self.decodes.clear()
+        self.resyncs.clear()
+        for i in range(self.no_windows):
+            self.lost_windows[i] = 0
+            self.failsafe_windows[i] = 0
+        self.frames_in_window = 0
+        self.lost_in_window = 0
+        self.failsafe_in_window = 0
+
+    def close(self):
+        self.intervals.close()
+        self.decodes.close()
+        self.resyncs.close()
+        super().close()
+
 class SBUSReceiver:
-    def __init__(self, uart):
+
+    valid_modes = ['BYTE', 'BULK']   #  BYTE syncs one byte per call, BULK drains the UART into a ring buffer
+
+    def __init__(self, uart, mode='BYTE'):
+        if mode not in SBUSReceiver.valid_modes:
+            raise ColObjects.ColError('**** SBUS mode ' + mode + ' not in ' + str(SBUSReceiver.valid_modes))
         self.sbus = uart
+        self.mode = mode
         # constants
         self.START_BYTE = b'0f'
         self.END_BYTE = b'00'
@@ -30,17 +124,37 @@ class SBUSReceiver:
         self.outOfSyncCounter = 0
         self.sbusBuff = bytearray(1)  # single byte used for sync
         self.sbusFrame = bytearray(25)  # single SBUS Frame
-        self.sbusChannels = array.array('H', [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0])  # RC Channels
+        # Double buffered RC Channels. decode_frame fills the back buffer (sbusChannels) and
+        # publish_frame swaps it to the front, so readers never see a half decoded frame
+        self.channelBuffers = (array.array('H', [0] * self.SBUS_NUM_CHANNELS),
+                               array.array('H', [0] * self.SBUS_NUM_CHANNELS))
+        self.backIndex = 1
+        self.sbusChannels = self.channelBuffers[self.backIndex]
+        self.frontChannels = self.channelBuffers[0]
+        self.frameCount = 0   # also the sequence number checked by get_snapshot
+        self.frameTicks = 0   # utime.ticks_us() when the front buffer was published
         self.isSync = False
         self.startByteFound = False
         self.failSafeStatus = self.SBUS_SIGNAL_FAILSAFE
 
+        # Ring buffer for BULK mode. Size is a power of two so indices wrap with a mask
+        self.RING_SIZE = 128
+        self.RING_MASK = self.RING_SIZE - 1
+        self.ring = bytearray(self.RING_SIZE)
+        self.ringView = memoryview(self.ring)
+        self.ringHead = 0    # next byte to be written
+        self.ringTail = 0    # next byte to be scanned
+        self.ringCount = 0
+        self.discardedBytes = 0
+        self.wakeups = 0   # calls of rx_irq when frame arrival is interrupt driven
+        self.telemetry = None   # an SBUSTelemetry, if enabled
+
     def get_rx_channels(self):
         """
         Used to retrieve the last SBUS channels values reading
         :return:  an array of 18 unsigned short elements containing 16 standard channel values + 2 digitals (ch 17 and 18)
         """
-        return self.sbusChannels
+        return self.frontChannels
 
     def get_rx_channel(self, num_ch):
         """
@@ -48,7 +162,7 @@ class SBUSReceiver:
         :param: num_ch: the channel which to retrieve the value for
         :return:  a short value containing
         """
-        return self.sbusChannels[num_ch]
+        return self.frontChannels[num_ch]
 
     def get_failsafe_status(self):
         """
@@ -57,6 +171,64 @@ class SBUSReceiver:
         """
         return self.failSafeStatus
 
+    def get_snapshot(self, out_channels, out_ticks=None):
+        """
+        Used by another thread to take a consistent copy of the last complete frame without locking.
+        The copy is retried if a new frame was published while it was being taken
+        :param: out_channels: caller's array of 18 elements to copy the channels into
+        :param: out_ticks: optional caller's array, element 0 gets utime.ticks_us() when the frame was published
+        :return:  the frame count. 0 means no frame yet
+        """
+        while True:
+            count = self.frameCount
+            front = self.frontChannels
+            for i in range(self.SBUS_NUM_CHANNELS):
+                out_channels[i] = front[i]
+            if out_ticks is not None:
+                out_ticks[0] = self.frameTicks
+            if count == self.frameCount:
+                return count
+
+    def wait_frame(self, last_count, timeout_ms):
+        """
+        Used by the consumer to block until a frame newer than last_count has been published.
+        The core idles until the next interrupt between checks rather than spinning
+        :param: last_count: frame count returned by the previous get_snapshot or wait_frame
+        :param: timeout_ms: how long to wait
+        :return:  the new frame count, or None if the wait timed out
+        """
+        start = utime.ticks_ms()
+        while self.frameCount == last_count:
+            if utime.ticks_diff(utime.ticks_ms(), start) >= timeout_ms:
+                return None
+            machine.idle()
+        return self.frameCount
+
+    def start_irq(self):
+        """
+        Decode frames from the UART idle-line interrupt instead of polling get_new_data.
+        SBUS leaves a gap of several milliseconds after each frame, so this runs once per frame
+        """
+        if self.mode != 'BULK':
+            raise ColObjects.ColError('**** SBUS interrupt mode needs BULK ingestion')
+        self.sbus.irq(self.rx_irq, self.sbus.IRQ_RXIDLE)
+
+    def stop_irq(self):
+        self.sbus.irq(None)
+
+    def rx_irq(self, uart):
+        self.wakeups += 1
+        self.get_new_data()
+
+    def publish_frame(self):
+        # front must be swapped before the count changes, and the old front is only
+        # written again after the count has changed (see get_snapshot)
+        self.frameTicks = utime.ticks_us()
+        self.frontChannels = self.sbusChannels
+        self.frameCount += 1
+        self.backIndex ^= 1
+        self.sbusChannels = self.channelBuffers[self.backIndex]
+
     def get_rx_report(self):
         """
         Used to retrieve some stats about the frames decoding
@@ -67,35 +239,27 @@ class SBUSReceiver:
         rep['Valid Frames'] = self.validSbusFrame
         rep['Lost Frames'] = self.lostSbusFrame
         rep['Resync Events'] = self.resyncEvent
+        if self.mode == 'BULK':
+            rep['Discarded Bytes'] = self.discardedBytes
 
         return rep
 
     def decode_frame(self):
 
-        # TODO: DoubleCheck if it has to be removed
-        for i in range(0, self.SBUS_NUM_CHANNELS - 2):
-            self.sbusChannels[i] = 0
-
-        # counters initialization
-        byte_in_sbus = 1
-        bit_in_sbus = 0
-        ch = 0
-        bit_in_channel = 0
-
-        for i in range(0, 175):  # TODO Generalization
-            if self.sbusFrame[byte_in_sbus] & (1 << bit_in_sbus):
-                self.sbusChannels[ch] |= (1 << bit_in_channel)
-
-            bit_in_sbus += 1
-            bit_in_channel += 1
-
-            if bit_in_sbus == 8:
-                bit_in_sbus = 0
-                byte_in_sbus += 1
-
-            if bit_in_channel == 11:
-                bit_in_channel = 0
-                ch += 1
+        # 16 channels of 11 bits packed LSB first into bytes 1 to 22.
+        # Every 8 channels fill exactly 11 bytes, so the same fixed shift/mask
+        # pattern is applied to each half of the frame.
+        f = self.sbusFrame
+        c = self.sbusChannels
+        for ch, b in ((0, 1), (8, 12)):
+            c[ch]     = (f[b]            | f[b + 1] << 8)                    & 0x07FF
+            c[ch + 1] = (f[b + 1] >> 3   | f[b + 2] << 5)                    & 0x07FF
+            c[ch + 2] = (f[b + 2] >> 6   | f[b + 3] << 2 | f[b + 4] << 10)  & 0x07FF
+            c[ch + 3] = (f[b + 4] >> 1   | f[b + 5] << 7)                    & 0x07FF
+            c[ch + 4] = (f[b + 5] >> 4   | f[b + 6] << 4)                    & 0x07FF
+            c[ch + 5] = (f[b + 6] >> 7   | f[b + 7] << 1 | f[b + 8] << 9)   & 0x07FF
+            c[ch + 6] = (f[b + 8] >> 2   | f[b + 9] << 6)                    & 0x07FF
+            c[ch + 7] = (f[b + 9] >> 5   | f[b + 10] << 3)                   & 0x07FF
 
         # Decode Digitals Channels
 
@@ -118,6 +282,21 @@ class SBUSReceiver:
         if self.sbusFrame[self.SBUS_FRAME_LEN - 2] & (1 << 3):
             self.failSafeStatus = self.SBUS_SIGNAL_FAILSAFE
 
+        self.publish_frame()
+
+    def handle_frame(self):
+        if self.telemetry is None:
+            self.decode_frame()
+            return
+        start_ticks = utime.ticks_us()
+        self.decode_frame()
+        self.telemetry.record_frame(start_ticks, self.frameTicks, self.sbusFrame[self.SBUS_FRAME_LEN - 2])
+
+    def enable_telemetry(self, name, window_frames=100):
+        if self.telemetry is None:
+            self.telemetry = SBUSTelemetry(name, window_frames)
+        return self.telemetry
+
     def get_sync(self):
 
         if self.sbus.any() > 0:
@@ -141,6 +320,58 @@ class SBUSReceiver:
                     self.startByteFound = True
                     self.frameIndex += 1
 
+    def fill_ring(self):
+        """
+        Drain everything the UART has into the ring buffer, reading straight into the free space
+        :return:  number of bytes read
+        """
+        total = 0
+        while self.ringCount < self.RING_SIZE and self.sbus.any():
+            free_to_end = self.RING_SIZE - self.ringHead
+            free = self.RING_SIZE - self.ringCount
+            if free > free_to_end:
+                free = free_to_end
+            n = self.sbus.readinto(self.ringView[self.ringHead:self.ringHead + free], free)
+            if not n:
+                break
+            self.ringHead = (self.ringHead + n) & self.RING_MASK
+            self.ringCount += n
+            total += n
+        return total
+
+    def scan_ring(self):
+        """
+        Hand every complete 0x0F ... 0x00 frame in the ring buffer to the decoder, dropping
+        bytes until the next start byte whenever the frame boundaries do not line up
+        :return:  number of frames decoded
+        """
+        decoded = 0
+        ring = self.ring
+        mask = self.RING_MASK
+        frame = self.sbusFrame
+        while self.ringCount >= self.SBUS_FRAME_LEN:
+            tail = self.ringTail
+            if ring[tail] == 15 and ring[(tail + self.SBUS_FRAME_LEN - 1) & mask] == 0:
+                for i in range(self.SBUS_FRAME_LEN):
+                    frame[i] = ring[(tail + i) & mask]
+                self.ringTail = (tail + self.SBUS_FRAME_LEN) & mask
+                self.ringCount -= self.SBUS_FRAME_LEN
+                self.isSync = True
+                self.validSbusFrame += 1
+                self.handle_frame()
+                decoded += 1
+            else:
+                if self.isSync:
+                    self.isSync = False
+                    self.resyncEvent += 1
+                    self.lostSbusFrame += 1
+                    if self.telemetry is not None:
+                        self.telemetry.record_sync_lost(utime.ticks_us())
+                self.ringTail = (tail + 1) & mask
+                self.ringCount -= 1
+                self.discardedBytes += 1
+        return decoded
+
     def get_new_data(self):
         """
         This function must be called periodically according to the specific SBUS implementation in order to update
@@ -148,6 +379,12 @@ class SBUSReceiver:
         For FrSky the period is 300us.
         """
 
+        if self.mode == 'BULK':
+            self.fill_ring()
+            if self.scan_ring() > 0:
+                return("decode")
+            return("is synced" if self.isSync else None)
+
         if self.isSync:
             if self.sbus.any(): # uart.any() returns a 0 or a 1 in this implementation which 'self.sbus.any() >= self.SBUS_FRAME_LEN' would never be true. 3 days working on this. 
                 self.sbus.readinto(self.sbusFrame, self.SBUS_FRAME_LEN)  # read the whole frame
@@ -155,7 +392,7 @@ class SBUSReceiver:
                     self.SBUS_FRAME_LEN - 1] == 0):  # TODO: Change to use constant var value
                     self.validSbusFrame += 1
                     self.outOfSyncCounter = 0
-                    self.decode_frame()
+                    self.handle_frame()
                     return("decode")
                 else:
                     self.lostSbusFrame += 1
@@ -164,56 +401,72 @@ class SBUSReceiver:
                 if self.outOfSyncCounter > self.OUT_OF_SYNC_THD:
                     self.isSync = False
                     self.resyncEvent += 1
+                    if self.telemetry is not None:
+                        self.telemetry.record_sync_lost(utime.ticks_us())
                     
             return("is synced")       
         else:
             self.get_sync()
 
 class SBUSReceiverMC6C(ColObjects.ColObj):
-    def __init__(self):
+    valid_frame_modes = ['POLL', 'IRQ']   #  POLL runs get_new_data on the second core every 100us
+                                          #  IRQ decodes from the UART idle-line interrupt, no thread
+
+    def __init__(self, sbus_mode='BULK', frame_mode='POLL', telemetry=False, step=1):
+                                          #  the channels come out in multiples of step: whole numbers by
+                                          #  default (a byte a table entry), step=0.1 keeps tenths (two bytes)
+        if frame_mode not in SBUSReceiverMC6C.valid_frame_modes:
+            raise ColObjects.ColError('**** frame mode ' + frame_mode + ' not in ' + str(SBUSReceiverMC6C.valid_frame_modes))
+        #  checked before the name is registered, as SBUSReceiver and start_irq would raise after it
+        if sbus_mode not in SBUSReceiver.valid_modes:
+            raise ColObjects.ColError('**** SBUS mode ' + sbus_mode + ' not in ' + str(SBUSReceiver.valid_modes))
+        if frame_mode == 'IRQ' and sbus_mode != 'BULK':
+            raise ColObjects.ColError('**** SBUS interrupt mode needs BULK ingestion')
         super().__init__('MicroZone mc6c')
+        self.frame_mode = frame_mode
         self.tx_pin_no = 0
         self.rx_pin_no = 1
         self.uart_no = 0
         self.baud_rate = 100000
         self.uart = machine.UART(self.uart_no, self.baud_rate, tx = machine.Pin(self.tx_pin_no), rx = machine.Pin(self.rx_pin_no), bits=8, parity=0, stop=2)
-        self.sbus = SBUSReceiver(self.uart)
+        self.sbus = SBUSReceiver(self.uart, sbus_mode)
+        if telemetry:
+            self.sbus.enable_telemetry(self.name + ' link')
         self.steering_index = 0   #  NOTE: array index starts at zero
         self.throttle_index = 1   #        channel numbers start at one
         self.updown_index = 2
         self.swing_index = 3
         self.switch_index = 4
         self.knob_index = 5
-        self.steering_interpolator = ColObjects.Interpolator('Steering Interpolator',
-                                                [100, 693, 1080, 1250, 1500, 2000],
-                                                [100.0, 100.0, 0.0, 0.0, -100.0, -100.0])
-        self.throttle_interpolator = ColObjects.Interpolator('Throttle Interpolator',
-                                                [ 100,    201,   900, 1090,  1801,  2000],
-                                                [-100.0, -100.0, 0.0,    0.0, 100.0, 100.0])
-        self.updown_interpolator = ColObjects.Interpolator('Up-Down Interpolator',
-                                                [ 100,    201,   900, 1090,  1801,  2000],
-                                                [-100.0, -100.0, 0.0,    0.0, 100.0, 100.0])
-        self.swing_interpolator = ColObjects.Interpolator('Swing Interpolator',
-                                                [ 100,    201,   900, 1090,  1801,  2000],
-                                                [-100.0, -100.0, 0.0,    0.0, 100.0, 100.0])
-        self.switch_interpolator = ColObjects.Interpolator('Switch Interpolator',
-                                                [100, 393, 980, 1220, 1390, 2000],
-                                                [100.0, 100.0, 0.0, 0.0, -100.0, -100.0])
-        self.knob_interpolator = ColObjects.Interpolator('Knob Interpolator',
-                                                [ 100,    201,   900, 1090,  1801,  2000],
-                                                [-100.0, -100.0, 0.0,    0.0, 100.0, 100.0])
+        #  One entry per output of get(), in order: [name, channel index, keys, values]
+        #  The outputs are quantised to step, within step/2 of the curve; the drive speeds they become are
+        #  whole percentages anyway, and one SBUS count moves these curves by 0.14 to 0.26
+        self.channel_map = ColObjects.ChannelMap('mc6c', [
+            ['steering', self.steering_index, [100, 693, 1080, 1250, 1500, 2000], [100.0, 100.0, 0.0, 0.0, -100.0, -100.0]],
+            ['throttle', self.throttle_index, [ 100,    201,   900, 1090,  1801,  2000], [-100.0, -100.0, 0.0, 0.0, 100.0, 100.0]],
+            ['updown',   self.updown_index,   [ 100,    201,   900, 1090,  1801,  2000], [-100.0, -100.0, 0.0, 0.0, 100.0, 100.0]],
+            ['swing',    self.swing_index,    [ 100,    201,   900, 1090,  1801,  2000], [-100.0, -100.0, 0.0, 0.0, 100.0, 100.0]],
+            ['switch',   self.switch_index,   [100, 393, 980, 1220, 1390, 2000], [100.0, 100.0, 0.0, 0.0, -100.0, -100.0]],
+            ['knob',     self.knob_index,     [ 100,    201,   900, 1090,  1801,  2000], [-100.0, -100.0, 0.0, 0.0, 100.0, 100.0]]],
+            step=step)
+        self.joystick_values = self.channel_map.new_output()
         self.thread_enable = True
         self.thread_running = False
-        self.joystick_raws = [0] * 18
-        self.old_mix_values = [0] * 4
+        self.joystick_raws = array.array('H', [0] * 18)
+        self.frame_count = 0   #  frame count and ticks_us of the snapshot last used by get()
+        self.frame_ticks = array.array('l', [0])
+        self.mixer = ColObjects.MecanumMixer('mc6c mix', crab_signs=(1, 1, -1, -1))
+        self.mix_values = array.array('f', [0.0] * 4)   #  lf, rf, lb, rb; keeps the last good mix
         self.nones_count = 0
         self.zeroes_count = 0
-        self.my_thread = _thread.start_new_thread(self.thread_code, ())
+        if self.frame_mode == 'IRQ':
+            self.sbus.start_irq()
+        else:
+            self.my_thread = _thread.start_new_thread(self.thread_code, ())
 
     def __str__(self):
         outstring = self.name + '\n'
-        outstring += str(self.throttle_interpolator) + '\n'
-        outstring += str(self.steering_interpolator) + '\n'
+        outstring += str(self.channel_map) + '\n'
         return outstring
 
     def thread_code(self):
@@ -223,81 +476,63 @@ class SBUSReceiverMC6C(ColObjects.ColObj):
                 break
             utime.sleep_us(100) # FrSky standard is 300 microseconds
             self.sbus.get_new_data()
-            self.joystick_raws = self.sbus.get_rx_channels()
         self.thread_running = False
 
-    def get(self):
-        max_attempts = 15
-        for i in range(max_attempts):
-            utime.sleep_us(400)
-            first_raw = self.joystick_raws[0]
-            if abs(first_raw) > 15:
-                break
-        if i >= max_attempts:
-            return None, None
-        steering_raw = self.joystick_raws[self.steering_index]
-        throttle_raw = self.joystick_raws[self.throttle_index]
-        updown_raw = self.joystick_raws[self.updown_index]
-        swing_raw = self.joystick_raws[self.swing_index]
-        switch_raw = self.joystick_raws[self.switch_index]
-        knob_raw = self.joystick_raws[self.knob_index]
-
-        steering_value = self.steering_interpolator.interpolate(steering_raw)
-        throttle_value = self.throttle_interpolator.interpolate(throttle_raw)
-        updown_value = self.steering_interpolator.interpolate(updown_raw)
-        swing_value = self.steering_interpolator.interpolate(swing_raw)
-        switch_value = self.switch_interpolator.interpolate(switch_raw)
-        knob_value = self.steering_interpolator.interpolate(knob_raw)
-        
-        return steering_value, throttle_value, updown_value, swing_value, switch_value, knob_value
+    def get_telemetry(self):
+        #  counters plus link quality summary, or just counters if telemetry is off
+        rep = self.sbus.get_rx_report()
+        if self.sbus.telemetry is not None:
+            rep.update(self.sbus.telemetry.get_report())
+        return rep
 
-    def array_abs(self, input_array):
-        output_array = []
-        for element in input_array:
-            if element is not None:
-                output_array.append(abs(element))
-            else:
-                output_array.append(0)
-        return output_array
+    def dump_telemetry(self, stream):
+        rep = self.sbus.get_rx_report()
+        for key in rep:
+            stream.send('TLM ' + key + ': ' + str(rep[key]))
+        if self.sbus.telemetry is not None:
+            self.sbus.telemetry.dump(stream)
+
+    def wait_frame(self, timeout_ms=50):
+        #  block until a frame newer than the one last used by get() arrives
+        return self.sbus.wait_frame(self.frame_count, timeout_ms)
+
+    def get_into(self, outputs):
+        #  steering, throttle, updown, swing, switch, knob written into outputs without allocating
+        #  returns False if there is no frame yet or any channel is off its curve
+        self.frame_count = self.sbus.get_snapshot(self.joystick_raws, self.frame_ticks)
+        if self.frame_count == 0:
+            return False
+        return self.channel_map.convert(self.joystick_raws, outputs) == 0
+
+    def get(self):
+        self.frame_count = self.sbus.get_snapshot(self.joystick_raws, self.frame_ticks)
+        if self.frame_count == 0:   #  nothing received yet
+            return None, None, None, None, None, None
+        v = self.joystick_values
+        if self.channel_map.convert(self.joystick_raws, v) == 0:
+            return v[0], v[1], v[2], v[3], v[4], v[5]
+        valid = self.channel_map.valid
+        return tuple([v[i] if valid[i] else None for i in range(6)])
 
     def get_mecanum_mix(self):
-        inputs = self.get()
-        if None in inputs:
+        #  returns self.mix_values, rewritten in place; unchanged if this frame could not be used
+        v = self.joystick_values
+        if not self.get_into(v):
             self.nones_count += 1
-            return self.old_mix_values
-        steering, throttle, updown, slew, switch, knob = inputs
-        inputs_abs = self.array_abs(inputs)
-        biggest_in = max(inputs_abs)
-        if biggest_in == 0:
-            return [0,0,0,0]
-        total_in = sum(inputs_abs)
-        fwd_levels = [throttle, throttle, throttle, throttle]
-        spin_levels = [steering, -steering, steering, -steering]
-        slew_levels = [slew, slew, -slew, -slew]
-        fwd_abs = self.array_abs(fwd_levels)
-        spin_abs = self.array_abs(spin_levels)
-        slew_abs = self.array_abs(slew_levels)
-        lf_level = (fwd_levels[0] + spin_levels[0] + slew_levels[0])
-        rf_level = (fwd_levels[1] + spin_levels[1] + slew_levels[1])
-        lb_level = (fwd_levels[2] + spin_levels[2] + slew_levels[2])
-        rb_level = (fwd_levels[3] + spin_levels[3] + slew_levels[3])
-        output_abs = self.array_abs([lf_level, rf_level, lb_level, rb_level])
-        biggest_out = max(output_abs)
-        ratio_b = biggest_in / biggest_out
-        lf_level = lf_level * ratio_b
-        rf_level = rf_level * ratio_b
-        lb_level = lb_level * ratio_b
-        rb_level = rb_level * ratio_b
-        self.old_mix_values = lf_level, rf_level, lb_level, rb_level
-        return lf_level, rf_level, lb_level, rb_level
+            return self.mix_values
+        biggest_in = 0.0   #  over all six inputs, as before
+        for i in range(6):
+            if abs(v[i]) > biggest_in:
+                biggest_in = abs(v[i])
+        return self.mixer.mix_into(v[1], v[0], v[3], self.mix_values, biggest_in)
         
     def close(self):
-        self.steering_interpolator.close()
-        self.throttle_interpolator.close()
-        self.updown_interpolator.close()
-        self.swing_interpolator.close()
-        self.switch_interpolator.close()
-        self.knob_interpolator.close()
+        self.channel_map.close()
+        self.mixer.close()
+        if self.frame_mode == 'IRQ':
+            self.sbus.stop_irq()
+        if self.sbus.telemetry is not None:
+            self.sbus.telemetry.close()
         self.thread_enable = False
         utime.sleep_ms(100)
         if self.thread_running:
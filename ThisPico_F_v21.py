@@ -210,7 +210,7 @@ class ThisInterpolator(RemoteControl.Interpolator):
 class ThisThrottle(RemoteControl.Joystick):
     def __init__(self):
         self.tsm = RemoteControl.StateMachine(name='Throttle SM', code='MEASURE', pin_no=5)
-        self.interpolator = RemoteControl.Interpolator('Throttle Interpolator', [0, 50, 70, 72, 92, 999], [-100.0, -100.0, 0.0, 0.0, 100.0, 100.0])
+        self.interpolator = RemoteControl.LUTInterpolator('Throttle Interpolator', [0, 50, 70, 72, 92, 999], [-100.0, -100.0, 0.0, 0.0, 100.0, 100.0])
         super().__init__(name='Throttle', state_machine=self.tsm, interpolator=self.interpolator)
         ThisPico.add(self)
     def close(self):
@@ -224,7 +224,7 @@ class ThisThrottle(RemoteControl.Joystick):
 class ThisAileron(RemoteControl.Joystick):
     def __init__(self):
         self.tsm = RemoteControl.StateMachine(name='Aileron SM', code='MEASURE', pin_no=3)
-        self.interpolator = RemoteControl.Interpolator('Steering Interpolator', [0, 60, 78, 80, 98, 999], [100.0, 100.0, 0.0, 0.0, -100.0, -100.0])
+        self.interpolator = RemoteControl.LUTInterpolator('Steering Interpolator', [0, 60, 78, 80, 98, 999], [100.0, 100.0, 0.0, 0.0, -100.0, -100.0])
         super().__init__(name='Aileron', state_machine=self.tsm, interpolator=self.interpolator)
         ThisPico.add(self)
     def close(self):
@@ -236,7 +236,7 @@ class ThisAileron(RemoteControl.Joystick):
 class ThisFlap(RemoteControl.Joystick):
     def __init__(self):
         self.tsm = RemoteControl.StateMachine(name='Flap SM', code='MEASURE', pin_no=4)
-        self.interpolator = RemoteControl.Interpolator('Knob Interpolator', [0, 50, 72, 75, 97, 999], [-100.0, -100.0, 0.0, 0.0, 100.0, 100.0])
+        self.interpolator = RemoteControl.LUTInterpolator('Knob Interpolator', [0, 50, 72, 75, 97, 999], [-100.0, -100.0, 0.0, 0.0, 100.0, 100.0])
         super().__init__(name='Flap', state_machine=self.tsm, interpolator=self.interpolator)
         ThisPico.add(self)
     def close(self):
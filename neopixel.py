@@ -1,6 +1,7 @@
 import array, time
-from machine import Pin
+from machine import Pin, Timer
 import rp2
+import utime
 
 
 # PIO state machine for RGB. Pulls 24 bits (rgb -> 3 * 8bit) automatically
@@ -58,22 +59,44 @@ slice_maker = slice_maker_class()
 # Example: in 'GRBW' we want final form of 0bGGRRBBWW, meaning G with index 0 needs to be shifted 3 * 8bit ->
 # 'G' on index 0: 0b00 ^ 0b11 -> 0b11 (3), just as we wanted.
 # Same hold for every other index (and - 1 at the end for 3 letter strings).
+#
+# The state machine sends the top bits of each 32 bit word first, so for 'RGB' the values are packed
+# 8 bits further left (the shift show() used to give every word) and the whole buffer goes out in one put.
+#
+# 'pixels' holds the colors as drawn. Brightness and gamma are applied by show(), which packs every byte
+# through one 256 entry table into 'front', so changing brightness() changes the whole strip at the next
+# show() and set_pixel() does no arithmetic. The table is only rebuilt when brightness or gamma changes.
+#
+# Rotation only moves 'offset': pixel i is kept in pixels[(i + offset) % num_leds], writes are placed
+# there, and show() sends from 'offset' round to it again. fill() and clear() set 'offset' back to 0.
 
 class Neopixel:
     # Micropython doesn't implement __slots__, but it's good to have a place
     # to describe the data members...
     # __slots__ = [
     #    'num_leds',   # number of LEDs
-    #    'pixels',     # array.array('I') of raw data for LEDs
+    #    'pixels',     # array.array('I') of raw data for LEDs, written in place
+    #    'view',       # memoryview of 'pixels', for bulk copies
+    #    'offset',     # where pixel 0 is kept in 'pixels', moved by rotation
     #    'mode',       # mode 'RGB' etc
     #    'W_in_mode',  # bool: is 'W' in mode
     #    'sm',         # state machine
     #    'shift',      # shift amount for each component, in a tuple for (R,B,G,W)
     #    'delay',      # delay amount
     #    'brightnessvalue', # brightness scale factor 1..255
+    #    'gammavalue', # gamma correction exponent, 1.0 for none
+    #    'table',      # bytearray(256): color byte to byte sent, for brightnessvalue and gammavalue
+    #    'front',      # array.array('I') of 'pixels' put through 'table', as sent
+    #    'front_view', # memoryview of 'front'
+    #    'dma',        # rp2.DMA channel, or None
+    #    'back',       # with dma, array.array('I') packed by a show() while 'front' goes out
+    #    'back_view',  # memoryview of 'back'
+    #    'sending',    # with dma, True from starting a frame until 'frame_timer' finds it over
+    #    'pending',    # with dma, True while 'back' holds a frame waiting for the one going out
     # ]
 
-    def __init__(self, num_leds, state_machine, pin, mode="RGB", delay=0.0001):
+    def __init__(self, num_leds, state_machine, pin, mode="RGB", delay=0.0001, dma=False, on_frame_done=None,
+                 gamma=1.0):
         """
         Constructor for library class
 
@@ -83,8 +106,16 @@ class Neopixel:
         :param mode: [default: "RGB"] mode and order of bits representing the color value.
         This can be any order of RGB or RGBW (neopixels are usually GRB)
         :param delay: [default: 0.0001] delay used for latching of leds when sending data
+        :param dma: [default: False] send frames with a DMA channel from a second buffer, so show()
+        returns at once (needs rp2.DMA, MicroPython 1.21 or later); a show() while a frame is going
+        out is latched and sent when that frame ends
+        :param on_frame_done: [default: None] with dma, called with no arguments once a frame has been
+        sent and latched
+        :param gamma: [default: 1.0] gamma correction exponent, about 2.5 makes fades look even
         """
         self.pixels = array.array("I", [0] * num_leds)
+        self.view = memoryview(self.pixels)
+        self.offset = 0
         self.mode = mode
         self.W_in_mode = 'W' in mode
         if self.W_in_mode:
@@ -95,12 +126,81 @@ class Neopixel:
                           (mode.index('B') ^ 3) * 8, (mode.index('W') ^ 3) * 8)
         else:
             self.sm = rp2.StateMachine(state_machine, ws2812, freq=8000000, sideset_base=Pin(pin))
-            self.shift = (((mode.index('R') ^ 3) - 1) * 8, ((mode.index('G') ^ 3) - 1) * 8,
-                          ((mode.index('B') ^ 3) - 1) * 8, 0)
+            self.shift = ((mode.index('R') ^ 3) * 8, (mode.index('G') ^ 3) * 8,
+                          (mode.index('B') ^ 3) * 8, 0)
         self.sm.active(1)
         self.num_leds = num_leds
         self.delay = delay
         self.brightnessvalue = 255
+        self.gammavalue = gamma
+        self.table = bytearray(256)
+        self.make_table()
+        self.front = array.array("I", [0] * num_leds)
+        self.front_view = memoryview(self.front)
+        self.dma = None
+        self.frame_timer = None
+        if dma:
+            self.start_dma(state_machine, on_frame_done)
+
+    def start_dma(self, state_machine, on_frame_done):
+        """
+        Set up double buffering: show() packs 'pixels' into 'front' and starts a DMA channel feeding
+        'front' to the TX FIFO of the state machine (paced by its DREQ), so drawing into 'pixels' can
+        carry on while the frame goes out. A show() meanwhile packs into 'back', which is swapped
+        with 'front' when the frame ends.
+
+        :param state_machine: id of PIO state machine used, 0-3 in PIO0 and 4-7 in PIO1
+        :param on_frame_done: function called when a frame has been sent and latched, or None
+        :return: None
+        """
+        self.dma = rp2.DMA()
+        self.back = array.array("I", [0] * self.num_leds)
+        self.back_view = memoryview(self.back)
+        self.sending = False
+        self.pending = False
+        self.on_frame_done = on_frame_done
+        block = state_machine // 4
+        # TXF registers of PIO0 and PIO1, and their DREQ numbers (RP2040 datasheet 2.5.3.1)
+        self.dma_write = (0x50200010, 0x50300010)[block] + (4 * (state_machine % 4))
+        self.dma_ctrl = self.dma.pack_ctrl(size=2, inc_write=False, treq_sel=(8 * block) + (state_machine % 4))
+        # time on the wire at 800kHz plus the latch
+        self.frame_us = int(self.num_leds * (32 if self.W_in_mode else 24) * 1.25 + self.delay * 1000000)
+        self.done_at = utime.ticks_us()
+        # one shot at the end of every frame, to send a latched frame and call on_frame_done
+        self.frame_timer = Timer(-1)
+        self.frame_callback = lambda timer: self.frame_end()
+
+    def frame_end(self):
+        """
+        With dma, run by 'frame_timer' when a frame should be over: swaps in the frame show() packed
+        into 'back' meanwhile, if any, and starts it, then calls on_frame_done. Only this starts a
+        frame while 'sending' is True, and only show() while it is False, so the two never start
+        one together.
+
+        :return: None
+        """
+        if not self.sending:
+            return
+        if not self.frame_done():
+            # the timer counts whole ms, so look again shortly
+            self.frame_timer.init(mode=Timer.ONE_SHOT, period=1, callback=self.frame_callback)
+            return
+        if self.pending:
+            self.swap_frame()
+        else:
+            self.sending = False
+        if self.on_frame_done is not None:
+            self.on_frame_done()
+
+    def frame_done(self):
+        """
+        With dma, True once the last frame has been sent and latched.
+
+        :return: bool
+        """
+        if self.dma is None:
+            return True
+        return not self.dma.active() and utime.ticks_diff(utime.ticks_us(), self.done_at) >= 0
 
     def brightness(self, brightness=None):
         """
@@ -117,7 +217,68 @@ class Neopixel:
                 brightness = 1
         if brightness > 255:
             brightness = 255
-        self.brightnessvalue = brightness
+        if brightness != self.brightnessvalue:
+            self.brightnessvalue = brightness
+            self.make_table()
+
+    def gamma(self, gamma=None):
+        """
+        Set the gamma correction exponent applied with brightness when the strip is shown
+        or return class gammavalue if gamma is None
+
+        :param gamma: [default: None] exponent, 1.0 for none
+        :return: class gammavalue member or None
+        """
+        if gamma is None:
+            return self.gammavalue
+        if gamma != self.gammavalue:
+            self.gammavalue = gamma
+            self.make_table()
+
+    def make_table(self):
+        """
+        Fill 'table' from brightnessvalue and gammavalue: brightness scales the color, then gamma maps
+        it to the byte sent. With gamma 1.0 this is round(color * brightness / 255), as set_pixel used to do.
+
+        :return: None
+        """
+        scale = self.brightnessvalue / 65025.0
+        for color in range(256):
+            self.table[color] = int(255.0 * ((color * scale) ** self.gammavalue) + 0.5)
+        self.table_is_identity = self.brightnessvalue == 255 and self.gammavalue == 1.0
+
+    def pack(self, front=None, front_view=None):
+        """
+        Put every byte of 'pixels' through 'table' into 'front', in order from 'offset'.
+
+        :param front: [default: None] array to pack into, with front_view its memoryview; None for 'front'
+        :return: None
+        """
+        pixels = self.pixels
+        if front is None:
+            front = self.front
+            front_view = self.front_view
+        offset = self.offset
+        if self.table_is_identity:
+            if offset:
+                front_view[:self.num_leds - offset] = self.view[offset:]
+                front_view[self.num_leds - offset:] = self.view[:offset]
+            else:
+                front[:] = pixels
+            return
+        table = self.table
+        # pixels[offset:] go to the front of the frame and pixels[:offset] after them
+        for start, stop, move in ((offset, self.num_leds, -offset), (0, offset, self.num_leds - offset)):
+            if self.W_in_mode:
+                for i in range(start, stop):
+                    pixval = pixels[i]
+                    front[i + move] = (table[pixval >> 24] << 24 | table[(pixval >> 16) & 255] << 16
+                                       | table[(pixval >> 8) & 255] << 8 | table[pixval & 255])
+            else:
+                # the low byte is always 0 (see class desc.)
+                for i in range(start, stop):
+                    pixval = pixels[i]
+                    front[i + move] = table[pixval >> 24] << 24 | table[(pixval >> 16) & 255] << 16 | table[(pixval >> 8) & 255] << 8
 
     def set_pixel_line_gradient(self, pixel1, pixel2, left_rgb_w, right_rgb_w, how_bright=None):
         """
@@ -127,7 +288,8 @@ class Neopixel:
         :param pixel2: Index of ending pixel (inclusive)
         :param left_rgb_w: Tuple of form (r, g, b) or (r, g, b, w) representing starting color
         :param right_rgb_w: Tuple of form (r, g, b) or (r, g, b, w) representing ending color
-        :param how_bright: [default: None] Brightness of current interval. If None, use global brightness value
+        :param how_bright: [default: None] Brightness of current interval, 0..255 as before, but shown at
+        no more than the global brightness. If None, use global brightness value
         :return: None
         """
         if pixel2 - pixel1 == 0:
@@ -136,23 +298,35 @@ class Neopixel:
         left_pixel = min(pixel1, pixel2)
 
         with_W = len(left_rgb_w) == 4 and self.W_in_mode
-        r_diff = right_rgb_w[0] - left_rgb_w[0]
-        g_diff = right_rgb_w[1] - left_rgb_w[1]
-        b_diff = right_rgb_w[2] - left_rgb_w[2]
+        # in integers, rounding half up: color + (2 * diff * i + span) // (2 * span)
+        span = right_pixel - left_pixel
+        r_diff = 2 * (right_rgb_w[0] - left_rgb_w[0])
+        g_diff = 2 * (right_rgb_w[1] - left_rgb_w[1])
+        b_diff = 2 * (right_rgb_w[2] - left_rgb_w[2])
         if with_W:
-            w_diff = (right_rgb_w[3] - left_rgb_w[3])
+            w_diff = 2 * (right_rgb_w[3] - left_rgb_w[3])
 
-        for i in range(right_pixel - left_pixel + 1):
-            fraction = i / (right_pixel - left_pixel)
-            red = round(r_diff * fraction + left_rgb_w[0])
-            green = round(g_diff * fraction + left_rgb_w[1])
-            blue = round(b_diff * fraction + left_rgb_w[2])
+        # brightness is applied by show(), so unless how_bright is lower the words go straight into pixels
+        direct = how_bright is None or how_bright >= self.brightnessvalue
+        sh_R, sh_G, sh_B, sh_W = self.shift
+        pixels = self.pixels
+        where = self.index(left_pixel)
+        self.index(right_pixel)   # the same IndexError as writing past the end
+        white = 0
+        for i in range(span + 1):
+            red = left_rgb_w[0] + (r_diff * i + span) // (2 * span)
+            green = left_rgb_w[1] + (g_diff * i + span) // (2 * span)
+            blue = left_rgb_w[2] + (b_diff * i + span) // (2 * span)
             # if it's (r, g, b, w)
             if with_W:
-                white = round(w_diff * fraction + left_rgb_w[3])
-                self.set_pixel(left_pixel + i, (red, green, blue, white), how_bright)
+                white = left_rgb_w[3] + (w_diff * i + span) // (2 * span)
+            if direct:
+                pixels[where] = white << sh_W | blue << sh_B | red << sh_R | green << sh_G
+                where += 1
+                if where == self.num_leds:
+                    where = 0
             else:
-                self.set_pixel(left_pixel + i, (red, green, blue), how_bright)
+                self.set_pixel(left_pixel + i, (red, green, blue, white), how_bright)
 
     def set_pixel_line(self, pixel1, pixel2, rgb_w, how_bright=None):
         """
@@ -161,11 +335,96 @@ class Neopixel:
         :param pixel1: Index of starting pixel (inclusive)
         :param pixel2: Index of ending pixel (inclusive)
         :param rgb_w: Tuple of form (r, g, b) or (r, g, b, w) representing color to be used
-        :param how_bright: [default: None] Brightness of current interval. If None, use global brightness value
+        :param how_bright: [default: None] Brightness of current interval, 0..255 as before, but shown at
+        no more than the global brightness. If None, use global brightness value
         :return: None
         """
         if pixel2 >= pixel1:
-            self.set_pixel(slice_maker[pixel1:pixel2 + 1], rgb_w, how_bright)
+            # the same pixels as the slice [pixel1:pixel2 + 1], negative indices and all
+            start, stop, step = slice(pixel1, pixel2 + 1).indices(self.num_leds)
+            self.fill_range(start, stop, self.pixel_value(rgb_w, how_bright))
+
+    def index(self, pixel_num):
+        """
+        Where pixel <pixel_num> is kept in 'pixels' (see class desc.)
+
+        :param pixel_num: Index of pixel, negative counting from the end
+        :return: int
+        """
+        if pixel_num < -self.num_leds or pixel_num >= self.num_leds:
+            raise IndexError("pixel index out of range")
+        return (pixel_num + self.offset) % self.num_leds
+
+    def fill_range(self, start, stop, pix_value):
+        """
+        Set pixels start to stop - 1 to one packed value, in place.
+
+        :param start: Index of first pixel, 0 or more
+        :param stop: Index after the last pixel, num_leds at most
+        :param pix_value: packed value, as from pixel_value()
+        :return: None
+        """
+        if stop <= start:
+            return
+        start += self.offset
+        stop += self.offset
+        if start >= self.num_leds:
+            start -= self.num_leds
+            stop -= self.num_leds
+        if stop > self.num_leds:
+            # runs past the end of the buffer round to its start
+            self.fill_words(0, stop - self.num_leds, pix_value)
+            stop = self.num_leds
+        self.fill_words(start, stop, pix_value)
+
+    def fill_words(self, start, stop, pix_value):
+        """
+        Set pixels[start:stop] to one value: the first is written and then the filled part is copied
+        onto the rest, doubling each time, so only log2(stop - start) copies are made from Python.
+
+        :param start: Index of first word in 'pixels'
+        :param stop: Index after the last word in 'pixels'
+        :param pix_value: packed value, as from pixel_value()
+        :return: None
+        """
+        view = self.view
+        view[start] = pix_value
+        done = 1
+        length = stop - start
+        while done < length:
+            step = min(done, length - done)
+            view[start + done:start + done + step] = view[start:start + step]
+            done += step
+
+    def pixel_value(self, rgb_w, how_bright=None):
+        """
+        Pack a color into the value kept in pixels for it (see class desc.)
+
+        :param rgb_w: Tuple of form (r, g, b) or (r, g, b, w) representing color to be used
+        :param how_bright: [default: None] Brightness of current interval, 0..255 as before, but shown at
+        no more than the global brightness. If None, use global brightness value
+        :return: int
+        """
+        sh_R, sh_G, sh_B, sh_W = self.shift
+        red = rgb_w[0]
+        green = rgb_w[1]
+        blue = rgb_w[2]
+        white = 0
+        # if it's (r, g, b, w)
+        if len(rgb_w) == 4 and self.W_in_mode:
+            white = rgb_w[3]
+        if how_bright is not None and how_bright != self.brightnessvalue:
+            # the global brightness is applied by show(), so scale by how_bright / brightnessvalue;
+            # a color cannot go above 255, so how_bright is held to brightnessvalue, which keeps the hue
+            global_bright = self.brightnessvalue
+            if how_bright > global_bright:
+                how_bright = global_bright
+            half = global_bright // 2
+            red = (red * how_bright + half) // global_bright
+            green = (green * how_bright + half) // global_bright
+            blue = (blue * how_bright + half) // global_bright
+            white = (white * how_bright + half) // global_bright
+        return white << sh_W | blue << sh_B | red << sh_R | green << sh_G
 
     def set_pixel(self, pixel_num, rgb_w, how_bright=None):
         """
@@ -175,27 +434,21 @@ class Neopixel:
 
         :param pixel_num: Index of pixel to be set or slice object representing multiple leds
         :param rgb_w: Tuple of form (r, g, b) or (r, g, b, w) representing color to be used
-        :param how_bright: [default: None] Brightness of current interval. If None, use global brightness value
+        :param how_bright: [default: None] Brightness of current interval, 0..255 as before, but shown at
+        no more than the global brightness. If None, use global brightness value
         :return: None
         """
-        if how_bright is None:
-            how_bright = self.brightness()
-        sh_R, sh_G, sh_B, sh_W = self.shift
-        bratio = how_bright / 255.0
-
-        red = round(rgb_w[0] * bratio)
-        green = round(rgb_w[1] * bratio)
-        blue = round(rgb_w[2] * bratio)
-        white = 0
-        # if it's (r, g, b, w)
-        if len(rgb_w) == 4 and self.W_in_mode:
-            white = round(rgb_w[3] * bratio)
-
-        pix_value = white << sh_W | blue << sh_B | red << sh_R | green << sh_G
+        pix_value = self.pixel_value(rgb_w, how_bright)
         # set some subset, if pixel_num is a slice:
         if type(pixel_num) is slice:
-            for i in range(*pixel_num.indices(self.num_leds)):
-                self.pixels[i] = pix_value
+            start, stop, step = pixel_num.indices(self.num_leds)
+            if step == 1:
+                self.fill_range(start, stop, pix_value)
+            else:
+                for i in range(start, stop, step):
+                    self.pixels[(i + self.offset) % self.num_leds] = pix_value
+        elif self.offset:
+            self.pixels[self.index(pixel_num)] = pix_value
         else:
             self.pixels[pixel_num] = pix_value
 
@@ -279,7 +532,7 @@ class Neopixel:
         """
         if num_of_pixels is None:
             num_of_pixels = 1
-        self.pixels = self.pixels[num_of_pixels:] + self.pixels[:num_of_pixels]
+        self.offset = (self.offset + num_of_pixels) % self.num_leds
 
     def rotate_right(self, num_of_pixels=None):
         """
@@ -290,34 +543,110 @@ class Neopixel:
         """
         if num_of_pixels is None:
             num_of_pixels = 1
-        num_of_pixels = -1 * num_of_pixels
-        self.pixels = self.pixels[num_of_pixels:] + self.pixels[:num_of_pixels]
+        self.offset = (self.offset - num_of_pixels) % self.num_leds
 
     def show(self):
         """
         Send data to led-strip, making all changes on leds have an effect.
         This method should be used after every method that changes the state of leds or after a chain of changes.
+        :return: True, or with dma False if the last frame was still being sent, when this one is
+        latched and goes out after it
+        """
+        # pixels are packed ready to send (see class desc.), so the state machine takes the whole buffer
+        if self.dma is not None:
+            return self.show_dma()
+        if self.table_is_identity and not self.offset:
+            self.sm.put(self.pixels)
+        elif self.table_is_identity:
+            self.sm.put(self.view[self.offset:])
+            self.sm.put(self.view[:self.offset])
+        else:
+            self.pack()
+            self.sm.put(self.front)
+        if self.delay:
+            time.sleep(self.delay)
+        return True
+
+    def show_dma(self):
+        """
+        show() with dma: hand the frame to the DMA channel and return at once. The latch time is
+        counted rather than slept. While a frame is going out the new one is packed into 'back' now,
+        so drawing after show() does not reach it, and goes out when that frame ends; a later
+        show() before then replaces it.
+
+        :return: True, or False if the last frame was still being sent and this one is latched
+        """
+        if not self.sending:
+            self.pack()
+            self.start_frame()
+            return True
+        # frame_end leaves 'back' alone while it is packed
+        self.pending = False
+        self.pack(self.back, self.back_view)
+        self.pending = True
+        if self.sending:
+            return False
+        # the frame ended while this one was packed, and frame_end found nothing to swap in
+        self.swap_frame()
+        return True
+
+    def swap_frame(self):
+        """
+        Swap 'back', packed by show(), with 'front' and start it.
+
         :return: None
         """
-        # If mode is RGB, we cut 8 bits of, otherwise we keep all 32
-        cut = 8
-        if self.W_in_mode:
-            cut = 0
-        sm_put = self.sm.put
-        for pixval in self.pixels:
-            sm_put(pixval, cut)
-        time.sleep(self.delay)
+        self.pending = False
+        self.front, self.back = self.back, self.front
+        self.front_view, self.back_view = self.back_view, self.front_view
+        self.start_frame()
+
+    def start_frame(self):
+        """
+        Start the DMA channel on 'front', with 'frame_timer' set for its end.
+
+        :return: None
+        """
+        self.sending = True
+        self.dma.config(read=self.front, write=self.dma_write, count=self.num_leds, ctrl=self.dma_ctrl, trigger=True)
+        self.done_at = utime.ticks_add(utime.ticks_us(), self.frame_us)
+        self.frame_timer.init(mode=Timer.ONE_SHOT, period=(self.frame_us + 999) // 1000,
+                              callback=self.frame_callback)
+
+    def close(self):
+        """
+        Release the DMA channel and timer, if used, once the last frame, and any latched after it,
+        is out.
+
+        :return: None
+        """
+        if self.dma is not None:
+            self.frame_timer.deinit()
+            while not self.frame_done():
+                pass
+            if self.pending:
+                self.swap_frame()
+                self.frame_timer.deinit()
+                while not self.frame_done():
+                    pass
+            self.sending = False
+            self.dma.close()
+            self.dma = None
+        if self.frame_timer is not None:
+            self.frame_timer.deinit()
+            self.frame_timer = None
 
     def fill(self, rgb_w, how_bright=None):
         """
         Fill the entire strip with color rgb_w
 
         :param rgb_w: Tuple of form (r, g, b) or (r, g, b, w) representing color to be used
-        :param how_bright: [default: None] Brightness of current interval. If None, use global brightness value
+        :param how_bright: [default: None] Brightness of current interval, 0..255 as before, but shown at
+        no more than the global brightness. If None, use global brightness value
         :return: None
         """
-        # set_pixel over all leds.
-        self.set_pixel(slice_maker[:], rgb_w, how_bright)
+        self.offset = 0
+        self.fill_words(0, self.num_leds, self.pixel_value(rgb_w, how_bright))
 
     def clear(self):
         """
@@ -325,4 +654,5 @@ class Neopixel:
 
         :return: None
         """
-        self.pixels = array.array("I", [0] * self.num_leds)
+        self.offset = 0
+        self.fill_words(0, self.num_leds, 0)